@@ -0,0 +1,19 @@
+"""
+ASGI config.
+
+It exposes the ASGI callable as a module-level variable named ``application``, to be served by an ASGI server such as
+uvicorn.
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barrenero_api.settings')
+os.environ.setdefault('DJANGO_CONFIGURATION', 'Development')
+
+import configurations
+
+configurations.setup()
+
+from core.asgi import get_asgi_application  # noqa
+
+application = get_asgi_application()
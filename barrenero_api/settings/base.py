@@ -9,6 +9,16 @@ from configurations import Configuration, values
 __all__ = ['Base']
 
 
+class FederationPeersValue(values.SingleNestedTupleValue):
+    """
+    Federation peers as (name, url, token) tuples. Urls always end with a slash, so endpoint paths are joined to them
+    instead of replacing their last segment.
+    """
+    def to_python(self, value):
+        return tuple((name, url if url.endswith('/') else f'{url}/', *rest)
+                     for name, url, *rest in super().to_python(value))
+
+
 class LoggingMixin:
     """
     Logging configuration.
@@ -144,6 +154,7 @@ class Base(LoggingMixin, Configuration):
     )
 
     MIDDLEWARE = (
+        'core.middleware.MetricsMiddleware',
         'django.contrib.sessions.middleware.SessionMiddleware',
         'django.middleware.common.CommonMiddleware',
         'django.middleware.csrf.CsrfViewMiddleware',
@@ -174,6 +185,9 @@ class Base(LoggingMixin, Configuration):
 
     WSGI_APPLICATION = 'barrenero_api.wsgi.application'
 
+    # Tests keep runtime files in a temporary directory
+    TEST_RUNNER = 'core.tests.runner.TestRunner'
+
     # Database
     DATABASES = {
         'default': {
@@ -185,7 +199,9 @@ class Base(LoggingMixin, Configuration):
     # Cache
     DEFAULT_CACHE_TIMEOUT = 60 * 15
     CACHES = {
-        'default': {}
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
 
     # Internationalization
@@ -254,16 +270,83 @@ class Base(LoggingMixin, Configuration):
 
     REST_FRAMEWORK = {
         'DEFAULT_AUTHENTICATION_CLASSES': (
-            'rest_framework.authentication.TokenAuthentication',
+            'core.authentication.CachedTokenAuthentication',
         ),
         'DEFAULT_PERMISSION_CLASSES': (
             'rest_framework.permissions.IsAuthenticated',
-        )
+        ),
+        'DEFAULT_RENDERER_CLASSES': (
+            'core.renderers.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ),
     }
 
+    # Fast mode: compiled output serializers for read endpoints, and orjson, if installed, to parse upstream responses
+    # and render API responses. Output is the same as in normal mode
+    FAST_JSON = True
+
     # Local config
     API_SUPERUSER = values.SecretValue()
 
+    # Authenticated users cache per worker process: max number of tokens and seconds before reloading them
+    TOKEN_CACHE = {
+        'size': 1024,
+        'ttl': 60,
+    }
+
+    # Rendered responses cache per worker process: max number of responses
+    RENDERED_CACHE = {
+        'size': 1024,
+    }
+
+    # Prometheus metrics files shared by worker processes, and seconds between writes of each process metrics
+    METRICS = {
+        'path': 'config/metrics',
+        'flush_interval': 5,
+    }
+
+    # Upstream HTTP client connection pool, per worker process
+    HTTP_CLIENT = {
+        'limit': 100,
+        'limit_per_host': 10,
+        'dns_cache_ttl': 300,
+        'keepalive_timeout': 60,
+    }
+
+    # Upstream retry policy: timeout for each attempt and exponential backoff between attempts, in seconds
+    RETRY = {
+        'timeout': 5,
+        'backoff': 0.2,
+        'max_backoff': 2,
+    }
+
+    # Circuit breaker per upstream host: consecutive failures to open it and seconds before trying again
+    CIRCUIT_BREAKER = {
+        'failures': 5,
+        'reset_timeout': 30,
+    }
+
+    # Token bucket per upstream API key shared by all processes: tokens per second, bucket size and tokens reserved
+    # for API requests over the collector. Calls wait for a token up to a budget in seconds for each priority
+    RATE_LIMIT = {
+        'path': 'config/ratelimits',
+        'upstreams': {
+            'ETHERSCAN': {'rate': 5, 'burst': 5, 'reserve': 2},
+            'ETHPLORER': {'rate': 2, 'burst': 10, 'reserve': 3},
+        },
+        'wait': {
+            'interactive': 2,
+            'background': 10,
+        },
+    }
+
+    # Peer Barrenero API instances aggregated by federation endpoints, as 'name,url,token' entries separated by ';',
+    # and seconds to wait for each peer
+    FEDERATION = {
+        'peers': FederationPeersValue((), environ_name='FEDERATION_PEERS'),
+        'timeout': 5,
+    }
+
     # Third party APIs
     NANOPOOL = {
         'url': 'https://api.nanopool.org/v1/eth/',
@@ -282,6 +365,63 @@ class Base(LoggingMixin, Configuration):
     # Number of seconds since last entry to consider ether mining inactive
     ETHER_MAX_IDLE = 300
 
+    # Values shared by all accounts and workers: seconds before querying again Ether price and tokens metadata, and
+    # max seconds waiting for a value being retrieved by another worker when there is no previous one
+    SHARED_CACHE = {
+        'price_ttl': 60,
+        'tokens_ttl': 60 * 5,
+        'wait': 10,
+    }
+
+    # Wallet transactions stored locally: entries requested per upstream query, max queries per sync and number of
+    # last transactions included in wallet endpoint
+    WALLET_HISTORY = {
+        'page_size': 1000,
+        'max_pages': 10,
+        'latest': 10,
+    }
+
+    # Wallet batch endpoint: max accounts per request, accounts per Etherscan balancemulti query, concurrent upstream
+    # queries per batch and batches served at the same time
+    WALLET_BATCH = {
+        'max_accounts': 500,
+        'chunk_size': 20,
+        'concurrency': 10,
+        'workers': 4,
+    }
+
+    # Ether miner values log and number of last entries used to compute miner status and hashrate
+    ETHER_VALUES_LOG = {
+        'path': 'logs/miner/ether/values.log',
+        'entries': 30,
+    }
+
+    # Ether hashrate statistics: rolling window, history retention and EWMA half-life in seconds, histogram resolution
+    # used for percentiles, number of log lines read on start and max history buckets per query
+    ETHER_HASHRATE = {
+        'window': 60 * 60,
+        'retention': 60 * 60 * 24,
+        'halflife': 60 * 5,
+        'resolution': 0.01,
+        'backfill': 10000,
+        'max_buckets': 1500,
+    }
+
+    # Ether hashrate archive compacted from values log by the collector or hashrate_archive command, and entries written
+    # at once
+    ETHER_HASHRATE_ARCHIVE = {
+        'path': 'config/hashrate.archive',
+        'batch': 10000,
+    }
+
+    # Live events stream: seconds between updates and between heartbeats, and seconds a client may take to read
+    # pending events before being dropped
+    STREAM = {
+        'interval': 1,
+        'heartbeat': 15,
+        'max_lag': 30,
+    }
+
     # Mining container names
     MINERS = {
         'barrenero-miner-ether': 'Ether',
@@ -291,7 +431,62 @@ class Base(LoggingMixin, Configuration):
     # Storj container name to call commands with docker
     STORJ_CONTAINER_NAME = 'barrenero-miner-storj'
 
-    # Storj API
+    # Storj API, querying at most 'concurrency' nodes at the same time and waiting 'timeout' seconds per node
     STORJ_API = {
         'url': 'https://api.storj.io/',
+        'concurrency': 10,
+        'timeout': 5,
+    }
+
+    # nvidia-smi sampler: sampling interval, number of samples kept, seconds to wait for a first sample, max age in
+    # seconds of a sample to be served and seconds to wait before restarting nvidia-smi
+    NVIDIA_SMI = {
+        'command': 'nvidia-smi',
+        'loop_ms': 1000,
+        'history': 60,
+        'wait': 2,
+        'max_age': 10,
+        'restart_delay': 5,
+    }
+
+    # Docker daemon socket, seconds to wait for a first connection and seconds between reconnections
+    DOCKER = {
+        'socket': '/var/run/docker.sock',
+        'wait': 1,
+        'reconnect_delay': 5,
+    }
+
+    # Commands run by status endpoints: seconds to wait for each command and seconds its output is reused
+    SUBPROCESS = {
+        'timeout': 5,
+        'ttl': 2,
+    }
+
+    # Systemd services that can be restarted, by name
+    SYSTEMD_SERVICES = {
+        'Ether': 'barrenero-miner-ether',
+        'Storj': 'barrenero-miner-storj',
+    }
+
+    # Background jobs such as service restarts: jobs running at the same time, seconds before a job is killed and
+    # seconds finished jobs are kept
+    JOBS = {
+        'workers': 4,
+        'timeout': 120,
+        'ttl': 60 * 60 * 24,
+    }
+
+    # Snapshots shared between collector daemon and API workers, max age (in seconds) before collecting them inline
+    SNAPSHOTS = {
+        'path': 'config/snapshots',
+        'max_age': 300,
+    }
+
+    # Collector daemon refresh interval (in seconds) per source, and interval of hashrate archive compaction
+    COLLECTOR = {
+        'ether': 15,
+        'wallet': 60,
+        'storj': 60,
+        'status': 5,
+        'hashrate_archive': 60,
     }
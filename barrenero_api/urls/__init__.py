@@ -7,10 +7,13 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic.base import RedirectView
 
+from core.views.metrics import Metrics
+
 urlpatterns = [
     path('backend/', admin.site.urls),
     path('health_check/', include('health_check.urls')),
     path('favicon.ico', RedirectView.as_view(url='/static/favicon.ico', permanent=True)),
+    path('metrics', Metrics.as_view(), name='metrics'),
     path('api/', include(('barrenero_api.urls.api', 'api'), namespace='core')),
 ]
 
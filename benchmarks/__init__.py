@@ -0,0 +1,5 @@
+"""
+Benchmark suite: API views end to end against fake upstream services, and micro-benchmarks of hot helpers.
+
+Run it with ``./run benchmark`` or ``python -m benchmarks``.
+"""
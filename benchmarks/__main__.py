@@ -0,0 +1,64 @@
+"""
+Run benchmarks, comparing them with a baseline file.
+"""
+import argparse
+import fnmatch
+import os
+import sys
+
+from benchmarks import runner
+from benchmarks.environment import Environment
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='benchmarks', description='Barrenero API benchmarks')
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE, help='Baseline file')
+    parser.add_argument('-s', '--save', action='store_true', help='Save results as the new baseline')
+    parser.add_argument('-f', '--filter', action='append', default=[],
+                        help='Run benchmarks matching this glob pattern, can be repeated')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repetitions of each benchmark')
+    parser.add_argument('-t', '--transactions', type=int, default=10,
+                        help='Transactions and token operations returned by fake upstreams')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Fail if any benchmark is slower than baseline by this ratio, e.g. 1.2')
+    return parser.parse_args(args)
+
+
+def main(args=None) -> int:
+    args = parse_args(args)
+    baseline_path = os.path.abspath(args.baseline)
+    baseline = runner.load_baseline(baseline_path)
+    if baseline is None:
+        print(f'No baseline found at {baseline_path}')
+
+    results = {}
+    regressions = []
+    with Environment(transactions=args.transactions) as environment:
+        from benchmarks import suite
+
+        for name, func in suite.endpoints(environment) + suite.helpers(environment):
+            if args.filter and not any(fnmatch.fnmatch(name, pattern) for pattern in args.filter):
+                continue
+
+            results[name] = runner.measure(func, repeat=args.repeat)
+            ratio = runner.report(name, results[name], baseline)
+            if args.max_regression is not None and ratio is not None and ratio > args.max_regression:
+                regressions.append(name)
+
+    if args.save:
+        # Benchmarks not run this time keep their previous baseline
+        results = {**(baseline or {}).get('results', {}), **results}
+        runner.save_baseline(baseline_path, results)
+        print(f'Baseline saved at {baseline_path}')
+
+    if regressions:
+        print(f'Regressions over x{args.max_regression:.2f}: {", ".join(regressions)}')
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
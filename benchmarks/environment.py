@@ -0,0 +1,117 @@
+"""
+Isolated environment for benchmarks: a temporary working directory with its own database, logs and snapshots, Django
+configured against fake upstreams, and fake nvidia-smi and docker commands.
+"""
+import datetime
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+__all__ = ['Environment']
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin')
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACCOUNT = '0x566d41b925ed1d9f643748d652f4e66593cba9c9'
+
+
+class Environment:
+    """
+    Set up Django in a temporary directory. It must be entered before importing any view, because some of them read
+    relative paths on import.
+    """
+    def __init__(self, transactions: int = 10, values: int = 10000):
+        """
+        :param transactions: Number of transactions returned by fake upstreams.
+        :param values: Number of entries written to Ether miner values log.
+        """
+        self.transactions = transactions
+        self.values = values
+        self.path = None
+        self.upstreams = None
+        self.token = None
+
+        self._cwd = None
+
+    def _write_values_log(self):
+        path = os.path.join('logs', 'miner', 'ether', 'values.log')
+        os.makedirs(os.path.dirname(path))
+        now = datetime.datetime.utcnow()
+        with open(path, 'w') as f:
+            for i in range(self.values, 0, -1):
+                timestamp = (now - datetime.timedelta(seconds=i * 10)).strftime('%Y-%m-%d %H:%M:%S')
+                f.write(json.dumps({'timestamp': timestamp, 'value': {'0': 30.5 + i % 3, '1': 29.0 + i % 2}}) + '\n')
+
+    def _environ(self):
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'barrenero_api.settings'
+        os.environ['DJANGO_CONFIGURATION'] = 'Development'
+        os.environ['DJANGO_APP_LOG_DIR'] = os.path.join(self.path, 'logs', 'api')
+        os.environ['DJANGO_ETHERSCAN_TOKEN'] = 'benchmark'
+        os.environ['DJANGO_ETHPLORER_TOKEN'] = 'benchmark'
+        os.environ['DJANGO_API_SUPERUSER'] = 'benchmark'
+        os.environ['DJANGO_WORKER_NAME'] = 'rig'
+        os.environ['PATH'] = os.pathsep.join((BIN_DIR, os.environ.get('PATH', '')))
+
+    def _settings(self):
+        from django.conf import settings
+
+        settings.NANOPOOL['url'] = f'{self.upstreams.url}/nanopool/'
+        settings.ETHERSCAN['url'] = f'{self.upstreams.url}/etherscan'
+        settings.ETHPLORER['url'] = f'{self.upstreams.url}/'
+        settings.STORJ_API['url'] = f'{self.upstreams.url}/storj/'
+        # Services are read with docker command instead of the daemon socket
+        settings.DOCKER['socket'] = os.path.join(self.path, 'docker.sock')
+        settings.DOCKER['wait'] = 0
+        # Upstreams are local fakes, so rate limits would only measure waiting for tokens
+        settings.RATE_LIMIT['upstreams'] = {}
+        settings.RATE_LIMIT['path'] = os.path.join(self.path, 'config', 'ratelimits')
+        settings.METRICS['path'] = os.path.join(self.path, 'config', 'metrics')
+        settings.SNAPSHOTS['path'] = os.path.join(self.path, 'config', 'snapshots')
+
+    def _user(self):
+        from django.core.management import call_command
+        from rest_framework.authtoken.models import Token
+
+        from core.models import User
+
+        call_command('migrate', verbosity=0)
+        user = User.objects.create_superuser('benchmark', ACCOUNT, 'benchmark')
+        self.token = Token.objects.get_or_create(user=user)[0].key
+
+    def __enter__(self):
+        self._cwd = os.getcwd()
+        self.path = tempfile.mkdtemp(prefix='barrenero-benchmark-')
+        os.chdir(self.path)
+        os.makedirs(os.path.join('logs', 'api'))
+        os.makedirs('config')
+        self._write_values_log()
+
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        self._environ()
+
+        import configurations
+        configurations.setup()
+        # Development settings log every request and query, that would be measured too
+        logging.disable(logging.INFO)
+
+        from benchmarks.upstreams import FakeUpstreams
+        self.upstreams = FakeUpstreams(transactions=self.transactions)
+        self.upstreams.start()
+
+        self._settings()
+        self._user()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        from core import metrics
+
+        self.upstreams.stop()
+        metrics.registry.flush()
+        logging.disable(logging.NOTSET)
+        os.chdir(self._cwd)
+        shutil.rmtree(self.path, ignore_errors=True)
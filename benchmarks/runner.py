@@ -0,0 +1,83 @@
+"""
+Benchmarks timing and comparison against a baseline file.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, Optional
+
+__all__ = ['measure', 'load_baseline', 'save_baseline', 'report']
+
+
+def measure(func: Callable[[], None], repeat: int) -> Dict:
+    """
+    Time a function, running it enough times per repetition for each one to last at least 0.2 seconds.
+
+    :param func: Function to time.
+    :param repeat: Number of repetitions.
+    :return: Median, min and max seconds per call, and number of calls per repetition.
+    """
+    func()  # Warm up caches, connections and lazy imports
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'number': number,
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict]):
+    baseline = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def _format_time(seconds: float) -> str:
+    for unit, factor in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= factor:
+            return f'{seconds / factor:.2f} {unit}'
+
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def report(name: str, result: Dict, baseline: Optional[Dict]) -> Optional[float]:
+    """
+    Print a benchmark result, compared with its baseline if any.
+
+    :param name: Benchmark name.
+    :param result: Benchmark result.
+    :param baseline: Baseline results.
+    :return: Ratio between current and baseline median times.
+    """
+    reference = (baseline or {}).get('results', {}).get(name)
+    ratio = result['median'] / reference['median'] if reference else None
+
+    line = f'{name:<50} {_format_time(result["median"]):>12} (min {_format_time(result["min"])}, ' \
+           f'max {_format_time(result["max"])})'
+    if ratio is not None:
+        line += f'  x{ratio:.2f} vs {_format_time(reference["median"])}'
+
+    print(line, flush=True)
+
+    return ratio
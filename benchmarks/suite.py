@@ -0,0 +1,117 @@
+"""
+Benchmarks definitions. Endpoint benchmarks run views end to end against fake upstreams, while helper benchmarks
+measure hot functions in isolation.
+"""
+import json
+from functools import partial
+from typing import Callable, List, Tuple
+
+from benchmarks.environment import ACCOUNT, Environment
+from core.tests.utils import wallet_data
+
+__all__ = ['endpoints', 'helpers']
+
+Benchmark = Tuple[str, Callable[[], None]]
+
+# Number of transactions of wallet serializers benchmarks
+WALLET_SIZES = (10, 1000, 10000)
+
+
+def endpoints(environment: Environment) -> List[Benchmark]:
+    """
+    Views benchmarks: collecting fresh data from upstreams, and serving stored snapshots with and without rendered
+    responses cache.
+    """
+    from django.conf import settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from core.views import ether, status, storj, wallet
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {environment.token}')
+
+    def get(url):
+        response = client.get(url, HTTP_ACCEPT='application/json')
+        assert response.status_code == 200, f'{url}: HTTP {response.status_code}'
+
+    def get_uncached(url):
+        size = settings.RENDERED_CACHE['size']
+        settings.RENDERED_CACHE['size'] = 0
+        try:
+            get(url)
+        finally:
+            settings.RENDERED_CACHE['size'] = size
+
+    views = (
+        ('ether', ether.Ether, ACCOUNT),
+        ('wallet', wallet.Wallet, ACCOUNT),
+        ('storj', storj.Storj, None),
+        ('status', status.Status, None),
+    )
+
+    benchmarks = []
+    for name, view, account in views:
+        url = reverse(f'core:v1:{name}')
+        benchmarks += [
+            (f'endpoint.{name}.collect', partial(view().collect, account)),
+            (f'endpoint.{name}.get', partial(get, url)),
+            (f'endpoint.{name}.get_uncached', partial(get_uncached, url)),
+        ]
+
+    return benchmarks
+
+
+def helpers(environment: Environment) -> List[Benchmark]:
+    """
+    Hot helpers benchmarks: values log parsing, Ether hashrate and wallet serializers.
+    """
+    from django.conf import settings
+    from rest_framework.renderers import JSONRenderer
+
+    from core.renderers import FastJSONRenderer
+    from core.serializers.compiled import output_serializer
+    from core.serializers.wallet import Wallet
+    from core.tail import TailReader
+    from core.utils import json_date_hook
+    from core.views.ether.ether import Ether, values_log
+
+    with open(settings.ETHER_VALUES_LOG['path']) as f:
+        lines = f.read().splitlines()
+    objects = [json.loads(line) for line in lines]
+
+    def date_hook():
+        for obj in objects:
+            json_date_hook(dict(obj), keys=['timestamp'])
+
+    def parse_values_log():
+        reader = TailReader(path=settings.ETHER_VALUES_LOG['path'], maxlen=settings.ETHER_VALUES_LOG['entries'],
+                            parse=values_log.parse, backfill=len(lines))
+        reader.update()
+
+    def hashrate():
+        values_log.update()
+        view = Ether()
+        assert view._hashrate() is not None
+        view._is_miner_active()
+
+    benchmarks = [
+        (f'helper.json_date_hook[{len(objects)}]', date_hook),
+        (f'helper.values_log.parse[{len(lines)}]', parse_values_log),
+        ('helper.ether.hashrate', hashrate),
+    ]
+
+    def render_drf(data):
+        JSONRenderer().render(Wallet(data).data)
+
+    def render_compiled(data):
+        FastJSONRenderer().render(output_serializer(Wallet, data).data)
+
+    for size in WALLET_SIZES:
+        data = wallet_data(size, ACCOUNT)
+        benchmarks += [
+            (f'helper.wallet_serializer[{size}].drf', partial(render_drf, data)),
+            (f'helper.wallet_serializer[{size}].compiled', partial(render_compiled, data)),
+        ]
+
+    return benchmarks
@@ -0,0 +1,142 @@
+"""
+Fake Nanopool, Etherscan, Ethplorer and Storj APIs served by a local aiohttp server.
+"""
+import asyncio
+import threading
+
+from aiohttp import web
+
+__all__ = ['FakeUpstreams']
+
+
+class FakeUpstreams:
+    """
+    aiohttp server running in a background thread, that answers like upstream services with a fixed number of
+    transactions and token operations.
+    """
+    def __init__(self, transactions: int = 10, latency: float = 0):
+        """
+        :param transactions: Number of transactions and token operations returned.
+        :param latency: Seconds to wait before answering.
+        """
+        self.transactions = transactions
+        self.latency = latency
+        self.url = None
+
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='fake-upstreams', daemon=True)
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def nanopool_user(self, request):
+        await self._wait()
+        return web.json_response({'status': True, 'data': {
+            'account': request.match_info['account'],
+            'balance': '1.53',
+            'unconfirmed_balance': '0.01',
+            'hashrate': '152.4',
+            'avgHashrate': {'h1': '150.1', 'h3': '151.2', 'h6': '150.9', 'h12': '151.0', 'h24': '150.5'},
+            'workers': [{'id': 'rig', 'hashrate': '152.4', 'lastshare': 1523456789, 'rating': 1000}],
+        }})
+
+    async def nanopool_payments(self, request):
+        await self._wait()
+        return web.json_response({'status': True, 'data': [
+            {'date': 1523456789 - i * 86400, 'txHash': f'0x{i:064x}', 'amount': 0.2, 'confirmed': True}
+            for i in range(10)
+        ]})
+
+    async def etherscan(self, request):
+        await self._wait()
+        if request.query.get('action') == 'ethprice':
+            return web.json_response({'status': '1', 'result': {'ethusd': '512.34', 'ethbtc': '0.071'}})
+        if request.query.get('action') == 'balancemulti':
+            return web.json_response({'status': '1', 'result': [
+                {'account': account, 'balance': str(10 ** 18 + i)}
+                for i, account in enumerate(request.query['address'].split(','))
+            ]})
+
+        start_block = int(request.query.get('startblock', 0))
+        transactions = [{
+            'hash': f'0x{i:064x}',
+            'from': '0x566d41b925ed1d9f643748d652f4e66593cba9c9',
+            'to': '0x0000000000000000000000000000000000000001',
+            'value': str(10 ** 17 * (i + 1)),
+            'timeStamp': str(1523456789 + i * 3600),
+            'blockNumber': str(5000000 + i),
+        } for i in range(self.transactions) if 5000000 + i >= start_block]
+        if request.query.get('sort') == 'desc':
+            transactions.reverse()
+
+        page, offset = int(request.query.get('page', 1)), int(request.query.get('offset', 10000))
+        return web.json_response({'status': '1', 'result': transactions[(page - 1) * offset:page * offset]})
+
+    async def ethplorer_info(self, request):
+        await self._wait()
+        return web.json_response({
+            'address': request.match_info['account'],
+            'ETH': {'balance': 3.1415},
+            'tokens': [{
+                'tokenInfo': {'name': f'Token {i}', 'symbol': f'TK{i}', 'decimals': '18',
+                              'price': {'rate': '1.25'} if i % 2 else False},
+                'balance': 1.5e18 * (i + 1),
+            } for i in range(10)],
+        })
+
+    async def ethplorer_history(self, request):
+        await self._wait()
+        before = int(request.query.get('timestamp', 2 ** 32))
+        operations = [{
+            'transactionHash': f'0x{i:064x}',
+            'from': '0x0000000000000000000000000000000000000002',
+            'to': '0x566d41b925ed1d9f643748d652f4e66593cba9c9',
+            'value': str(10 ** 18 * (i + 1)),
+            'timestamp': 1523456789 - i * 1800,
+            'tokenInfo': {'name': f'Token {i % 10}', 'symbol': f'TK{i % 10}', 'decimals': '18'},
+        } for i in range(self.transactions) if 1523456789 - i * 1800 < before]
+        return web.json_response({'operations': operations[:int(request.query.get('limit', 10))]})
+
+    async def storj_contact(self, request):
+        await self._wait()
+        return web.json_response({'nodeID': request.match_info['node'], 'responseTime': 1234.5, 'reputation': 5000,
+                                  'userAgent': '8.7.3'})
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/nanopool/user/{account}', self.nanopool_user)
+        app.router.add_get('/nanopool/payments/{account}', self.nanopool_payments)
+        app.router.add_get('/etherscan', self.etherscan)
+        app.router.add_get('/getAddressInfo/{account}', self.ethplorer_info)
+        app.router.add_get('/getAddressHistory/{account}', self.ethplorer_history)
+        app.router.add_get('/storj/contacts/{node}/', self.storj_contact)
+        return app
+
+    async def _start(self):
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        """
+        Start server and wait until it is listening.
+        """
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
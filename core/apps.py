@@ -1,6 +1,6 @@
 from django.apps import AppConfig
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
@@ -8,5 +8,10 @@ class CoreConfig(AppConfig):
     verbose_name = 'Core'
 
     def ready(self):
-        from core.signals.handlers import create_auth_token
+        from rest_framework.authtoken.models import Token
+        from core.signals.handlers import create_auth_token, invalidate_token, invalidate_user_tokens
         post_save.connect(create_auth_token, sender=settings.AUTH_USER_MODEL)
+        post_save.connect(invalidate_user_tokens, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(invalidate_user_tokens, sender=settings.AUTH_USER_MODEL)
+        post_save.connect(invalidate_token, sender=Token)
+        post_delete.connect(invalidate_token, sender=Token)
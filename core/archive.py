@@ -0,0 +1,404 @@
+"""
+Append-only columnar archive of Ether miner hashrate history, compacted from values log and read through mmap.
+
+The file is a header followed by fixed-width rows of doubles in native byte order: timestamp and hashrate of each
+graphic card, NaN if a graphic card has no value. The header holds graphic card names and the values log position
+already compacted, so each compaction only parses newly appended lines.
+"""
+import bisect
+import datetime
+import fcntl
+import json
+import logging
+import math
+import mmap
+import operator
+import os
+import struct
+from array import array
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.hashrate import to_timestamp
+from core.utils import json_date_hook
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ArchiveHeader', 'ArchiveView', 'HashrateArchive']
+
+NAN = float('nan')
+
+_parse_entry = partial(json.loads, object_hook=partial(json_date_hook, keys=['timestamp']))
+
+
+class ArchiveHeader:
+    """
+    Archive header: magic, version, number of graphic cards, header size, inode and offset of values log already
+    compacted, and graphic card names as JSON padded to a multiple of 8 bytes.
+    """
+    magic = b'BHRA'
+    version = 1
+    layout = struct.Struct('<4sHHIQQ')
+
+    def __init__(self, names: List[str], inode: int = 0, offset: int = 0):
+        """
+        :param names: Graphic card names.
+        :param inode: Values log inode.
+        :param offset: Values log offset.
+        """
+        self.names = list(names)
+        self.inode = inode
+        self.offset = offset
+
+    @property
+    def _names(self) -> bytes:
+        names = json.dumps(self.names).encode()
+        return names + b' ' * (-(self.layout.size + len(names)) % 8)
+
+    @property
+    def size(self) -> int:
+        return self.layout.size + len(self._names)
+
+    @property
+    def width(self) -> int:
+        """
+        Number of columns of a row.
+        """
+        return len(self.names) + 1
+
+    @property
+    def row_size(self) -> int:
+        return self.width * 8
+
+    def pack(self) -> bytes:
+        names = self._names
+        return self.layout.pack(self.magic, self.version, len(self.names), self.layout.size + len(names), self.inode,
+                                self.offset) + names
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'ArchiveHeader':
+        magic, version, columns, size, inode, offset = cls.layout.unpack_from(data)
+        if magic != cls.magic or version != cls.version:
+            raise ValueError('Not a hashrate archive')
+
+        names = json.loads(bytes(data[cls.layout.size:size]).decode())
+        if len(names) != columns:
+            raise ValueError('Corrupted hashrate archive header')
+
+        return cls(names, inode, offset)
+
+
+class ArchiveView:
+    """
+    Columns of an archive mapped in memory. Columns are strided memoryviews over the mapped rows, so scans run in C
+    without copying nor parsing rows.
+    """
+    def __init__(self, header: ArchiveHeader, data: memoryview):
+        """
+        :param header: Archive header.
+        :param data: Rows as a flat memoryview of doubles.
+        """
+        self.header = header
+        self.data = data
+        self.rows = len(data) // header.width
+
+    @property
+    def names(self) -> List[str]:
+        return self.header.names
+
+    @property
+    def timestamps(self) -> memoryview:
+        return self.data[::self.header.width]
+
+    def column(self, index: int, first: int = 0, last: int = None) -> memoryview:
+        """
+        Values of a graphic card between two rows.
+
+        :param index: Graphic card index.
+        :param first: First row.
+        :param last: Last row (excluded), last row of the archive by default.
+        """
+        last = self.rows if last is None else last
+        width = self.header.width
+        return self.data[first * width + index + 1:last * width:width]
+
+    def bounds(self, start: float, end: float) -> Tuple[int, int]:
+        """
+        Rows between two timestamps.
+
+        :param start: Start POSIX timestamp.
+        :param end: End POSIX timestamp (excluded).
+        :return: First and last (excluded) rows.
+        """
+        timestamps = self.timestamps
+        return bisect.bisect_left(timestamps, start), bisect.bisect_left(timestamps, end)
+
+
+class HashrateArchive:
+    """
+    Hashrate history of every graphic card, compacted from values log by a single process at a time and queried by
+    any number of readers.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: Archive file path.
+        """
+        self.path = path
+
+    @contextmanager
+    def view(self) -> Iterator[Optional[ArchiveView]]:
+        """
+        Map archive in memory. Rows appended meanwhile are not visible.
+
+        :return: Archive view, or None if there is no archive yet.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            yield None
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < ArchiveHeader.layout.size:
+                yield None
+                return
+
+            mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                header = ArchiveHeader.unpack(mapped)
+                # A row being appended right now is left out
+                rows = (size - header.size) // header.row_size
+                data = memoryview(mapped)[header.size:header.size + rows * header.row_size].cast('d')
+                try:
+                    yield ArchiveView(header, data)
+                finally:
+                    data.release()
+            finally:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # Columns still referenced elsewhere, so it is unmapped once they are collected
+                    pass
+
+    def range(self, start: float, end: float) -> Tuple[List[float], Dict[str, List[float]]]:
+        """
+        Archived samples between two timestamps.
+
+        :param start: Start POSIX timestamp.
+        :param end: End POSIX timestamp (excluded).
+        :return: Timestamps and values per graphic card name.
+        """
+        with self.view() as view:
+            if view is None:
+                return [], {}
+
+            first, last = view.bounds(start, end)
+            return (view.timestamps[first:last].tolist(),
+                    {name: view.column(i, first, last).tolist() for i, name in enumerate(view.names)})
+
+    def downsample(self, start: float, end: float, bucket: int) -> Dict[str, List[Dict]]:
+        """
+        Downsample archived samples between two timestamps into buckets aligned to bucket size, as HashrateSeries
+        history does. Empty buckets are omitted.
+
+        :param start: Start POSIX timestamp.
+        :param end: End POSIX timestamp (excluded).
+        :param bucket: Bucket size in seconds.
+        :return: Mean, min and max per bucket, by graphic card name.
+        """
+        with self.view() as view:
+            if view is None:
+                return {}
+
+            timestamps = view.timestamps
+            first, last = view.bounds(start, end)
+            buckets = []
+            while first < last:
+                bucket_start = timestamps[first] - timestamps[first] % bucket
+                bucket_end = bisect.bisect_left(timestamps, bucket_start + bucket, first, last)
+                buckets.append((bucket_start, first, bucket_end))
+                first = bucket_end
+
+            result = {}
+            for i, name in enumerate(view.names):
+                history = []
+                for bucket_start, first, last in buckets:
+                    values = view.column(i, first, last)
+                    total = sum(values)
+                    if math.isnan(total):
+                        # Only buckets with missing values are scanned in Python
+                        values = [v for v in values if not math.isnan(v)]
+                        if not values:
+                            continue
+                        total = sum(values)
+
+                    history.append({
+                        'timestamp': datetime.datetime.utcfromtimestamp(bucket_start),
+                        'samples': len(values),
+                        'mean': total / len(values),
+                        'min': min(values),
+                        'max': max(values),
+                    })
+                result[name] = history
+
+        return result
+
+    def uptime(self, start: float, end: float, max_idle: float) -> Dict:
+        """
+        Time the miner and each graphic card were mining between two timestamps. Time between two consecutive samples
+        counts as uptime if the first one has a positive hashrate and they are less than max_idle seconds apart.
+
+        :param start: Start POSIX timestamp.
+        :param end: End POSIX timestamp (excluded).
+        :param max_idle: Max seconds between samples.
+        :return: Uptime in seconds and ratio over archived time, for the miner and per graphic card.
+        """
+        timestamps, columns = self.range(start, end)
+        deltas = list(map(operator.sub, timestamps[1:], timestamps[:-1]))
+        # NaN is not positive, so missing values are inactive
+        active = [[v > 0 for v in values] for values in columns.values()]
+        span = end - max(start, timestamps[0]) if timestamps else 0
+
+        def uptime(flags: List[bool]) -> Dict:
+            seconds = sum(d for d, up in zip(deltas, flags) if up and d < max_idle)
+            return {'uptime': seconds, 'ratio': seconds / span if span > 0 else None}
+
+        return {
+            **uptime([any(flags) for flags in zip(*active)]),
+            'graphic_cards': [{'graphic_card': i, **uptime(flags)} for i, flags in enumerate(active)],
+        }
+
+    def _state(self) -> Tuple[Optional[ArchiveHeader], int, float]:
+        """
+        Archive header, number of complete rows and last timestamp.
+        """
+        with self.view() as view:
+            if view is None:
+                return None, 0, -math.inf
+
+            return view.header, view.rows, view.timestamps[-1] if view.rows else -math.inf
+
+    def _parse(self, line: bytes) -> Optional[Tuple[float, Dict[str, float]]]:
+        try:
+            entry = _parse_entry(line)
+            return to_timestamp(entry['timestamp']), {str(k): float(v) for k, v in entry['value'].items()}
+        except Exception:
+            logger.warning('Cannot parse values log line: %s', line[:100])
+            return None
+
+    def _write(self, header: Optional[ArchiveHeader], rows: int, entries: List[Tuple[float, Dict[str, float]]],
+               inode: int, offset: int) -> ArchiveHeader:
+        """
+        Append entries to the archive and store values log position. If there are new graphic cards, the archive is
+        rewritten with a column for each one.
+
+        :param header: Current header, None if there is no archive.
+        :param rows: Number of complete rows.
+        :param entries: Timestamp and values per graphic card of new entries.
+        :param inode: Values log inode.
+        :param offset: Values log offset after entries.
+        :return: New header.
+        """
+        names = list(header.names) if header is not None else []
+        for _, values in entries:
+            names.extend(name for name in values if name not in names)
+        new_header = ArchiveHeader(names, inode, offset)
+
+        data = array('d')
+        for timestamp, values in entries:
+            data.append(timestamp)
+            data.extend(values.get(name, NAN) for name in names)
+
+        if header is not None and names == header.names:
+            with open(self.path, 'r+b') as f:
+                # Rows are written before log position, so entries are never lost, and a row partially written by a
+                # failed compaction is dropped
+                f.truncate(header.size + rows * header.row_size)
+                f.seek(0, os.SEEK_END)
+                f.write(data.tobytes())
+                f.flush()
+                f.seek(0)
+                f.write(new_header.pack())
+            return new_header
+
+        # Archive is replaced atomically, so readers keep mapping the previous one until they are done
+        previous = array('d')
+        if header is not None:
+            with open(self.path, 'rb') as f:
+                f.seek(header.size)
+                previous.frombytes(f.read(rows * header.row_size))
+
+        padding = [NAN] * (len(names) - len(header.names) if header is not None else 0)
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(new_header.pack())
+            if header is not None:
+                widened = array('d')
+                for row in range(rows):
+                    widened.extend(previous[row * header.width:(row + 1) * header.width])
+                    widened.extend(padding)
+                f.write(widened.tobytes())
+            f.write(data.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+        logger.info('Hashrate archive "%s" rewritten with %d graphic cards', self.path, len(names))
+        return new_header
+
+    def compact(self, log_path: str, batch: int = 10000) -> int:
+        """
+        Append values log entries newer than the last archived one. Log is read from the last compacted offset, or
+        from the beginning if it was rotated or truncated.
+
+        :param log_path: Values log path.
+        :param batch: Entries appended at once.
+        :return: Number of appended entries.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f'{self.path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._compact(log_path, batch)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _compact(self, log_path: str, batch: int) -> int:
+        header, rows, last = self._state()
+        appended = 0
+
+        with open(log_path, 'rb') as log:
+            stat = os.fstat(log.fileno())
+            same_log = header is not None and header.inode == stat.st_ino and header.offset <= stat.st_size
+            offset = header.offset if same_log else 0
+            log.seek(offset)
+
+            entries = []
+            for line in log:
+                # Incomplete last line is left for next compaction
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+
+                entry = self._parse(line) if line.strip() else None
+                if entry is None or entry[0] <= last:
+                    continue
+                last = entry[0]
+                entries.append(entry)
+
+                if len(entries) >= batch:
+                    header = self._write(header, rows, entries, stat.st_ino, offset)
+                    rows += len(entries)
+                    appended += len(entries)
+                    entries = []
+
+            if entries or header is None or (header.inode, header.offset) != (stat.st_ino, offset):
+                self._write(header, rows, entries, stat.st_ino, offset)
+                appended += len(entries)
+
+        return appended
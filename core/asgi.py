@@ -0,0 +1,301 @@
+"""
+ASGI application that awaits async views natively in the server event loop and runs any other view through Django
+WSGI handler in a thread pool.
+"""
+import asyncio
+import io
+import logging
+import sys
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.http import HttpResponse
+from django.urls import Resolver404, ResolverMatch, get_resolver, set_script_prefix
+from django.utils.module_loading import import_string
+
+from core import metrics
+from core.http import pool
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ASGIHandler', 'get_asgi_application']
+
+
+class ASGIHandler:
+    """
+    ASGI 3 application.
+
+    Requests routed to views that define an async handler for the request method (see core.views.asynchronous) are
+    dispatched as coroutines, so waiting for upstream services does not hold a thread. Any other request goes through
+    the complete WSGI stack in a thread pool.
+
+    Django middleware are synchronous and wrap the view call, so most of them are not applied to async views:
+     * Request latency, observed by MetricsMiddleware, is observed by the handler itself.
+     * Security and X-Frame-Options middleware, listed in view_middleware, are applied: HTTPS redirect and security
+       headers.
+     * Session, authentication, messages and CSRF middleware are not applied, so these views only support API token
+       authentication and never see session cookies.
+     * Common middleware is not applied: no disallowed user agents check, and no redirect to append a slash, that is
+       never needed as requests are routed to async views only if their path is resolved.
+    """
+    # Middleware applied to async views too, if they are enabled in MIDDLEWARE setting
+    view_middleware = (
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    )
+
+    def __init__(self):
+        self.wsgi_handler = WSGIHandler()
+        self.middleware = [import_string(m)() for m in settings.MIDDLEWARE if m in self.view_middleware]
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope type "{scope["type"]}"')
+
+    async def lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await pool.async_close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope: Dict, receive: Callable, send: Callable):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+
+        environ = self.environ(scope, body)
+        view = self.async_view(environ)
+        if view is not None:
+            response = await self.async_response(view, environ)
+            await self.send_response(response, receive, send)
+        else:
+            await self.send_wsgi_response(environ, receive, send)
+
+    @staticmethod
+    async def read_body(receive: Callable) -> Optional[bytes]:
+        """
+        Read the whole request body.
+
+        :return: Body or None if client disconnected.
+        """
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                return body
+
+    @staticmethod
+    def environ(scope: Dict, body: bytes) -> Dict:
+        """
+        Build a WSGI environ from an ASGI HTTP scope.
+
+        :param scope: ASGI scope.
+        :param body: Request body.
+        :return: WSGI environ.
+        """
+        script_name = scope.get('root_path', '')
+        path = scope['path']
+        if script_name and path.startswith(script_name):
+            path = path[len(script_name):]
+
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+
+            # Repeated headers are joined as a comma separated list
+            if name in environ and name != 'CONTENT_LENGTH':
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+
+        return environ
+
+    @staticmethod
+    def async_view(environ: Dict) -> Optional[ResolverMatch]:
+        """
+        Resolve request path to an async view.
+
+        :param environ: WSGI environ.
+        :return: Resolved view, or None if it is not an async view.
+        """
+        try:
+            match = get_resolver(settings.ROOT_URLCONF).resolve(environ['PATH_INFO'])
+        except Resolver404:
+            return None
+
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is None or not hasattr(view_class, f'async_{environ["REQUEST_METHOD"].lower()}'):
+            return None
+
+        return match
+
+    async def async_response(self, view: ResolverMatch, environ: Dict) -> HttpResponse:
+        """
+        Dispatch request to an async view, through the middleware that are applied to them.
+
+        :param view: Resolved view.
+        :param environ: WSGI environ.
+        :return: Rendered response.
+        """
+        start = time.perf_counter()
+        set_script_prefix(environ['SCRIPT_NAME'] or '/')
+        request = WSGIRequest(environ)
+        request.resolver_match = view
+
+        response = None
+        for middleware in self.middleware:
+            response = getattr(middleware, 'process_request', lambda r: None)(request)
+            if response is not None:
+                break
+
+        if response is None:
+            instance = view.func.view_class(**view.func.view_initkwargs)
+            response = await instance.async_dispatch(request, *view.args, **view.kwargs)
+            if hasattr(response, 'render'):
+                response = response.render()
+
+        for middleware in reversed(self.middleware):
+            response = middleware.process_response(request, response)
+
+        metrics.request_duration.observe(time.perf_counter() - start, view=view.view_name,
+                                         method=environ['REQUEST_METHOD'], status=response.status_code)
+        return response
+
+    @staticmethod
+    def response_headers(response: HttpResponse) -> List[Tuple[bytes, bytes]]:
+        headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response.items()]
+        headers += [(b'Set-Cookie', c.output(header='').strip().encode('latin-1')) for c in response.cookies.values()]
+        return headers
+
+    async def send_response(self, response: HttpResponse, receive: Callable, send: Callable):
+        """
+        Send a response, streaming its content if it is a streaming response.
+
+        :param response: Response.
+        """
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self.response_headers(response),
+        })
+
+        if not response.streaming:
+            await send({'type': 'http.response.body', 'body': response.content})
+            return
+
+        if hasattr(response, 'async_streaming_content'):
+            chunks = response.async_streaming_content
+        else:
+            chunks = self.iterate_in_executor(response.streaming_content)
+
+        try:
+            await self.send_chunks(chunks, receive, send)
+        finally:
+            await asyncio.get_event_loop().run_in_executor(None, response.close)
+
+    @staticmethod
+    async def iterate_in_executor(iterable: Iterable[bytes]) -> AsyncIterator[bytes]:
+        """
+        Iterate a blocking iterable in a thread pool.
+        """
+        loop = asyncio.get_event_loop()
+        iterator = iter(iterable)
+        while True:
+            chunk = await loop.run_in_executor(None, next, iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    @staticmethod
+    async def send_chunks(chunks: AsyncIterator[bytes], receive: Callable, send: Callable):
+        """
+        Send body chunks until they are exhausted or the client disconnects.
+
+        :param chunks: Body chunks.
+        """
+        async def stream():
+            async for chunk in chunks:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        streaming = asyncio.ensure_future(stream())
+        disconnected = asyncio.ensure_future(disconnect())
+        try:
+            await asyncio.wait([streaming, disconnected], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            streaming.cancel()
+            disconnected.cancel()
+
+        if streaming.done() and not streaming.cancelled():
+            streaming.result()
+
+    async def send_wsgi_response(self, environ: Dict, receive: Callable, send: Callable):
+        """
+        Run Django WSGI handler in a thread pool, sending response chunks as they are produced.
+
+        :param environ: WSGI environ.
+        """
+        loop = asyncio.get_event_loop()
+        start = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = await loop.run_in_executor(None, self.wsgi_handler, environ, start_response)
+        try:
+            await send({'type': 'http.response.start', **start})
+            await self.send_chunks(self.iterate_in_executor(result), receive, send)
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(None, result.close)
+
+
+def get_asgi_application() -> ASGIHandler:
+    """
+    Public interface to Django ASGI support, mirroring get_wsgi_application.
+    """
+    import django
+    django.setup(set_prefix=False)
+    return ASGIHandler()
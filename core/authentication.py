@@ -0,0 +1,173 @@
+"""
+Token authentication backed by an in-process cache of authenticated users.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from core import metrics
+
+__all__ = ['CachedUser', 'TokenCache', 'token_cache', 'CachedTokenAuthentication']
+
+
+class CachedUser:
+    """
+    Light copy of an authenticated user, holding the fields used by views and permissions.
+    """
+    __slots__ = ('pk', 'username', 'account', 'is_active', 'is_admin', 'is_api_superuser')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user):
+        self.pk = user.pk
+        self.username = user.username
+        self.account = user.account
+        self.is_active = user.is_active
+        self.is_admin = user.is_admin
+        self.is_api_superuser = user.is_api_superuser
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def is_staff(self):
+        return self.is_admin
+
+    @property
+    def is_superuser(self):
+        return self.is_admin
+
+    def __str__(self):
+        return self.username
+
+
+class TokenCache:
+    """
+    Bounded LRU cache from token key to user. Entries expire after a TTL, so changes made by other processes are
+    eventually seen, and they are invalidated right away on changes made by this process through model signals.
+    """
+    def __init__(self, size: int = None, ttl: float = None):
+        """
+        :param size: Max number of tokens.
+        :param ttl: Seconds an entry is valid.
+        """
+        self._size = size
+        self._ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: Dict[str, Tuple[float, CachedUser]]
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    @property
+    def size(self) -> int:
+        return self._size or settings.TOKEN_CACHE['size']
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl or settings.TOKEN_CACHE['ttl']
+
+    def get(self, key: str) -> Optional[CachedUser]:
+        """
+        User of given token, if it is cached and not expired.
+
+        :param key: Token key.
+        :return: User.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._counters['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1]
+
+    def set(self, key: str, user: CachedUser):
+        """
+        Cache the user of given token, evicting least recently used tokens if cache is full.
+
+        :param key: Token key.
+        :param user: User.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, key: str):
+        """
+        Remove a token.
+
+        :param key: Token key.
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def invalidate_user(self, pk):
+        """
+        Remove all tokens of a user.
+
+        :param pk: User primary key.
+        """
+        with self._lock:
+            for key in [k for k, (_, user) in self._entries.items() if user.pk == pk]:
+                del self._entries[key]
+                self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Cache statistics, including number of entries and hit ratio.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'hit_ratio': counters['hits'] / lookups if lookups else None,
+            **counters,
+        }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that only queries the database for tokens missing in the cache. Authenticated user is a
+    CachedUser and request auth is the token key.
+    """
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            metrics.cache_requests.inc(cache='token', result='hit')
+            return user, key
+
+        metrics.cache_requests.inc(cache='token', result='miss')
+        with metrics.auth_lookup_duration.time():
+            token_user, _ = super().authenticate_credentials(key)
+        user = CachedUser(token_user)
+        token_cache.set(key, user)
+        return user, key
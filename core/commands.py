@@ -0,0 +1,114 @@
+"""
+Shell commands run from coroutines with a timeout, whose outputs are cached for a short time.
+"""
+import asyncio
+import logging
+import shlex
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from core import metrics
+from core.utils import single_flight_group
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['CommandRunner', 'runner']
+
+
+class CommandRunner:
+    """
+    Run commands without blocking the event loop, so several of them run concurrently. A command is killed when it
+    exceeds its timeout or its caller is cancelled, and its output is cached for a few seconds and shared by
+    concurrent callers of all threads, so a hung command is only waited once for each timeout.
+
+    Commands are spawned with Popen and waited in the default executor instead of using asyncio subprocesses, that
+    need a child watcher attached to the main thread event loop and so they cannot run in worker threads loops.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}  # type: Dict[str, Tuple[float, str]]
+
+    def _cached(self, command: str, ttl: float) -> Optional[str]:
+        with self._lock:
+            cached = self._cache.get(command)
+
+        if cached is not None and time.monotonic() - cached[0] <= ttl:
+            return cached[1]
+
+        return None
+
+    async def _execute(self, command: str, timeout: float, name: str) -> Optional[str]:
+        """
+        Run a command and wait for its output.
+
+        :param command: Command line.
+        :param timeout: Seconds to wait.
+        :param name: Name used in metrics.
+        :return: Output, or None if the command fails.
+        """
+        try:
+            process = subprocess.Popen(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       universal_newlines=True)
+        except OSError as e:
+            logger.warning('Cannot run "%s": %s', command, e)
+            metrics.subprocess_errors.inc(command=name, error='NotFound')
+            return None
+
+        loop = asyncio.get_event_loop()
+        try:
+            with metrics.subprocess_duration.time(command=name):
+                stdout, _ = await asyncio.wait_for(loop.run_in_executor(None, process.communicate), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Command "%s" timed out after %.1fs', command, timeout)
+            metrics.subprocess_errors.inc(command=name, error='Timeout')
+            return None
+        finally:
+            # Killing the process unblocks the executor thread waiting for it
+            if process.poll() is None:
+                process.kill()
+
+        if process.returncode:
+            logger.warning('Command "%s" exited with code %d', command, process.returncode)
+            metrics.subprocess_errors.inc(command=name, error='ExitCode')
+            return None
+
+        return stdout
+
+    async def run(self, command: str, name: str = None, timeout: float = None, ttl: float = None) -> Optional[str]:
+        """
+        Output of a command, cached for a short time.
+
+        :param command: Command line.
+        :param name: Name used in metrics, the command by default.
+        :param timeout: Seconds to wait, SUBPROCESS['timeout'] by default.
+        :param ttl: Seconds an output is reused, SUBPROCESS['ttl'] by default.
+        :return: Output, or None if the command fails or times out.
+        """
+        name = name or command
+        timeout = settings.SUBPROCESS['timeout'] if timeout is None else timeout
+        ttl = settings.SUBPROCESS['ttl'] if ttl is None else ttl
+
+        output = self._cached(command, ttl)
+        if output is not None:
+            metrics.cache_requests.inc(cache='subprocess', result='hit')
+            return output
+
+        metrics.cache_requests.inc(cache='subprocess', result='miss')
+        output = await single_flight_group.do(('subprocess', command), lambda: self._execute(command, timeout, name),
+                                              name)
+        if output is not None:
+            with self._lock:
+                self._cache[command] = (time.monotonic(), output)
+
+        return output
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'cached': len(self._cache)}
+
+
+runner = CommandRunner()
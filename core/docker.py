@@ -0,0 +1,221 @@
+"""
+Docker Engine API client over its unix socket and service containers state kept up to date with Docker events.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['DockerClient', 'ServiceMonitor', 'monitor']
+
+
+class DockerClient:
+    """
+    Minimal async client of Docker Engine API that talks to the daemon through its unix socket.
+    """
+    base_url = 'http://docker'
+
+    def __init__(self, socket_path: str):
+        """
+        :param socket_path: Docker daemon unix socket.
+        """
+        self.socket_path = socket_path
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=self.socket_path))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._session.close()
+        self._session = None
+
+    async def containers(self, filters: Dict[str, List[str]] = None, all: bool = False) -> List[Dict]:
+        """
+        List containers.
+
+        :param filters: Docker filters.
+        :param all: List stopped containers too.
+        :return: Containers.
+        """
+        params = {'all': '1' if all else '0'}
+        if filters:
+            params['filters'] = json.dumps(filters)
+
+        async with self._session.get(f'{self.base_url}/containers/json', params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def events(self, filters: Dict[str, List[str]] = None) -> aiohttp.ClientResponse:
+        """
+        Subscribe to Docker events stream. Events are read from the returned response using read_events.
+
+        :param filters: Docker filters.
+        :return: Open stream response.
+        """
+        params = {'filters': json.dumps(filters)} if filters else {}
+        response = await self._session.get(f'{self.base_url}/events', params=params, timeout=None)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    async def read_events(response: aiohttp.ClientResponse) -> AsyncIterator[Dict]:
+        """
+        Read events from an open stream until it is closed.
+
+        :param response: Stream response.
+        """
+        while True:
+            line = await response.content.readline()
+            if not line:
+                return
+
+            if line.strip():
+                yield json.loads(line)
+
+
+class ServiceMonitor:
+    """
+    Keeps the set of running service containers in memory. It subscribes to Docker events from a background thread,
+    and lists containers every time it (re)connects so no change is lost while disconnected.
+    """
+    actions = {
+        'start': True,
+        'unpause': True,
+        'die': False,
+        'stop': False,
+        'kill': False,
+        'pause': False,
+        'destroy': False,
+    }
+
+    def __init__(self, socket_path: str = None, names: Iterable[str] = None):
+        """
+        :param socket_path: Docker daemon unix socket.
+        :param names: Service container names.
+        """
+        self._socket_path = socket_path
+        self._names = names
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._task = None
+        self._running = None  # type: Optional[Set[str]]
+
+    @property
+    def socket_path(self) -> str:
+        return self._socket_path or settings.DOCKER['socket']
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names or settings.MINERS.keys())
+
+    def start(self):
+        """
+        Start monitor thread if it is not running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._run, name='docker-monitor', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop monitor thread.
+        """
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(self._watch())
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def _set_running(self, running: Optional[Set[str]]):
+        with self._lock:
+            self._running = running
+        self._ready.set()
+
+    async def _watch(self):
+        while True:
+            try:
+                async with DockerClient(self.socket_path) as client:
+                    # Subscribe before listing containers to avoid missing changes between both calls
+                    stream = await client.events(filters={'type': ['container'], 'container': self.names})
+                    try:
+                        containers = await client.containers(filters={'name': self.names})
+                        self._set_running({n.lstrip('/') for c in containers for n in c['Names']} & set(self.names))
+                        logger.debug('Docker monitor connected, running services: %s', self._running)
+
+                        async for event in client.read_events(stream):
+                            self._handle(event)
+                    finally:
+                        stream.close()
+
+                logger.warning('Docker events stream closed')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug('Docker monitor disconnected: %s', e)
+
+            # State is unknown until reconnected
+            self._set_running(None)
+            await asyncio.sleep(settings.DOCKER['reconnect_delay'])
+
+    def _handle(self, event: Dict):
+        """
+        Update running services given a Docker event.
+
+        :param event: Docker event.
+        """
+        action = event.get('Action') or event.get('status')
+        name = event.get('Actor', {}).get('Attributes', {}).get('name')
+        if action not in self.actions or name not in self.names:
+            return
+
+        with self._lock:
+            if self._running is None:
+                return
+
+            if self.actions[action]:
+                self._running.add(name)
+            else:
+                self._running.discard(name)
+
+        logger.debug('Docker event "%s" for service "%s"', action, name)
+
+    def running(self, wait: float = 0) -> Optional[Set[str]]:
+        """
+        Names of running service containers, starting the monitor if needed.
+
+        :param wait: Seconds to wait for a first connection.
+        :return: Running services or None if Docker state is unknown.
+        """
+        self.start()
+        if wait:
+            self._ready.wait(wait)
+
+        with self._lock:
+            return set(self._running) if self._running is not None else None
+
+
+monitor = ServiceMonitor()
@@ -0,0 +1,117 @@
+"""
+Optional orjson based JSON parsing and rendering, that produces the same results as the standard library.
+
+orjson is not a hard requirement: if it is not installed, or it does not pass the compatibility check, or FAST_JSON
+setting is disabled, every function falls back to the standard json module.
+"""
+import json
+import logging
+import re
+from typing import Any, Optional
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['enabled', 'loads', 'dumps', 'is_safe_float']
+
+# Integers that may not fit in 64 bits, that orjson parses as floats instead of integers
+BIG_INTEGER = re.compile(r'[:\[,]\s*-?\d{19}')
+
+# Escapes applied by DRF JSON renderer to keep output valid JavaScript
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+# Values whose rendering must match between orjson and json for orjson to be used
+PROBES = [
+    0.0, -0.0, 1e-4, 0.1, 1 / 3, 123.456, 2.0 ** 53, 1e15, 9999999999999998.0, -12345678.9,
+    0, -1, 2 ** 63 - 1, True, False, None,
+    'text', 'é€😀', 'a\n\t\r\x00\x1f\x7f"\\/',
+    {'a': [1, 2.5, None], 'b': {'c': ''}},
+]
+
+
+def is_safe_float(value: float) -> bool:
+    """
+    Check if a float is rendered the same by orjson and json, that differ for non-finite, tiny and huge values (e.g.
+    some orjson versions render 1e16 as 1e16 instead of 1e+16).
+    """
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def _options() -> int:
+    # Types that orjson renders natively but DRF encoder renders differently are passed to default, that fails
+    return orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _stdlib_dumps(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _check() -> bool:
+    if orjson is None:
+        return False
+
+    try:
+        compatible = all(orjson.dumps(probe, option=_options()) == _stdlib_dumps(probe) for probe in PROBES)
+    except Exception:
+        compatible = False
+
+    if not compatible:
+        logger.warning('orjson %s output differs from json, using json instead', orjson.__version__)
+
+    return compatible
+
+
+_compatible = _check()
+
+
+def enabled() -> bool:
+    """
+    Whether orjson is used.
+    """
+    return _compatible and settings.FAST_JSON
+
+
+def loads(s: str) -> Any:
+    """
+    Parse a JSON document.
+
+    :param s: JSON document.
+    :return: Parsed value.
+    """
+    if enabled() and not BIG_INTEGER.search(s):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # Let json parse or fail on its own terms, e.g. NaN literals
+            pass
+
+    return json.loads(s)
+
+
+def dumps(data: Any) -> Optional[bytes]:
+    """
+    Render data as compact UTF-8 JSON, escaping line separators like DRF does. Floats must be checked beforehand
+    with is_safe_float.
+
+    :param data: Data made of dicts, lists, strings, numbers, booleans and None.
+    :return: JSON or None if orjson is not used or it cannot render data.
+    """
+    if not enabled():
+        return None
+
+    try:
+        content = orjson.dumps(data, option=_options())
+    except orjson.JSONEncodeError:
+        return None
+
+    for character, escaped in LINE_SEPARATORS:
+        if character in content:
+            content = content.replace(character, escaped)
+
+    return content
@@ -0,0 +1,177 @@
+"""
+Graphic cards status sampled from a long-running nvidia-smi process.
+"""
+import logging
+import shlex
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['NvidiaSmiSampler', 'sampler']
+
+
+class NvidiaSmiSampler:
+    """
+    Runs a single nvidia-smi process in loop mode and parses its CSV output incrementally, keeping the latest sample
+    of all graphic cards and a short history of samples. The process is restarted if it dies.
+
+    The sampler is started lazily on first use, so each worker process runs its own nvidia-smi.
+    """
+    keys = ('id', 'power', 'fan', 'gpu_usage', 'mem_usage', 'gpu_clock', 'mem_clock')
+    query = 'index,power.draw,fan.speed,utilization.gpu,utilization.memory,clocks.gr,clocks.mem'
+
+    def __init__(self, command: str = None, loop_ms: int = None, history: int = None):
+        """
+        :param command: nvidia-smi executable.
+        :param loop_ms: Sampling interval in milliseconds.
+        :param history: Number of samples kept.
+        """
+        self._command = command
+        self._loop_ms = loop_ms
+        self._history_size = history
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = None
+        self._latest = None  # type: Optional[Tuple[float, List[Dict]]]
+        self._history = None
+        self.restarts = 0
+
+    @property
+    def command(self) -> List[str]:
+        command = self._command or settings.NVIDIA_SMI['command']
+        loop_ms = self._loop_ms or settings.NVIDIA_SMI['loop_ms']
+        return shlex.split(command) + [f'--query-gpu={self.query}', '--format=csv,noheader', f'--loop-ms={loop_ms}']
+
+    @property
+    def snapshot_command(self) -> str:
+        """
+        Command that queries graphic cards status once.
+        """
+        return f'{self._command or settings.NVIDIA_SMI["command"]} --query-gpu={self.query} --format=csv,noheader'
+
+    @classmethod
+    def parse_line(cls, line: str) -> Dict:
+        """
+        Parse a CSV line of nvidia-smi output, removing units from values.
+
+        :param line: CSV line.
+        :return: Graphic card status.
+        """
+        return {k: v.split()[0] for k, v in zip(cls.keys, line.strip().split(', '))}
+
+    def start(self):
+        """
+        Start sampler thread if it is not running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._stop.clear()
+            self._history = deque(maxlen=self._history_size or settings.NVIDIA_SMI['history'])
+            self._thread = threading.Thread(target=self._run, name='nvidia-smi-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampler thread and nvidia-smi process.
+        """
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _publish(self, sample: List[Dict]):
+        with self._lock:
+            self._latest = (time.time(), sample)
+            self._history.append(self._latest)
+        self._ready.set()
+
+    def _read(self, process: subprocess.Popen):
+        """
+        Read nvidia-smi output, publishing a sample when all graphic cards are read.
+        """
+        expected = None
+        current = []
+        for line in process.stdout:
+            if not line.strip() or line.startswith('index'):
+                continue
+
+            try:
+                row = self.parse_line(line)
+            except Exception:
+                logger.warning('Cannot parse nvidia-smi output: %s', line.strip())
+                continue
+
+            # A repeated index means a new sample started before reaching the expected number of cards
+            if current and row['id'] in {r['id'] for r in current}:
+                expected = len(current)
+                self._publish(current)
+                current = []
+
+            current.append(row)
+            if len(current) == expected:
+                self._publish(current)
+                current = []
+
+    def _run(self):
+        delay = settings.NVIDIA_SMI['restart_delay']
+        while not self._stop.is_set():
+            try:
+                self._process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                                 universal_newlines=True, bufsize=1)
+                self._read(self._process)
+                self._process.wait()
+                logger.warning('nvidia-smi exited with code %s', self._process.returncode)
+            except FileNotFoundError:
+                logger.debug('nvidia-smi not found')
+            except Exception:
+                logger.exception('nvidia-smi sampler failed')
+            finally:
+                if self._process is not None and self._process.poll() is None:
+                    self._process.kill()
+
+            if not self._stop.wait(delay):
+                self.restarts += 1
+
+    def latest(self, wait: float = 0) -> Optional[List[Dict]]:
+        """
+        Latest sample of all graphic cards, starting the sampler if needed.
+
+        :param wait: Seconds to wait for a first sample.
+        :return: Status of each graphic card or None if there is no recent sample.
+        """
+        self.start()
+        if wait:
+            self._ready.wait(wait)
+
+        with self._lock:
+            latest = self._latest
+
+        if latest is None or time.time() - latest[0] > settings.NVIDIA_SMI['max_age']:
+            return None
+
+        return latest[1]
+
+    def history(self) -> List[Tuple[float, List[Dict]]]:
+        """
+        Last samples and their timestamps.
+        """
+        self.start()
+        with self._lock:
+            return list(self._history)
+
+
+sampler = NvidiaSmiSampler()
@@ -0,0 +1,236 @@
+"""
+Rolling hashrate statistics per graphic card, fed incrementally from Ether miner values log.
+"""
+import bisect
+import calendar
+import datetime
+import math
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+__all__ = ['HashrateSeries', 'HashrateEngine']
+
+
+def to_timestamp(value: datetime.datetime) -> float:
+    """
+    Convert a naive UTC datetime into a POSIX timestamp.
+    """
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+class HashrateSeries:
+    """
+    Hashrate samples of a single graphic card stored in compact arrays of timestamps and values.
+
+    Statistics over the rolling window (mean, EWMA, min, max and percentiles) are updated in O(1) on every sample:
+    running sum, monotonic queues for min and max and a histogram of values for percentiles. Samples older than
+    retention are compacted away in amortized constant time.
+    """
+    def __init__(self, window: float, retention: float, halflife: float, resolution: float):
+        """
+        :param window: Seconds covered by rolling statistics.
+        :param retention: Seconds of samples kept for history queries.
+        :param halflife: EWMA half-life in seconds.
+        :param resolution: Histogram bin width used for percentiles.
+        """
+        self.window = window
+        self.retention = max(retention, window)
+        self.halflife = halflife
+        self.resolution = resolution
+
+        self.timestamps = array('d')
+        self.values = array('d')
+
+        self._base = 0  # Absolute index of first stored sample
+        self._window_start = 0  # Absolute index of first sample inside rolling window
+        self._sum = 0.0
+        self._ewma = None
+        self._min = deque()
+        self._max = deque()
+        self._histogram = Counter()
+
+    def _value(self, index: int) -> float:
+        return self.values[index - self._base]
+
+    def _bin(self, value: float) -> int:
+        return int(round(value / self.resolution))
+
+    def append(self, timestamp: float, value: float):
+        """
+        Add a sample. Samples older than the last one are ignored.
+
+        :param timestamp: POSIX timestamp.
+        :param value: Hashrate.
+        """
+        if self.timestamps and timestamp <= self.timestamps[-1]:
+            return
+
+        if self._ewma is None:
+            self._ewma = value
+        else:
+            alpha = 1 - 2 ** (-(timestamp - self.timestamps[-1]) / self.halflife)
+            self._ewma += alpha * (value - self._ewma)
+
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+        index = self._base + len(self.values) - 1
+
+        self._sum += value
+        self._histogram[self._bin(value)] += 1
+        while self._min and self._value(self._min[-1]) >= value:
+            self._min.pop()
+        self._min.append(index)
+        while self._max and self._value(self._max[-1]) <= value:
+            self._max.pop()
+        self._max.append(index)
+
+        # Evict samples out of rolling window
+        while self.timestamps[self._window_start - self._base] < timestamp - self.window:
+            old_value = self._value(self._window_start)
+            self._sum -= old_value
+            old_bin = self._bin(old_value)
+            self._histogram[old_bin] -= 1
+            if not self._histogram[old_bin]:
+                del self._histogram[old_bin]
+            if self._min[0] == self._window_start:
+                self._min.popleft()
+            if self._max[0] == self._window_start:
+                self._max.popleft()
+            self._window_start += 1
+
+        # Compact samples out of retention once they are half of the arrays
+        expired = bisect.bisect_left(self.timestamps, timestamp - self.retention)
+        if expired > len(self.timestamps) // 2:
+            del self.timestamps[:expired]
+            del self.values[:expired]
+            self._base += expired
+            # Avoid floating point drift of running sum
+            self._sum = sum(self.values[self._window_start - self._base:])
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Approximated percentile of rolling window values, up to histogram resolution.
+
+        :param percent: Percentile (0-100).
+        :return: Value.
+        """
+        count = self.count
+        if not count:
+            return None
+
+        rank = max(1, math.ceil(percent / 100 * count))
+        accumulated = 0
+        for value_bin in sorted(self._histogram):
+            accumulated += self._histogram[value_bin]
+            if accumulated >= rank:
+                return value_bin * self.resolution
+
+        return None
+
+    @property
+    def count(self) -> int:
+        return self._base + len(self.values) - self._window_start
+
+    def stats(self) -> Dict:
+        """
+        Rolling window statistics.
+        """
+        count = self.count
+        return {
+            'samples': count,
+            'mean': self._sum / count if count else None,
+            'ewma': self._ewma,
+            'min': self._value(self._min[0]) if count else None,
+            'max': self._value(self._max[0]) if count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+    def history(self, start: float, end: float, bucket: int) -> List[Dict]:
+        """
+        Downsample samples between start and end into buckets aligned to bucket size. Empty buckets are omitted.
+
+        :param start: Start POSIX timestamp.
+        :param end: End POSIX timestamp.
+        :param bucket: Bucket size in seconds.
+        :return: Mean, min and max per bucket.
+        """
+        result = []
+        first = bisect.bisect_left(self.timestamps, start)
+        last = bisect.bisect_right(self.timestamps, end)
+        while first < last:
+            bucket_start = self.timestamps[first] - self.timestamps[first] % bucket
+            bucket_end = bisect.bisect_left(self.timestamps, bucket_start + bucket, first, last)
+            chunk = self.values[first:bucket_end]
+            result.append({
+                'timestamp': datetime.datetime.utcfromtimestamp(bucket_start),
+                'samples': len(chunk),
+                'mean': sum(chunk) / len(chunk),
+                'min': min(chunk),
+                'max': max(chunk),
+            })
+            first = bucket_end
+
+        return result
+
+
+class HashrateEngine:
+    """
+    Hashrate series per graphic card, fed with Ether miner values log entries.
+    """
+    def __init__(self, window: float, retention: float, halflife: float, resolution: float):
+        self.window = window
+        self.retention = retention
+        self.halflife = halflife
+        self.resolution = resolution
+
+        self._lock = threading.Lock()
+        self._series = OrderedDict()  # type: Dict[str, HashrateSeries]
+
+    def feed(self, entries: Iterable[Dict]):
+        """
+        Add values log entries.
+
+        :param entries: Entries with a timestamp and hashrate per graphic card.
+        """
+        with self._lock:
+            for entry in entries:
+                timestamp = to_timestamp(entry['timestamp'])
+                for graphic_card, value in entry['value'].items():
+                    series = self._series.get(graphic_card)
+                    if series is None:
+                        series = self._series[graphic_card] = HashrateSeries(
+                            self.window, self.retention, self.halflife, self.resolution)
+                    series.append(timestamp, float(value))
+
+    def names(self) -> List[str]:
+        """
+        Graphic card names, in the same order as query results. Graphic cards are only added, so names taken after a
+        query are those of its results, maybe followed by new ones.
+        """
+        with self._lock:
+            return list(self._series)
+
+    def query(self, window: float, bucket: int, end: float = None) -> List[Dict]:
+        """
+        Rolling statistics and downsampled history per graphic card.
+
+        :param window: Seconds of history.
+        :param bucket: Bucket size in seconds.
+        :param end: End POSIX timestamp, now by default.
+        :return: Statistics and history per graphic card.
+        """
+        end = end if end is not None else time.time()
+        with self._lock:
+            return [
+                {
+                    'graphic_card': i,
+                    'stats': series.stats(),
+                    'history': series.history(end - window, end, bucket),
+                }
+                for i, series in enumerate(self._series.values())
+            ]
@@ -0,0 +1,216 @@
+"""
+Process wide aiohttp client with keep-alive connection pooling, shared by all upstream fetchers.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ClientPool', 'pool', 'get_session']
+
+
+def _connections(connector: aiohttp.BaseConnector) -> Tuple[List[asyncio.Protocol], List[asyncio.Protocol]]:
+    """
+    Protocols of idle and acquired connections of a connector. aiohttp has no public API for them, so they are read
+    from its private attributes, available from aiohttp 3.2 (locked in Pipfile.lock) to 3.8. Tests check they are still
+    there, and no connections are reported if they are missing.
+
+    :param connector: aiohttp connector.
+    :return: Idle and acquired connections protocols.
+    """
+    conns = getattr(connector, '_conns', None)
+    acquired = getattr(connector, '_acquired', None)
+    if conns is None or acquired is None:
+        logger.warning('Cannot inspect connections of %s, aiohttp connector internals changed', connector)
+        return [], []
+
+    return [protocol for c in conns.values() for protocol, _ in c], list(acquired)
+
+
+class ClientPool:
+    """
+    Keeps one persistent session per event loop, so every worker thread reuses its pooled connections and DNS cache
+    between requests.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # type: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession]
+        self._counters = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        async def on_request_start(session, context, params):
+            self._count('requests')
+
+        async def on_connection_create_end(session, context, params):
+            self._count('connections_created')
+
+        async def on_connection_reuseconn(session, context, params):
+            self._count('connections_reused')
+
+        async def on_dns_cache_hit(session, context, params):
+            self._count('dns_cache_hits')
+
+        async def on_dns_cache_miss(session, context, params):
+            self._count('dns_cache_misses')
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_CLIENT['limit'],
+            limit_per_host=settings.HTTP_CLIENT['limit_per_host'],
+            use_dns_cache=True,
+            ttl_dns_cache=settings.HTTP_CLIENT['dns_cache_ttl'],
+            keepalive_timeout=settings.HTTP_CLIENT['keepalive_timeout'],
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+
+    @staticmethod
+    def _discard(session: aiohttp.ClientSession):
+        """
+        Close a session whose loop is closed. Public connector.close() closes transports through the loop, that fails
+        once the loop is closed, so the sockets of its connections are closed directly before detaching its connector.
+        """
+        connector = session.connector
+        if session.closed or connector is None:
+            return
+
+        idle, acquired = _connections(connector)
+        for protocol in idle + acquired:
+            transport = getattr(protocol, 'transport', None)
+            sock = transport.get_extra_info('socket') if transport is not None else None
+            if sock is not None:
+                # Newer Python versions wrap transport sockets in a proxy without close method
+                getattr(sock, '_sock', sock).close()
+
+        session.detach()
+        logger.debug('Closed HTTP client session of a closed event loop')
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Session bound to current event loop, created on first use. It must be called from a coroutine.
+
+        :return: aiohttp Session.
+        """
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            for closed_loop in [l for l in self._sessions if l.is_closed()]:
+                self._discard(self._sessions.pop(closed_loop))
+
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = self._sessions[loop] = self._create_session()
+
+        return session
+
+    def close(self):
+        """
+        Close all sessions and their connections.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+
+        for loop, session in sessions.items():
+            if loop.is_closed():
+                self._discard(session)
+                continue
+
+            if session.closed:
+                continue
+
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception:
+                logger.exception('Cannot close HTTP client session')
+
+    async def async_close(self):
+        """
+        Close the session bound to current event loop. It must be called from a coroutine.
+        """
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+
+        if session is not None and not session.closed:
+            await session.close()
+
+    def stats(self) -> Dict:
+        """
+        Pool statistics, including number of sessions, connection limits, open connections and connection reuse ratio.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            connectors = [s.connector for s in self._sessions.values() if not s.closed and s.connector]
+
+        idle = acquired = 0
+        for connector in connectors:
+            connector_idle, connector_acquired = _connections(connector)
+            idle += len(connector_idle)
+            acquired += len(connector_acquired)
+        connections = counters['connections_created'] + counters['connections_reused']
+
+        return {
+            'sessions': len(connectors),
+            'limit': sum(connector.limit for connector in connectors),
+            'limit_per_host': sum(connector.limit_per_host for connector in connectors),
+            'open_connections': idle + acquired,
+            'idle_connections': idle,
+            'acquired_connections': acquired,
+            'reuse_ratio': counters['connections_reused'] / connections if connections else None,
+            **counters,
+        }
+
+
+pool = ClientPool()
+atexit.register(pool.close)
+
+try:  # pragma: no cover
+    import uwsgi
+except ImportError:
+    pass
+else:
+    # Chained, so atexit hooks set by other modules still run
+    _uwsgi_atexit = getattr(uwsgi, 'atexit', None)
+
+    def _close_pool():
+        try:
+            pool.close()
+        finally:
+            if _uwsgi_atexit is not None:
+                _uwsgi_atexit()
+
+    uwsgi.atexit = _close_pool
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Shared session for current event loop.
+
+    :return: aiohttp Session.
+    """
+    return pool.session()
@@ -0,0 +1,215 @@
+"""
+Background jobs whose state is stored in the snapshot store, so any worker process can report it.
+"""
+import datetime
+import fcntl
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+from core.snapshots import SnapshotStore, store as default_store
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['JobQueue', 'jobs']
+
+
+class JobQueue:
+    """
+    Run jobs in a thread pool, so jobs with different keys run in parallel. A job submitted while another one with the
+    same key is pending or running, in any worker process, is not run and the existing job is returned instead.
+
+    Job state goes through pending, running and succeeded or failed, and it is lost if the process running the job
+    dies, so such jobs are marked as failed when they are found. The process is identified by its pid and start time,
+    so a new process reusing the pid is not taken for it. Finished jobs are removed JOBS['ttl'] seconds later.
+    """
+    prefix = 'job'
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    def __init__(self, store: SnapshotStore = None, workers: int = None):
+        """
+        :param store: Snapshot store.
+        :param workers: Max jobs running at the same time, JOBS['workers'] by default.
+        """
+        self._store = store
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def store(self) -> SnapshotStore:
+        return self._store or default_store
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers or settings.JOBS['workers'],
+                                                    thread_name_prefix='jobs')
+            return self._executor
+
+    def _key(self, job_id: str) -> str:
+        return f'{self.prefix}:{job_id}'
+
+    def _active_key(self, key: str) -> str:
+        return f'{self.prefix}-active:{key}'
+
+    @contextmanager
+    def _submit_lock(self, key: str):
+        """
+        Lock to look for an active job and submit a new one, held by a single process at a time.
+        """
+        os.makedirs(self.store.path, exist_ok=True)
+        with open(os.path.join(self.store.path, f'.{self._active_key(key)}.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(tz=datetime.timezone.utc)
+
+    @staticmethod
+    def _process_start(pid: int) -> Optional[int]:
+        """
+        Start time of a process in clock ticks since boot.
+
+        :param pid: Process id.
+        :return: Start time, or None if it is not available.
+        """
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                stat = f.read()
+        except OSError:
+            return None
+
+        # Process name may contain spaces, so fields are split after it, starting with the third one
+        return int(stat.rsplit(')', 1)[1].split()[19])
+
+    def _is_alive(self, job: Dict) -> bool:
+        """
+        Check if the process running a job is alive, and not another process that reused its pid.
+        """
+        try:
+            os.kill(job['pid'], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        started = job.get('pid_start')
+        return started is None or self._process_start(job['pid']) in (None, started)
+
+    def _expired(self, job: Dict) -> bool:
+        return job['finished'] is not None and (self._now() - job['finished']).total_seconds() > settings.JOBS['ttl']
+
+    def _update(self, job: Dict, **changes) -> Dict:
+        job = {**job, **changes}
+        self.store.set(self._key(job['id']), job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Current state of a job.
+
+        :param job_id: Job id.
+        :return: Job state, or None if it does not exist.
+        """
+        snapshot = self.store.get(self._key(job_id))
+        if snapshot is None:
+            return None
+
+        job = snapshot.data
+        if job['status'] in (self.PENDING, self.RUNNING) and not self._is_alive(job):
+            logger.warning('Job %s lost, its worker process is gone', job['id'])
+            job = self._update(job, status=self.FAILED, finished=self._now(), error='Worker process died')
+        elif self._expired(job):
+            return None
+
+        return job
+
+    def prune(self) -> int:
+        """
+        Remove jobs finished more than JOBS['ttl'] seconds ago, and the active job of a key if it was removed.
+
+        :return: Number of removed jobs.
+        """
+        removed = 0
+        for key in self.store.keys(f'{self.prefix}:'):
+            snapshot = self.store.get(key)
+            if snapshot is not None and self.get(snapshot.data['id']) is None:
+                self.store.delete(key)
+                removed += 1
+
+        active_prefix = self._active_key('')
+        for active_key in self.store.keys(active_prefix):
+            key = active_key[len(active_prefix):]
+            # Locked, so an active job submitted meanwhile is not removed
+            with self._submit_lock(key):
+                active = self.store.get(active_key)
+                if active is not None and self.store.get(self._key(active.data)) is None:
+                    self.store.delete(active_key)
+
+        if removed:
+            logger.debug('%d finished jobs removed', removed)
+        return removed
+
+    def _run(self, job: Dict, func: Callable[[], Dict]):
+        job = self._update(job, status=self.RUNNING, started=self._now())
+        try:
+            result = func()
+        except Exception as e:
+            logger.exception('Job %s failed', job['id'])
+            self._update(job, status=self.FAILED, finished=self._now(), error=str(e) or e.__class__.__name__)
+        else:
+            status = self.FAILED if result.get('error') else self.SUCCEEDED
+            self._update(job, status=status, finished=self._now(), **result)
+            logger.info('Job %s %s', job['id'], status)
+
+    def submit(self, key: str, func: Callable[[], Dict]) -> Dict:
+        """
+        Run a job in background, unless a job with the same key is pending or running.
+
+        :param key: Job key, such as the name of the restarted service.
+        :param func: Job function, returning a dict with its result, that has an 'error' if it failed.
+        :return: State of the submitted job or the active one.
+        """
+        self.prune()
+
+        with self._submit_lock(key):
+            active = self.store.get(self._active_key(key))
+            if active is not None:
+                job = self.get(active.data)
+                if job is not None and job['status'] in (self.PENDING, self.RUNNING):
+                    logger.debug('Job %s already active for "%s"', job['id'], key)
+                    return job
+
+            job = self._update({
+                'id': str(uuid.uuid4()),
+                'key': key,
+                'status': self.PENDING,
+                'pid': os.getpid(),
+                'pid_start': self._process_start(os.getpid()),
+                'submitted': self._now(),
+                'started': None,
+                'finished': None,
+                'error': None,
+            })
+            self.store.set(self._active_key(key), job['id'])
+
+        self.executor.submit(self._run, job, func)
+        return job
+
+
+jobs = JobQueue()
@@ -0,0 +1,138 @@
+"""
+Daemon that keeps miners, wallets and system status snapshots up to date.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from typing import List
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from core import ratelimit
+from core.models import User
+from core.snapshots import store
+from core.views.ether import Ether
+from core.views.ether.ether import hashrate_archive
+from core.views.status import Status
+from core.views.storj import Storj
+from core.views.wallet import Wallet
+
+logger = logging.getLogger(__name__)
+
+# Source name -> (view, collected per account)
+SOURCES = {
+    'ether': (Ether, True),
+    'wallet': (Wallet, True),
+    'storj': (Storj, False),
+    'status': (Status, False),
+}
+
+
+def compact_hashrate_archive():
+    """
+    Append new Ether miner values log entries to the hashrate archive, if there is a values log.
+    """
+    log_path = settings.ETHER_VALUES_LOG['path']
+    if os.path.exists(log_path):
+        appended = hashrate_archive.compact(log_path, settings.ETHER_HASHRATE_ARCHIVE['batch'])
+        logger.debug('%d entries archived into "%s"', appended, hashrate_archive.path)
+
+
+# Task name -> function, run on its own schedule as sources
+TASKS = {
+    'hashrate_archive': compact_hashrate_archive,
+}
+
+
+class Command(BaseCommand):
+    """
+    Management command that runs a daemon refreshing each source snapshot on its own schedule.
+    """
+    help = 'Collect Ether, Wallet, Storj and Status data periodically and store it as snapshots'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop = threading.Event()
+
+    def add_arguments(self, parser):
+        parser.add_argument('-s', '--source', action='append', choices=list(SOURCES.keys()) + list(TASKS.keys()),
+                            dest='sources', help='Source to collect or task to run, all of them by default')
+        parser.add_argument('--once', action='store_true', help='Collect every source once and exit')
+
+    def _accounts(self) -> List[str]:
+        """
+        Accounts of all active users.
+        """
+        close_old_connections()
+        return list(User.objects.filter(is_active=True).values_list('account', flat=True))
+
+    def _collect(self, name: str):
+        """
+        Collect a source and store its snapshots.
+
+        :param name: Source or task name.
+        """
+        if name in TASKS:
+            try:
+                TASKS[name]()
+            except Exception:
+                logger.exception('Cannot run task "%s"', name)
+            return
+
+        view_class, per_account = SOURCES[name]
+        view = view_class()
+
+        for account in (self._accounts() if per_account else [None]):
+            key = view.snapshot_key(account)
+            try:
+                started = time.monotonic()
+                snapshot = store.set(key, view.collect(account))
+                logger.debug('Snapshot "%s" v%d collected in %.3fs', key, snapshot.version, time.monotonic() - started)
+            except Exception:
+                logger.exception('Cannot collect snapshot "%s"', key)
+
+    def _run(self, name: str):
+        """
+        Collect a source or run a task periodically until the daemon is stopped.
+
+        :param name: Source or task name.
+        """
+        interval = settings.COLLECTOR[name]
+        while not self.stop.is_set():
+            started = time.monotonic()
+            self._collect(name)
+            self.stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _shutdown(self, signum, frame):
+        logger.info('Stopping collector')
+        self.stop.set()
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or list(SOURCES.keys()) + list(TASKS.keys())
+
+        # Upstream calls of the daemon give way to those of API requests
+        ratelimit.set_default_priority(ratelimit.BACKGROUND)
+
+        if options['once']:
+            for name in sources:
+                self._collect(name)
+            return
+
+        signal.signal(signal.SIGINT, self._shutdown)
+        signal.signal(signal.SIGTERM, self._shutdown)
+
+        threads = [threading.Thread(target=self._run, args=(name,), name=f'collector-{name}', daemon=True)
+                   for name in sources]
+        for thread in threads:
+            thread.start()
+
+        logger.info('Collector started for sources: %s', ', '.join(sources))
+        while not self.stop.is_set():
+            self.stop.wait(1)
+
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,28 @@
+"""
+Command to compact Ether miner values log into the hashrate archive.
+"""
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from core.views.ether.ether import hashrate_archive
+
+
+class Command(BaseCommand):
+    """
+    Management command that appends new values log entries to the hashrate archive.
+    """
+    help = 'Compact Ether miner values log into the columnar hashrate archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-l', '--log', type=str, default=settings.ETHER_VALUES_LOG['path'],
+                            help='Values log path')
+        parser.add_argument('-b', '--batch', type=int, default=settings.ETHER_HASHRATE_ARCHIVE['batch'],
+                            help='Entries written at once')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        appended = hashrate_archive.compact(options['log'], options['batch'])
+        self.stdout.write(f'{appended} entries archived into "{hashrate_archive.path}" '
+                          f'in {time.monotonic() - started:.3f}s')
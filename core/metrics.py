@@ -0,0 +1,368 @@
+"""
+Prometheus metrics shared by all worker processes.
+
+Each process records its metrics in memory and periodically flushes them to its own file in METRICS['path'], so the
+metrics endpoint, served by any worker, aggregates the files of all of them. Files of processes that are no longer
+running are merged into an archive file, so counters never go backwards when workers are recycled.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Counter', 'Gauge', 'Histogram', 'Registry', 'registry']
+
+# Sample identifier: metric name, sample suffix and label pairs
+SampleKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+ARCHIVE = 'archive.json'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class Metric:
+    """
+    Metric family, whose samples are stored in its registry.
+    """
+    type = None
+
+    def __init__(self, registry: 'Registry', name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Metric "{self.name}" expects labels {self.labelnames}, got {tuple(labels)}')
+
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value.
+    """
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        self.registry.add([((self.name, '', self._labels(labels)), amount)])
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down, summed over running processes only.
+    """
+    type = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        self.registry.add([((self.name, '', self._labels(labels)), amount)])
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, counted in cumulative buckets.
+    """
+    type = 'histogram'
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(set(buckets) | {math.inf}))
+
+    def observe(self, value: float, **labels):
+        pairs = self._labels(labels)
+        increments = [((self.name, '_bucket', pairs + (('le', _format_value(le)),)), 1)
+                      for le in self.buckets if value <= le]
+        increments += [((self.name, '_sum', pairs), value), ((self.name, '_count', pairs), 1)]
+        self.registry.add(increments)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the seconds spent in a block of code.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    """
+    Metrics of current process, flushed to a file every METRICS['flush_interval'] seconds by a background thread.
+    """
+    def __init__(self, path: str = None):
+        """
+        :param path: Directory of metrics files.
+        """
+        self._path = path
+        self.metrics = OrderedDict()  # type: Dict[str, Metric]
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._samples = {}  # type: Dict[SampleKey, float]
+        self._pid = None
+        self._owned = False
+        self._dirty = False
+        self._thread = None
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.METRICS['path']
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        self.metrics[name] = Counter(self, name, documentation, labelnames)
+        return self.metrics[name]
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        self.metrics[name] = Gauge(self, name, documentation, labelnames)
+        return self.metrics[name]
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs) -> Histogram:
+        self.metrics[name] = Histogram(self, name, documentation, labelnames, **kwargs)
+        return self.metrics[name]
+
+    def _file(self, pid: int) -> str:
+        return os.path.join(self.path, f'{pid}.json')
+
+    def _start(self):
+        """
+        Reset metrics inherited from a parent process, such as uWSGI master, and start flushing them.
+        """
+        self._pid = os.getpid()
+        self._samples = {}
+        self._owned = False
+        self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+        self._thread.start()
+
+    def add(self, increments: List[Tuple[SampleKey, float]]):
+        """
+        Increment samples.
+
+        :param increments: Sample keys and amounts.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+
+            for key, amount in increments:
+                self._samples[key] = self._samples.get(key, 0) + amount
+            self._dirty = True
+
+    def _run(self):
+        while True:
+            time.sleep(settings.METRICS['flush_interval'])
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Cannot flush metrics')
+
+    @contextmanager
+    def _locked(self, operation: int):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, '.lock'), 'a') as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(path: str) -> Dict[SampleKey, float]:
+        try:
+            with open(path) as f:
+                samples = json.load(f)
+            return {(name, suffix, tuple(map(tuple, labels))): value for name, suffix, labels, value in samples}
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning('Ignoring corrupt metrics file %s', path)
+            return {}
+
+    def _write(self, path: str, samples: Dict[SampleKey, float]):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump([[name, suffix, labels, value] for (name, suffix, labels), value in samples.items()], f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _archive(self, paths: Iterable[str]):
+        """
+        Merge metrics files into the archive and remove them. Must be called holding an exclusive lock.
+        """
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            return
+
+        archive_path = os.path.join(self.path, ARCHIVE)
+        archive = self._read(archive_path)
+        for path in paths:
+            for key, value in self._read(path).items():
+                # Gauges only make sense while their process is running
+                if getattr(self.metrics.get(key[0]), 'type', None) != 'gauge':
+                    archive[key] = archive.get(key, 0) + value
+
+        self._write(archive_path, archive)
+        for path in paths:
+            os.unlink(path)
+
+    def flush(self):
+        """
+        Write metrics of current process to its file.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._pid != os.getpid() or not self._dirty:
+                    return
+
+                samples = dict(self._samples)
+                self._dirty = False
+
+            path = self._file(self._pid)
+            if not self._owned:
+                # A file left by a previous process with the same pid is archived before writing ours
+                with self._locked(fcntl.LOCK_EX):
+                    self._archive([path])
+                self._owned = True
+
+            self._write(path, samples)
+
+    def _dead_files(self) -> List[str]:
+        dead = []
+        for name in os.listdir(self.path):
+            pid, _, extension = name.partition('.')
+            if extension != 'json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                dead.append(os.path.join(self.path, name))
+            except PermissionError:
+                pass
+
+        return dead
+
+    def collect(self) -> Dict[SampleKey, float]:
+        """
+        Aggregate metrics of all processes, archiving files of processes that are no longer running.
+
+        :return: Samples.
+        """
+        self.flush()
+        os.makedirs(self.path, exist_ok=True)
+
+        dead = self._dead_files()
+        if dead:
+            with self._locked(fcntl.LOCK_EX):
+                self._archive(dead)
+
+        samples = {}
+        with self._locked(fcntl.LOCK_SH):
+            for name in os.listdir(self.path):
+                if name.endswith('.json'):
+                    for key, value in self._read(os.path.join(self.path, name)).items():
+                        samples[key] = samples.get(key, 0) + value
+
+        return samples
+
+    def render(self, samples: Optional[Dict[SampleKey, float]] = None) -> str:
+        """
+        Metrics in Prometheus text exposition format.
+
+        :param samples: Samples, aggregated from all processes by default.
+        :return: Metrics.
+        """
+        if samples is None:
+            samples = self.collect()
+
+        families = {}
+        for key, value in samples.items():
+            families.setdefault(key[0], []).append((key, value))
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for (_, suffix, labels), value in sorted(families.get(name, []), key=self._sort_key):
+                sample_name = f'{name}{suffix}'
+                labels_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f'{sample_name}{{{labels_text}}} {_format_value(value)}' if labels_text
+                             else f'{sample_name} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _sort_key(sample):
+        (_, suffix, labels), _ = sample
+        le = dict(labels).get('le')
+        return (tuple(kv for kv in labels if kv[0] != 'le'), suffix, float(le) if le is not None else 0)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+request_duration = registry.histogram(
+    'barrenero_request_duration_seconds', 'API requests latency per view.', ('view', 'method', 'status'))
+serialization_duration = registry.histogram(
+    'barrenero_serialization_duration_seconds', 'Time serializing view data.', ('view',))
+render_duration = registry.histogram(
+    'barrenero_render_duration_seconds', 'Time rendering responses.', ('format',))
+auth_lookup_duration = registry.histogram(
+    'barrenero_auth_lookup_duration_seconds', 'Token authentication database lookups latency.')
+upstream_duration = registry.histogram(
+    'barrenero_upstream_duration_seconds', 'Upstream fetchers latency per attempt.', ('fetcher',))
+upstream_errors = registry.counter(
+    'barrenero_upstream_errors_total', 'Failed upstream fetchers attempts.', ('fetcher', 'error'))
+upstream_retries = registry.counter(
+    'barrenero_upstream_retries_total', 'Upstream fetchers attempts retried.', ('fetcher',))
+upstream_coalesced = registry.counter(
+    'barrenero_upstream_coalesced_total', 'Upstream fetchers calls that awaited an identical call in flight.',
+    ('fetcher',))
+upstream_fallbacks = registry.counter(
+    'barrenero_upstream_fallbacks_total',
+    'Last known values served while a circuit breaker is open or a rate limiter is exhausted.', ('fetcher',))
+subprocess_duration = registry.histogram(
+    'barrenero_subprocess_duration_seconds', 'Time waiting for subprocesses output.', ('command',))
+subprocess_errors = registry.counter(
+    'barrenero_subprocess_errors_total', 'Subprocesses that could not run, timed out or failed.', ('command', 'error'))
+rate_limit_wait = registry.histogram(
+    'barrenero_rate_limit_wait_seconds', 'Time waiting for upstream rate limiters.', ('upstream', 'priority'))
+rate_limit_rejected = registry.counter(
+    'barrenero_rate_limit_rejected_total', 'Upstream calls not done because rate limiter wait budget was exceeded.',
+    ('upstream', 'priority'))
+rate_limit_queued = registry.gauge(
+    'barrenero_rate_limit_queued', 'Upstream calls waiting for rate limiters.', ('upstream', 'priority'))
+cache_requests = registry.counter(
+    'barrenero_cache_requests_total', 'Cache lookups per cache and result (hit or miss).', ('cache', 'result'))
@@ -0,0 +1,22 @@
+import time
+
+from core import metrics
+
+__all__ = ['MetricsMiddleware']
+
+
+class MetricsMiddleware:
+    """
+    Observe requests latency per view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        metrics.request_duration.observe(time.perf_counter() - start, view=match.view_name if match else 'unresolved',
+                                         method=request.method, status=response.status_code)
+        return response
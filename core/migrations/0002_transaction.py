@@ -0,0 +1,43 @@
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=100, verbose_name='wallet account')),
+                ('hash', models.CharField(max_length=100, verbose_name='transaction hash')),
+                ('token_name', models.CharField(max_length=100, verbose_name='token name')),
+                ('token_symbol', models.CharField(max_length=20, verbose_name='token symbol')),
+                ('source', models.CharField(max_length=100, verbose_name='source account')),
+                ('destination', models.CharField(max_length=100, verbose_name='destination account')),
+                ('value', models.FloatField(verbose_name='transaction value')),
+                ('timestamp', models.DateTimeField(verbose_name='transaction timestamp')),
+                ('block', models.PositiveIntegerField(blank=True, null=True, verbose_name='block number')),
+            ],
+            options={
+                'verbose_name': 'transaction',
+                'verbose_name_plural': 'transactions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'timestamp'], name='transaction_account_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'block'], name='transaction_account_block_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='transaction',
+            unique_together={('account', 'hash', 'token_symbol')},
+        ),
+    ]
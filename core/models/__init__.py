@@ -1 +1,2 @@
 from core.models.user import *  # noqa
+from core.models.transaction import *  # noqa
@@ -0,0 +1,149 @@
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Max, Min
+from django.utils.translation import ugettext_lazy as _
+
+__all__ = ['Transaction']
+
+
+class TransactionManager(models.Manager):
+    @classmethod
+    def normalize_account(cls, account: str) -> str:
+        return account.lower()
+
+    def for_account(self, account: str) -> models.QuerySet:
+        return self.filter(account=self.normalize_account(account))
+
+    def last_block(self, account: str) -> Optional[int]:
+        """
+        Block of the last Ether transaction stored for an account.
+        """
+        return self.for_account(account).filter(block__isnull=False).aggregate(block=Max('block'))['block']
+
+    def last_timestamp(self, account: str, exclude_symbol: str = None) -> Optional[datetime.datetime]:
+        """
+        Timestamp of the last transaction stored for an account.
+
+        :param account: Account address.
+        :param exclude_symbol: Ignore transactions of this token.
+        """
+        queryset = self.for_account(account)
+        if exclude_symbol:
+            queryset = queryset.exclude(token_symbol=exclude_symbol)
+        return queryset.aggregate(timestamp=Max('timestamp'))['timestamp']
+
+    def first_timestamp(self, account: str, exclude_symbol: str = None) -> Optional[datetime.datetime]:
+        """
+        Timestamp of the first transaction stored for an account.
+
+        :param account: Account address.
+        :param exclude_symbol: Ignore transactions of this token.
+        """
+        queryset = self.for_account(account)
+        if exclude_symbol:
+            queryset = queryset.exclude(token_symbol=exclude_symbol)
+        return queryset.aggregate(timestamp=Min('timestamp'))['timestamp']
+
+    def store(self, account: str, entries: Iterable[Dict]) -> int:
+        """
+        Store transactions of an account, skipping those already stored.
+
+        :param account: Account address.
+        :param entries: Transactions, as returned by wallet fetchers.
+        :return: Number of new transactions.
+        """
+        account = self.normalize_account(account)
+        transactions = {}
+        for entry in entries:
+            t = self.model(
+                account=account,
+                hash=entry['hash'],
+                token_name=entry['token']['name'],
+                token_symbol=entry['token']['symbol'],
+                source=entry['source'],
+                destination=entry['destination'],
+                value=entry['value'],
+                timestamp=entry['timestamp'],
+                block=entry.get('block'),
+            )
+            transactions[(t.hash, t.token_symbol)] = t
+
+        if not transactions:
+            return 0
+
+        # Hashes are looked up in chunks to stay under SQLite variables limit
+        hashes = sorted({h for h, _ in transactions})
+        existing = set()
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            existing.update(self.filter(account=account, hash__in=chunk).values_list('hash', 'token_symbol'))
+        new = [t for key, t in transactions.items() if key not in existing]
+
+        try:
+            with transaction.atomic():
+                self.bulk_create(new)
+        except IntegrityError:
+            # Stored concurrently by another process, so they are saved one by one
+            for t in new:
+                try:
+                    with transaction.atomic():
+                        t.save()
+                except IntegrityError:
+                    pass
+
+        return len(new)
+
+    def latest(self, account: str, count: int) -> List[Dict]:
+        """
+        Last transactions of an account, formatted as wallet fetchers return them.
+
+        :param account: Account address.
+        :param count: Number of transactions.
+        :return: Transactions.
+        """
+        return [t.as_dict() for t in self.for_account(account).order_by('-timestamp', '-id')[:count]]
+
+
+class Transaction(models.Model):
+    """
+    Ether transaction or token operation of a wallet.
+    """
+    account = models.CharField(_('wallet account'), max_length=100)
+    hash = models.CharField(_('transaction hash'), max_length=100)
+    token_name = models.CharField(_('token name'), max_length=100)
+    token_symbol = models.CharField(_('token symbol'), max_length=20)
+    source = models.CharField(_('source account'), max_length=100)
+    destination = models.CharField(_('destination account'), max_length=100)
+    value = models.FloatField(_('transaction value'))
+    timestamp = models.DateTimeField(_('transaction timestamp'))
+    block = models.PositiveIntegerField(_('block number'), null=True, blank=True)
+
+    objects = TransactionManager()
+
+    class Meta:
+        verbose_name = _('transaction')
+        verbose_name_plural = _('transactions')
+        unique_together = (('account', 'hash', 'token_symbol'),)
+        indexes = [
+            models.Index(fields=['account', 'timestamp'], name='transaction_account_time_idx'),
+            models.Index(fields=['account', 'block'], name='transaction_account_block_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.hash} ({self.token_symbol})'
+
+    @property
+    def token(self) -> Dict:
+        return {'name': self.token_name, 'symbol': self.token_symbol}
+
+    def as_dict(self) -> Dict:
+        return {
+            'token': self.token,
+            'hash': self.hash,
+            'source': self.source,
+            'destination': self.destination,
+            'value': self.value,
+            'timestamp': self.timestamp,
+        }
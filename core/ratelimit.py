@@ -0,0 +1,218 @@
+"""
+Token bucket rate limiters per upstream API key, shared by all worker processes through state files.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['INTERACTIVE', 'BACKGROUND', 'RateLimitExceeded', 'RateLimiter', 'get_limiter', 'limiters_stats',
+           'priority', 'set_default_priority']
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_local = threading.local()
+_default_priority = INTERACTIVE
+
+
+def set_default_priority(value: str):
+    """
+    Priority of upstream calls made by current process, such as BACKGROUND for the collector daemon.
+    """
+    global _default_priority
+    _default_priority = value
+
+
+@contextmanager
+def priority(value: str):
+    """
+    Priority of upstream calls made by current thread within a block.
+    """
+    previous = getattr(_local, 'priority', None)
+    _local.priority = value
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority() -> str:
+    return getattr(_local, 'priority', None) or _default_priority
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket whose state is stored in a file locked on every access, so it is shared by all processes. Calls wait
+    for a token up to their priority wait budget, and background calls cannot take the tokens reserved for
+    interactive ones.
+
+    Priority is only that reserve: waiting calls are not queued in any order, each one polls the bucket when a token
+    may be available, so a background call may still take a token before an interactive call waiting for longer.
+    """
+    def __init__(self, name: str, rate: float, burst: int, reserve: int = 0, path: str = None):
+        """
+        :param name: Limiter name.
+        :param rate: Tokens per second.
+        :param burst: Bucket size.
+        :param reserve: Tokens only available to interactive calls.
+        :param path: Directory of state files.
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.reserve = min(reserve, burst - 1)
+        self._path = path
+
+        self._lock = threading.Lock()
+        self._queued = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._counters = {'acquired': 0, 'waited': 0, 'rejected': 0, 'wait_time': 0.0}
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.RATE_LIMIT['path']
+
+    def _take(self, call_priority: str) -> float:
+        """
+        Take a token if available. It blocks on the state file lock, so it must be run out of the event loop.
+
+        :param call_priority: Call priority.
+        :return: 0 if a token was taken, otherwise seconds until one may be available.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, f'{self.name}.json'), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = {'tokens': self.burst, 'timestamp': time.time()}
+
+                now = time.time()
+                tokens = min(self.burst, state['tokens'] + max(0.0, now - state['timestamp']) * self.rate)
+                needed = 1 + (self.reserve if call_priority == BACKGROUND else 0)
+
+                wait = 0.0
+                if tokens >= needed:
+                    tokens -= 1
+                else:
+                    wait = (needed - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': tokens, 'timestamp': now}))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return wait
+
+    async def acquire(self, call_priority: str = None, budget: float = None):
+        """
+        Wait for a token.
+
+        :param call_priority: Call priority, that of current thread by default.
+        :param budget: Max seconds to wait, RATE_LIMIT['wait'] for the priority by default.
+        :raise RateLimitExceeded: If a token is not available within the budget.
+        """
+        call_priority = call_priority or current_priority()
+        budget = settings.RATE_LIMIT['wait'][call_priority] if budget is None else budget
+        upstream = self.name.split('-')[0]
+
+        loop = asyncio.get_event_loop()
+        start = time.monotonic()
+        wait = await loop.run_in_executor(None, self._take, call_priority)
+        if not wait:
+            with self._lock:
+                self._counters['acquired'] += 1
+            metrics.rate_limit_wait.observe(0, upstream=upstream, priority=call_priority)
+            return
+
+        with self._lock:
+            self._queued[call_priority] += 1
+        metrics.rate_limit_queued.inc(upstream=upstream, priority=call_priority)
+        try:
+            while wait:
+                if time.monotonic() - start + wait > budget:
+                    with self._lock:
+                        self._counters['rejected'] += 1
+                    metrics.rate_limit_rejected.inc(upstream=upstream, priority=call_priority)
+                    logger.warning('Rate limit of "%s" exceeded for %s call after %.2fs', upstream, call_priority,
+                                   time.monotonic() - start)
+                    raise RateLimitExceeded(f'Rate limit of {upstream} exceeded')
+
+                await asyncio.sleep(wait)
+                wait = await loop.run_in_executor(None, self._take, call_priority)
+        finally:
+            with self._lock:
+                self._queued[call_priority] -= 1
+            metrics.rate_limit_queued.dec(upstream=upstream, priority=call_priority)
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._counters['acquired'] += 1
+            self._counters['waited'] += 1
+            self._counters['wait_time'] += waited
+        metrics.rate_limit_wait.observe(waited, upstream=upstream, priority=call_priority)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            queued = dict(self._queued)
+
+        return {
+            'queued': queued,
+            'avg_wait': counters['wait_time'] / counters['waited'] if counters['waited'] else None,
+            **counters,
+        }
+
+
+_limiters_lock = threading.Lock()
+_limiters = {}  # type: Dict[str, RateLimiter]
+
+
+def get_limiter(upstream: str) -> Optional[RateLimiter]:
+    """
+    Rate limiter of an upstream API key, if upstream is limited in RATE_LIMIT setting.
+
+    :param upstream: Upstream settings name, such as ETHERSCAN.
+    :return: Rate limiter.
+    """
+    limits = settings.RATE_LIMIT['upstreams'].get(upstream)
+    if limits is None:
+        return None
+
+    # Keys are hashed, so they are not written in file names
+    key = hashlib.sha1(str(getattr(settings, upstream).get('token')).encode()).hexdigest()[:12]
+    name = f'{upstream}-{key}'
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, **limits)
+        return _limiters[name]
+
+
+def limiters_stats() -> Dict[str, Dict]:
+    """
+    State of all rate limiters of current process.
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,55 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from core import fastjson, metrics
+
+__all__ = ['FastJSONRenderer', 'EventStreamRenderer', 'PrometheusRenderer']
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that uses orjson for data of compiled serializers flagged as safe, producing the same output as
+    JSONRenderer, that is used for anything else.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.render_duration.time(format=self.format):
+            serializer = getattr(data, 'serializer', None)
+            if getattr(serializer, 'json_safe', False) and self.compact and not self.ensure_ascii and \
+                    self.get_indent(accepted_media_type, renderer_context or {}) is None:
+                content = fastjson.dumps(data)
+                if content is not None:
+                    return content
+
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Server-sent events stream. Streaming responses are not rendered, so it only renders errors, as JSON data of an
+    error event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b'event: error\ndata: ' + json.dumps(data).encode() + b'\n\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """
+    Prometheus text exposition format. Errors are rendered as comments.
+    """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+    # Content type declaring the exposition format version, that is not part of media type so clients accepting any
+    # text/plain still match this renderer
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = f'# {json.dumps(data)}\n'
+
+        return data.encode(self.charset)
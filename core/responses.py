@@ -0,0 +1,84 @@
+"""
+In-process cache of rendered responses, validated by their ETag.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+
+__all__ = ['RenderedCache', 'rendered_cache']
+
+
+class RenderedCache:
+    """
+    Bounded LRU cache of rendered response bodies. Each entry stores the ETag of the data it was rendered from, and it
+    is only served while that ETag is still the current one.
+    """
+    def __init__(self, size: int = None):
+        """
+        :param size: Max number of responses.
+        """
+        self._size = size
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: Dict[Hashable, Tuple[str, bytes, str]]
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+        }
+
+    @property
+    def size(self) -> int:
+        return self._size or settings.RENDERED_CACHE['size']
+
+    def get(self, key: Hashable, etag: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Rendered body and content type, if it was rendered for given ETag.
+
+        :param key: Cache key.
+        :param etag: Current ETag.
+        :return: Body and content type.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self._counters['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1], entry[2]
+
+    def set(self, key: Hashable, etag: str, content: bytes, content_type: str):
+        """
+        Cache a rendered body, evicting least recently used responses if cache is full.
+
+        :param key: Cache key.
+        :param etag: ETag of rendered data.
+        :param content: Rendered body.
+        :param content_type: Content type.
+        """
+        with self._lock:
+            self._entries[key] = (etag, content, content_type)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def not_modified(self):
+        """
+        Count a request answered with Not Modified.
+        """
+        with self._lock:
+            self._counters['not_modified'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+
+        return {'entries': entries, **counters}
+
+
+rendered_cache = RenderedCache()
@@ -0,0 +1,187 @@
+"""
+Output only serializers compiled from DRF serializers, that skip the generic field machinery on every call.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Tuple, Type
+
+from django.conf import settings
+from django.db import models
+from rest_framework import fields, serializers
+from rest_framework.relations import PKOnlyObject
+from rest_framework.serializers import ReturnDict, ReturnList
+
+from core.fastjson import is_safe_float
+
+__all__ = ['CompiledSerializer', 'output_serializer']
+
+_missing = object()
+
+# Fields whose representation is delegated to DRF but always renders the same with orjson and json
+DELEGATED_SAFE_FIELDS = (fields.BooleanField, fields.NullBooleanField, fields.DateTimeField)
+
+
+class _State:
+    """
+    Flags of a single serialization.
+    """
+    __slots__ = ('safe',)
+
+    def __init__(self, safe: bool):
+        self.safe = safe
+
+
+Converter = Callable[[Any, _State], Any]
+
+
+def _float(value, state: _State) -> float:
+    value = float(value)
+    if not is_safe_float(value):
+        state.safe = False
+    return value
+
+
+def _compile_field(field: fields.Field) -> Tuple[Converter, bool]:
+    """
+    Build a function equivalent to field to_representation.
+
+    :param field: Bound field.
+    :return: Converter and whether its output is always safe to be rendered by orjson.
+    """
+    field_type = type(field)
+
+    if field_type is fields.CharField:
+        return (lambda value, state: str(value)), True
+
+    if field_type is fields.IntegerField:
+        return (lambda value, state: int(value)), True
+
+    if field_type is fields.FloatField:
+        return _float, True
+
+    if isinstance(field, serializers.ListSerializer) and \
+            field_type.to_representation is serializers.ListSerializer.to_representation:
+        child, safe = _compile_field(field.child)
+
+        def convert_list_serializer(value, state):
+            if isinstance(value, models.Manager):
+                value = value.all()
+            return [child(item, state) for item in value]
+
+        return convert_list_serializer, safe
+
+    if field_type is fields.ListField:
+        child, safe = _compile_field(field.child)
+        return (lambda value, state: [child(item, state) if item is not None else None for item in value]), safe
+
+    if field_type is fields.DictField:
+        child, safe = _compile_field(field.child)
+        return (lambda value, state: {
+            str(key): child(item, state) if item is not None else None for key, item in value.items()
+        }), safe
+
+    if isinstance(field, serializers.Serializer) and \
+            field_type.to_representation is serializers.Serializer.to_representation:
+        return _compile_serializer(field)
+
+    return (lambda value, state: field.to_representation(value)), isinstance(field, DELEGATED_SAFE_FIELDS)
+
+
+def _skips_missing(field: fields.Field) -> bool:
+    """
+    Check if DRF skips the field when its key is missing from a dict, so it can be skipped without raising SkipField.
+    """
+    try:
+        field.get_attribute({})
+    except fields.SkipField:
+        return True
+    except Exception:
+        pass
+
+    return False
+
+
+def _compile_serializer(serializer: serializers.Serializer) -> Tuple[Converter, bool]:
+    """
+    Build a function equivalent to serializer to_representation.
+
+    :param serializer: Serializer instance.
+    :return: Converter and whether its output is always safe to be rendered by orjson.
+    """
+    steps = []
+    safe = True
+    for field in serializer._readable_fields:
+        convert, field_safe = _compile_field(field)
+        safe = safe and field_safe
+        key = field.source_attrs[0] if len(field.source_attrs) == 1 else None
+        steps.append((field.field_name, key, field, convert, _skips_missing(field)))
+
+    def to_representation(instance, state):
+        ret = OrderedDict()
+        is_dict = isinstance(instance, dict)
+        for name, key, field, convert, skips_missing in steps:
+            # Plain dict items are read directly, anything else goes through DRF attribute lookup
+            value = instance.get(key, _missing) if key is not None and is_dict else _missing
+            if value is _missing and skips_missing and is_dict:
+                continue
+
+            if value is _missing or callable(value):
+                try:
+                    value = field.get_attribute(instance)
+                except fields.SkipField:
+                    continue
+
+            check_for_none = value.pk if isinstance(value, PKOnlyObject) else value
+            ret[name] = None if check_for_none is None else convert(value, state)
+
+        return ret
+
+    return to_representation, safe
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class: Type[serializers.Serializer], many: bool = False) -> Tuple[Converter, bool]:
+    return _compile_field(serializer_class(many=many))
+
+
+class CompiledSerializer:
+    """
+    Output only equivalent of a DRF serializer, compiled once per serializer class. Its data is the same as the one of
+    the DRF serializer, and it is flagged as json_safe if it can be rendered by orjson with the same result.
+    """
+    def __init__(self, serializer_class: Type[serializers.Serializer], instance: Any, many: bool = False):
+        """
+        :param serializer_class: DRF serializer class.
+        :param instance: Object to serialize.
+        :param many: Serialize a list of objects.
+        """
+        self.serializer_class = serializer_class
+        self.instance = instance
+        self.many = many
+        self.json_safe = False
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            to_representation, safe = compile_serializer(self.serializer_class, self.many)
+            state = _State(safe)
+            data = to_representation(self.instance, state)
+            self._data = ReturnList(data, serializer=self) if self.many else ReturnDict(data, serializer=self)
+            self.json_safe = state.safe
+
+        return self._data
+
+
+def output_serializer(serializer_class: Type[serializers.Serializer], instance: Any, **kwargs):
+    """
+    Serializer used to render an object, compiled if FAST_JSON setting is enabled.
+
+    :param serializer_class: DRF serializer class.
+    :param instance: Object to serialize.
+    :return: Serializer.
+    """
+    if settings.FAST_JSON and instance is not None and set(kwargs) <= {'many'}:
+        return CompiledSerializer(serializer_class, instance, **kwargs)
+
+    return serializer_class(instance, **kwargs)
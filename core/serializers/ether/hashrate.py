@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+
+BUCKETS = {
+    '1m': 60,
+    '5m': 60 * 5,
+    '1h': 60 * 60,
+    '1d': 60 * 60 * 24,
+}
+
+MAX_WINDOW = 60 * 60 * 24 * 366
+
+
+class HashrateQuery(serializers.Serializer):
+    window = serializers.IntegerField(label=_('Window (seconds)'), min_value=60, max_value=MAX_WINDOW,
+                                      default=60 * 60)
+    bucket = serializers.ChoiceField(label=_('Bucket size'), choices=list(BUCKETS.keys()), default='1m')
+
+    def validate_bucket(self, value):
+        return BUCKETS[value]
+
+    def validate(self, attrs):
+        max_buckets = settings.ETHER_HASHRATE['max_buckets']
+        if attrs['window'] > attrs['bucket'] * max_buckets:
+            raise serializers.ValidationError(
+                {'window': _('Ensure this window has no more than {} buckets.').format(max_buckets)})
+        return attrs
+
+
+class HashrateStats(serializers.Serializer):
+    samples = serializers.IntegerField(label=_('# of samples'))
+    mean = serializers.FloatField(label=_('Mean'), allow_null=True)
+    ewma = serializers.FloatField(label=_('Exponentially weighted moving average'), allow_null=True)
+    min = serializers.FloatField(label=_('Min'), allow_null=True)
+    max = serializers.FloatField(label=_('Max'), allow_null=True)
+    p50 = serializers.FloatField(label=_('50th percentile'), allow_null=True)
+    p90 = serializers.FloatField(label=_('90th percentile'), allow_null=True)
+    p99 = serializers.FloatField(label=_('99th percentile'), allow_null=True)
+
+
+class HashrateBucket(serializers.Serializer):
+    timestamp = serializers.DateTimeField(label=_('Bucket start'))
+    samples = serializers.IntegerField(label=_('# of samples'))
+    mean = serializers.FloatField(label=_('Mean'))
+    min = serializers.FloatField(label=_('Min'))
+    max = serializers.FloatField(label=_('Max'))
+
+
+class GraphicCardHashrate(serializers.Serializer):
+    graphic_card = serializers.IntegerField(label=_('Graphic card'))
+    stats = HashrateStats(label=_('Rolling window statistics'))
+    history = serializers.ListSerializer(child=HashrateBucket(), label=_('Hashrate history'))
+
+
+class HashrateHistory(serializers.Serializer):
+    window = serializers.IntegerField(label=_('Window (seconds)'))
+    bucket = serializers.IntegerField(label=_('Bucket size (seconds)'))
+    graphic_cards = serializers.ListSerializer(child=GraphicCardHashrate(), label=_('Hashrate per graphic'))
+
+
+class UptimeQuery(serializers.Serializer):
+    window = serializers.IntegerField(label=_('Window (seconds)'), min_value=60, max_value=MAX_WINDOW,
+                                      default=60 * 60 * 24 * 30)
+
+
+class GraphicCardUptime(serializers.Serializer):
+    graphic_card = serializers.IntegerField(label=_('Graphic card'))
+    uptime = serializers.FloatField(label=_('Uptime (seconds)'))
+    ratio = serializers.FloatField(label=_('Uptime ratio over archived time'), allow_null=True)
+
+
+class Uptime(serializers.Serializer):
+    window = serializers.IntegerField(label=_('Window (seconds)'))
+    uptime = serializers.FloatField(label=_('Uptime (seconds)'))
+    ratio = serializers.FloatField(label=_('Uptime ratio over archived time'), allow_null=True)
+    graphic_cards = serializers.ListSerializer(child=GraphicCardUptime(), label=_('Uptime per graphic'))
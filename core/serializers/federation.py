@@ -0,0 +1,50 @@
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+
+from core.serializers.ether.ether import Hashrate
+from core.serializers.status import GraphicCard, Service
+from core.serializers.storj import Node
+
+
+class Rig(serializers.Serializer):
+    name = serializers.CharField(label=_('Rig name'))
+    available = serializers.BooleanField(label=_('Rig answered'))
+    error = serializers.CharField(label=_('Error querying rig'), allow_null=True)
+
+
+class StatusRig(Rig):
+    graphics = serializers.ListField(child=GraphicCard(), label=_('Graphics status'), allow_null=True)
+    services = serializers.ListField(child=Service(), label=_('Services status'), allow_null=True)
+
+
+class ServiceSummary(serializers.Serializer):
+    name = serializers.CharField(label=_('Service name'))
+    active = serializers.IntegerField(label=_('# of rigs where service is active'))
+    inactive = serializers.IntegerField(label=_('# of rigs where service is inactive'))
+
+
+class Status(serializers.Serializer):
+    graphics = serializers.IntegerField(label=_('# of graphic cards'))
+    services = serializers.ListField(child=ServiceSummary(), label=_('Services status'))
+    rigs = serializers.ListField(child=StatusRig(), label=_('Status per rig'))
+
+
+class EtherRig(Rig):
+    active = serializers.NullBooleanField(label=_('Is active'))
+    hashrate = serializers.FloatField(label=_('Total hashrate'), allow_null=True)
+    graphics = serializers.ListField(child=Hashrate(), label=_('Hashrate per graphic'), allow_null=True)
+
+
+class Ether(serializers.Serializer):
+    active = serializers.IntegerField(label=_('# of active rigs'))
+    hashrate = serializers.FloatField(label=_('Total hashrate'))
+    rigs = serializers.ListField(child=EtherRig(), label=_('Ether miner status per rig'))
+
+
+class StorjRig(Rig):
+    nodes = serializers.ListField(child=Node(), label=_('Nodes status'), allow_null=True)
+
+
+class Storj(serializers.Serializer):
+    nodes = serializers.IntegerField(label=_('# of nodes'))
+    rigs = serializers.ListField(child=StorjRig(), label=_('Storj nodes per rig'))
@@ -14,3 +14,15 @@ class Service(serializers.Serializer):
             return value
         else:
             raise ValidationError(_('Unknown service'))
+
+
+class Job(serializers.Serializer):
+    id = serializers.UUIDField(label=_('Job id'))
+    service = serializers.CharField(label=_('Service name'), source='key')
+    status = serializers.CharField(label=_('Job status (pending, running, succeeded or failed)'))
+    submitted = serializers.DateTimeField(label=_('Submission timestamp'))
+    started = serializers.DateTimeField(label=_('Start timestamp'), allow_null=True)
+    finished = serializers.DateTimeField(label=_('End timestamp'), allow_null=True)
+    return_code = serializers.IntegerField(label=_('Restart command exit code'), required=False)
+    output = serializers.CharField(label=_('Restart command output'), required=False)
+    error = serializers.CharField(label=_('Error'), allow_null=True)
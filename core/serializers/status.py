@@ -18,6 +18,6 @@ class Service(serializers.Serializer):
 
 
 class Status(serializers.Serializer):
-    graphics = serializers.ListField(child=GraphicCard(), label=_('Graphics status'))
-    services = serializers.ListField(child=Service(), label=_('Services status'))
+    graphics = serializers.ListField(child=GraphicCard(), label=_('Graphics status'), allow_null=True)
+    services = serializers.ListField(child=Service(), label=_('Services status'), allow_null=True)
 
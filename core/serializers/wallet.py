@@ -1,6 +1,11 @@
+import re
+
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+ACCOUNT_REGEX = re.compile(r'^0x[0-9a-fA-F]{40}$')
+
 
 class Token(serializers.Serializer):
     name = serializers.CharField(label=_('Name'))
@@ -22,3 +27,23 @@ class Transaction(serializers.Serializer):
 class Wallet(serializers.Serializer):
     tokens = serializers.DictField(child=Token(), label=_('Tokens'))
     transactions = serializers.ListSerializer(child=Transaction(), label=_('Last transactions'))
+
+
+class BatchQuery(serializers.Serializer):
+    accounts = serializers.ListField(
+        child=serializers.RegexField(ACCOUNT_REGEX, label=_('Account address')), required=False,
+        label=_('Accounts, all active users accounts by default'))
+
+    def validate_accounts(self, value):
+        # Duplicated accounts are removed keeping the given order
+        accounts = list(dict.fromkeys(a.lower() for a in value))
+        max_accounts = settings.WALLET_BATCH['max_accounts']
+        if len(accounts) > max_accounts:
+            raise serializers.ValidationError(_('Ensure this field has no more than {} accounts.').format(max_accounts))
+        return accounts
+
+
+class BatchWallet(serializers.Serializer):
+    account = serializers.CharField(label=_('Account address'))
+    tokens = serializers.DictField(child=Token(), label=_('Tokens'))
+    error = serializers.CharField(label=_('Error querying account'), allow_null=True)
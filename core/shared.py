@@ -0,0 +1,182 @@
+"""
+Values shared by all accounts and worker processes, such as Ether price, stored in the snapshot store.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Awaitable, Callable, Optional
+
+from django.conf import settings
+
+from core import metrics
+from core.snapshots import Snapshot, SnapshotStore, store as default_store
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SharedCache', 'shared_cache']
+
+
+class SharedCache:
+    """
+    Values with a TTL shared through the snapshot store. When a value expires, a single process refreshes it while the
+    others keep serving the previous one, so upstream calls depend on TTL instead of the number of requests.
+    """
+    prefix = 'shared'
+    poll_interval = 0.05
+
+    def __init__(self, store: SnapshotStore = None):
+        """
+        :param store: Snapshot store.
+        """
+        self._store = store
+
+    @property
+    def store(self) -> SnapshotStore:
+        return self._store or default_store
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        """
+        Last value stored for a key, whatever its age.
+
+        :param key: Value key.
+        :return: Snapshot of the value.
+        """
+        return self.store.get(self._key(key))
+
+    def set(self, key: str, value: Any) -> Snapshot:
+        return self.store.set(self._key(key), value)
+
+    def update(self, key: str, update: Callable[[Optional[Any]], Any]) -> Any:
+        """
+        Read, modify and write a value under its lock, so concurrent updates of all processes are not lost. It blocks,
+        so it must be run out of the event loop.
+
+        :param key: Value key.
+        :param update: Function given the current value, or None, that returns the new value or the current one if it
+        does not change. The current value must not be modified in place, as it is shared with other readers.
+        :return: New value.
+        """
+        with self._refresh_lock(key, blocking=True):
+            snapshot = self.get(key)
+            current = snapshot.data if snapshot is not None else None
+            value = update(current)
+            if value is not current:
+                self.set(key, value)
+
+        return value
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.store.path, f'.{self._key(key)}.lock')
+
+    @contextmanager
+    def _refresh_lock(self, key: str, blocking: bool):
+        """
+        Lock to refresh a value, held by a single process or coroutine at a time.
+
+        :param key: Value key.
+        :param blocking: Wait for the lock instead of failing.
+        :return: Whether the lock was acquired.
+        """
+        os.makedirs(self.store.path, exist_ok=True)
+        with open(self._lock_path(key), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _try_lock(self, key: str) -> Optional[IO]:
+        """
+        Acquire the refresh lock of a value without waiting, so it can be held across awaits.
+
+        :param key: Value key.
+        :return: Locked file, to be given to _unlock, or None if the lock is held elsewhere.
+        """
+        os.makedirs(self.store.path, exist_ok=True)
+        lock = open(self._lock_path(key), 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+
+        return lock
+
+    @staticmethod
+    def _unlock(lock: IO):
+        try:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        finally:
+            lock.close()
+
+    async def _wait_refresh(self, key: str):
+        """
+        Wait until the value is refreshed elsewhere, up to SHARED_CACHE['wait'] seconds. The lock is polled instead of
+        waiting for it in a thread, so waiters do not take the executor threads the refresh itself needs.
+
+        :param key: Value key.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = time.monotonic() + settings.SHARED_CACHE['wait']
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            lock = await loop.run_in_executor(None, self._try_lock, key)
+            if lock is not None:
+                await loop.run_in_executor(None, self._unlock, lock)
+                return
+
+        logger.warning('Timeout waiting for shared value "%s" to be refreshed', key)
+
+    async def get_or_refresh(self, key: str, ttl: float, refresh: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Value of a key, refreshing it if it is older than its TTL. While another process or coroutine refreshes it,
+        the previous value is returned, or it waits for the new one if there is no previous value.
+
+        :param key: Value key.
+        :param ttl: Max age in seconds.
+        :param refresh: Coroutine function that retrieves the value, returning None if it fails.
+        :return: Value, or None if it is not available.
+        """
+        # Values and locks are files, so they are accessed out of the event loop
+        loop = asyncio.get_event_loop()
+        snapshot = await loop.run_in_executor(None, self.get, key)
+        if snapshot is not None and snapshot.age <= ttl:
+            metrics.cache_requests.inc(cache=key, result='hit')
+            return snapshot.data
+
+        lock = await loop.run_in_executor(None, self._try_lock, key)
+        if lock is not None:
+            try:
+                metrics.cache_requests.inc(cache=key, result='miss')
+                value = await refresh()
+                if value is None:
+                    logger.warning('Cannot refresh shared value "%s", serving last known value', key)
+                    return snapshot.data if snapshot is not None else None
+
+                await loop.run_in_executor(None, self.set, key, value)
+                return value
+            finally:
+                await loop.run_in_executor(None, self._unlock, lock)
+
+        if snapshot is not None:
+            metrics.cache_requests.inc(cache=key, result='stale')
+            return snapshot.data
+
+        # Nothing to serve yet, so wait until the value is refreshed elsewhere
+        await self._wait_refresh(key)
+        metrics.cache_requests.inc(cache=key, result='hit')
+        snapshot = await loop.run_in_executor(None, self.get, key)
+        return snapshot.data if snapshot is not None else None
+
+shared_cache = SharedCache()
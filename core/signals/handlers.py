@@ -1,6 +1,16 @@
 from rest_framework.authtoken.models import Token
 
+from core.authentication import token_cache
+
 
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+def invalidate_user_tokens(sender, instance=None, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+def invalidate_token(sender, instance=None, **kwargs):
+    token_cache.invalidate(instance.key)
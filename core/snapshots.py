@@ -0,0 +1,154 @@
+"""
+Versioned snapshots shared between barrenero_collector daemon and API workers.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+__all__ = ['Snapshot', 'SnapshotStore', 'store']
+
+
+class Snapshot:
+    """
+    Data collected from a source at a given time.
+    """
+    __slots__ = ('key', 'version', 'timestamp', 'digest', 'data')
+
+    def __init__(self, key: str, version: int, timestamp: float, digest: str, data: Any):
+        self.key = key
+        self.version = version
+        self.timestamp = timestamp
+        self.digest = digest
+        self.data = data
+
+    @property
+    def age(self) -> float:
+        """
+        Seconds elapsed since this snapshot was collected.
+        """
+        return max(0.0, time.time() - self.timestamp)
+
+
+class SnapshotStore:
+    """
+    File based snapshot store. Each key is pickled to its own file, that is atomically replaced on every write so any
+    process can read it without locking. Version is only increased when data changes.
+    """
+    def __init__(self, path: str = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._cache = {}  # type: Dict[str, Tuple[Tuple[int, int, int], Snapshot]]
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.SNAPSHOTS['path']
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f'{key.replace(os.sep, "_")}.snapshot')
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        """
+        Retrieve the last snapshot for given key, reading it from disk only if it changed since last read.
+
+        :param key: Snapshot key.
+        :return: Snapshot or None if it does not exist.
+        """
+        path = self._file(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+        try:
+            with open(path, 'rb') as f:
+                snapshot = Snapshot(key=key, **pickle.load(f))
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        with self._lock:
+            self._cache[key] = (signature, snapshot)
+
+        return snapshot
+
+    def set(self, key: str, data: Any) -> Snapshot:
+        """
+        Store data as the last snapshot for given key.
+
+        :param key: Snapshot key.
+        :param data: Data to store.
+        :return: Stored snapshot.
+        """
+        raw_data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha1(raw_data).hexdigest()
+
+        previous = self.get(key)
+        if previous is None:
+            version = 1
+        elif previous.digest == digest:
+            version = previous.version
+        else:
+            version = previous.version + 1
+
+        snapshot = Snapshot(key=key, version=version, timestamp=time.time(), digest=digest, data=data)
+
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(
+                    {'version': version, 'timestamp': snapshot.timestamp, 'digest': digest, 'data': data},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, self._file(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+        return snapshot
+
+    def delete(self, key: str):
+        """
+        Remove the snapshot for given key, if any.
+
+        :param key: Snapshot key.
+        """
+        with self._lock:
+            self._cache.pop(key, None)
+
+        try:
+            os.unlink(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """
+        Keys of stored snapshots.
+
+        :param prefix: Only keys starting with this prefix.
+        :return: Snapshot keys.
+        """
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+
+        # Temporary files start with a dot
+        suffix = '.snapshot'
+        return [n[:-len(suffix)] for n in names
+                if n.endswith(suffix) and n.startswith(prefix) and not n.startswith('.')]
+
+
+store = SnapshotStore()
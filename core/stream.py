@@ -0,0 +1,244 @@
+"""
+Fan out of server-sent events built by a single producer to all connected subscribers.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Subscriber', 'Broadcaster', 'encode_event']
+
+HEARTBEAT = b': heartbeat\n\n'
+
+
+def encode_event(event: str, data: bytes) -> bytes:
+    """
+    Encode an event in server-sent events format.
+
+    :param event: Event name.
+    :param data: Event data, in a single line.
+    :return: Encoded event.
+    """
+    return b'event: ' + event.encode() + b'\ndata: ' + data + b'\n\n'
+
+
+class Subscriber:
+    """
+    Pending events of a connected client. Only the last value of each event is kept, so a slow client receives the
+    latest state instead of buffering every change, and it is dropped if it does not read for too long.
+    """
+    def __init__(self, broadcaster: 'Broadcaster'):
+        self.broadcaster = broadcaster
+        self.closed = False
+        self.coalesced = 0
+        self._pending_since = None
+
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()  # type: Dict[str, bytes]
+        self._waiters = []  # type: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+
+    def publish(self, event: str, data: bytes):
+        """
+        Queue an event, replacing a pending value of the same event.
+        """
+        with self._condition:
+            if event in self._pending:
+                self.coalesced += 1
+                del self._pending[event]
+            elif not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending[event] = data
+            self._condition.notify()
+            waiters = list(self._waiters)
+
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+            waiters = list(self._waiters)
+
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+        self.broadcaster.unsubscribe(self)
+
+    def _pop(self) -> Optional[bytes]:
+        """
+        Next pending event, already encoded. It must be called holding the condition.
+        """
+        if not self._pending:
+            return None
+
+        event, data = self._pending.popitem(last=False)
+        self._pending_since = time.monotonic() if self._pending else None
+        return encode_event(event, data)
+
+    def lag(self) -> float:
+        """
+        Seconds the client has been waiting to read pending events, 0 if it is up to date.
+        """
+        with self._condition:
+            return time.monotonic() - self._pending_since if self._pending else 0
+
+    def events(self, heartbeat: float = None) -> Iterator[bytes]:
+        """
+        Encoded events, including a heartbeat comment if there are no events for a while. It blocks current thread.
+
+        :param heartbeat: Seconds between heartbeats.
+        """
+        heartbeat = heartbeat or settings.STREAM['heartbeat']
+        try:
+            while not self.closed:
+                with self._condition:
+                    if not self._pending and not self.closed:
+                        self._condition.wait(heartbeat)
+                    message = self._pop()
+
+                if not self.closed:
+                    yield message or HEARTBEAT
+        finally:
+            self.close()
+
+    async def async_events(self, heartbeat: float = None) -> AsyncIterator[bytes]:
+        """
+        Async version of events, that waits for events without blocking the event loop.
+
+        :param heartbeat: Seconds between heartbeats.
+        """
+        heartbeat = heartbeat or settings.STREAM['heartbeat']
+        waiter = asyncio.Event()
+        entry = (asyncio.get_event_loop(), waiter)
+        with self._condition:
+            self._waiters.append(entry)
+
+        try:
+            while not self.closed:
+                with self._condition:
+                    message = self._pop()
+                    if message is None:
+                        waiter.clear()
+
+                if message is None:
+                    try:
+                        await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+                        continue
+                    except asyncio.TimeoutError:
+                        message = HEARTBEAT
+
+                if not self.closed:
+                    yield message
+        finally:
+            with self._condition:
+                self._waiters.remove(entry)
+            self.close()
+
+
+class Broadcaster:
+    """
+    Builds events periodically from a background thread, while there are subscribers, and publishes them to all
+    subscribers only when their value changes. New subscribers receive the last value of all events.
+    """
+    def __init__(self, sources: Dict[str, Callable[[], bytes]], name: str = 'broadcaster', interval: float = None):
+        """
+        :param sources: Functions that build the encoded data of each event.
+        :param name: Producer thread name.
+        :param interval: Seconds between updates.
+        """
+        self.sources = sources
+        self.name = name
+        self._interval = interval
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._subscribers = []  # type: List[Subscriber]
+        self._last = OrderedDict()  # type: Dict[str, bytes]
+        self.dropped = 0
+
+    @property
+    def interval(self) -> float:
+        return self._interval or settings.STREAM['interval']
+
+    def subscribe(self) -> Subscriber:
+        """
+        Register a new subscriber, starting the producer if needed.
+
+        :return: Subscriber.
+        """
+        subscriber = Subscriber(self)
+        with self._lock:
+            for event, data in self._last.items():
+                subscriber.publish(event, data)
+            self._subscribers.append(subscriber)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _update(self, event: str, source: Callable[[], bytes]):
+        try:
+            data = source()
+        except Exception:
+            logger.exception('Cannot build "%s" event', event)
+            return
+
+        with self._lock:
+            if self._last.get(event) == data:
+                return
+
+            self._last[event] = data
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.publish(event, data)
+
+    def _drop_slow(self):
+        max_lag = settings.STREAM['max_lag']
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            if subscriber.lag() > max_lag:
+                logger.info('Dropping slow subscriber')
+                self.dropped += 1
+                subscriber.close()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Stop producing while nobody listens, last values would be outdated
+                    self._thread = None
+                    self._last.clear()
+                    return
+
+            for event, source in self.sources.items():
+                self._update(event, source)
+
+            self._drop_slow()
+            time.sleep(self.interval)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        return {
+            'subscribers': len(subscribers),
+            'dropped': self.dropped,
+            'coalesced': sum(s.coalesced for s in subscribers),
+        }
@@ -0,0 +1,154 @@
+"""
+Incremental reader for the last lines of growing log files.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['TailReader']
+
+
+class TailReader:
+    """
+    Keeps a window with the last parsed lines of a file. It remembers file inode and offset between calls, so only
+    newly appended lines are read and parsed. First read seeks from the end of the file, and it is read again from the
+    end if the file is rotated or truncated. Listeners are notified with every batch of new entries.
+    """
+    block_size = 8192
+    signature_size = 64
+
+    def __init__(self, path: str, maxlen: int, parse: Callable[[bytes], Any], backfill: int = None):
+        """
+        :param path: File path.
+        :param maxlen: Number of last entries to keep.
+        :param parse: Function that parses a line into an entry.
+        :param backfill: Number of last lines read when the file is opened, maxlen by default.
+        """
+        self.path = path
+        self.maxlen = maxlen
+        self.parse = parse
+        self.backfill = max(backfill or 0, maxlen)
+        self.listeners = []  # type: List[Callable[[List[Any]], None]]
+
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=maxlen)
+        self._inode = None
+        self._offset = 0
+        self._signature = b''
+
+    def _tail_offset(self, f, size: int, lines: int) -> int:
+        """
+        Look for the offset where the last lines of the file begin, reading it backwards by blocks.
+
+        :param f: File opened in binary mode.
+        :param size: File size.
+        :param lines: Number of lines.
+        :return: Offset.
+        """
+        position = size
+        newlines = 0
+        while position > 0:
+            read_size = min(self.block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            newlines += block.count(b'\n')
+            # An extra newline is needed to find where the first line begins
+            if newlines > lines:
+                # Look for the newline that precedes the first wanted line
+                index = -1
+                for _ in range(newlines - lines):
+                    index = block.index(b'\n', index + 1)
+                return position + index + 1
+
+        return 0
+
+    def _is_same_file(self, f, stat: os.stat_result) -> bool:
+        """
+        Check if the file is the one read on last call, comparing its inode, size and the bytes preceding the offset.
+        """
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            return False
+
+        if self._signature:
+            f.seek(self._offset - len(self._signature))
+            if f.read(len(self._signature)) != self._signature:
+                return False
+
+        return True
+
+    def _parse(self, lines: List[bytes]) -> List[Any]:
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+
+            try:
+                entries.append(self.parse(line))
+            except Exception:
+                logger.warning('Cannot parse line from "%s": %s', self.path, line[:100])
+
+        return entries
+
+    def update(self) -> List[Any]:
+        """
+        Read and parse lines appended since last call.
+
+        :return: New entries.
+        """
+        with self._lock:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+
+                if not self._is_same_file(f, stat):
+                    # First read, rotated or truncated file
+                    self._entries.clear()
+                    self._inode = stat.st_ino
+                    self._offset = self._tail_offset(f, stat.st_size, self.backfill)
+                    self._signature = b''
+
+                if stat.st_size <= self._offset:
+                    return []
+
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+
+            # Keep incomplete last line to be read on next call
+            end = data.rfind(b'\n')
+            if end < 0:
+                return []
+
+            self._offset += end + 1
+            self._signature = data[max(0, end + 1 - self.signature_size):end + 1]
+            entries = self._parse(data[:end].split(b'\n'))
+            self._entries.extend(entries)
+
+            for listener in self.listeners:
+                try:
+                    listener(entries)
+                except Exception:
+                    logger.exception('Error notifying new entries from "%s"', self.path)
+
+        return entries
+
+    def subscribe(self, listener: Callable[[List[Any]], None]):
+        """
+        Register a function called with new entries every time they are read.
+
+        :param listener: Function.
+        """
+        self.listeners.append(listener)
+
+    def entries(self) -> List[Any]:
+        """
+        Last entries, including lines appended since last call.
+
+        :return: Parsed entries.
+        """
+        self.update()
+        with self._lock:
+            return list(self._entries)
@@ -0,0 +1,26 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that keeps files written at runtime, such as metrics and rate limiters state, in a temporary directory
+    instead of the working tree.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.path = tempfile.mkdtemp(prefix='barrenero-tests-')
+        settings.METRICS['path'] = f'{self.path}/metrics'
+        settings.RATE_LIMIT['path'] = f'{self.path}/ratelimits'
+        settings.SNAPSHOTS['path'] = f'{self.path}/snapshots'
+        settings.ETHER_HASHRATE_ARCHIVE['path'] = f'{self.path}/hashrate.archive'
+
+    def teardown_test_environment(self, **kwargs):
+        from core import metrics
+
+        metrics.registry.flush()
+        shutil.rmtree(self.path, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
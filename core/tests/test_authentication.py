@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication, CachedUser, TokenCache, token_cache
+from core.models import User
+
+
+def cached_user(pk: int) -> CachedUser:
+    return CachedUser(type('User', (), {'pk': pk, 'username': f'user{pk}', 'account': '0x1', 'is_active': True,
+                                        'is_admin': False, 'is_api_superuser': False}))
+
+
+class TokenCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = TokenCache(size=2, ttl=60)
+        patcher = mock.patch('core.authentication.time.monotonic', return_value=1000.0)
+        self.monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ttl(self):
+        user = cached_user(1)
+        self.cache.set('a', user)
+
+        self.monotonic.return_value = 1060.0
+        self.assertIs(self.cache.get('a'), user)
+
+        self.monotonic.return_value = 1060.1
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', cached_user(1))
+        self.cache.set('b', cached_user(2))
+        # Used recently, so b is evicted instead
+        self.cache.get('a')
+
+        self.cache.set('c', cached_user(3))
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        self.cache.set('a', cached_user(1))
+        self.cache.set('b', cached_user(2))
+
+        self.cache.invalidate('a')
+        self.cache.invalidate('unknown')
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_invalidate_user(self):
+        self.cache.set('a', cached_user(1))
+        self.cache.set('b', cached_user(1))
+
+        self.cache.invalidate_user(1)
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+
+
+class CachedTokenAuthenticationTestCase(TransactionTestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create(username='user', account='0x566d41b925ed1d9f643748d652f4e66593cba9c9')
+        self.key = Token.objects.get(user=self.user).key
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.key)
+
+    def test_cached(self):
+        user, key = self.authenticate()
+
+        self.assertEqual((user.pk, user.username, key), (self.user.pk, 'user', self.key))
+        with self.assertNumQueries(0):
+            self.assertIs(self.authenticate()[0], user)
+
+    def test_user_deactivated(self):
+        self.authenticate()
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_user_changed(self):
+        self.authenticate()
+
+        self.user.is_api_superuser = True
+        self.user.save()
+
+        self.assertTrue(self.authenticate()[0].is_api_superuser)
+
+    def test_user_deleted(self):
+        self.authenticate()
+
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_token_deleted(self):
+        self.authenticate()
+
+        Token.objects.get(key=self.key).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_changes_from_other_processes_after_ttl(self):
+        with mock.patch('core.authentication.time.monotonic', return_value=1000.0):
+            self.authenticate()
+        # Signals are not sent for queryset updates, as with changes made by other processes
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with mock.patch('core.authentication.time.monotonic', return_value=1000.0):
+            self.authenticate()
+
+        with mock.patch('core.authentication.time.monotonic', return_value=1000.0 + token_cache.ttl + 1):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
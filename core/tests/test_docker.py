@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from unittest import mock
+
+from aiohttp import web
+from django.test import SimpleTestCase, override_settings
+
+from core import commands, docker
+from core.tests.utils import BackgroundServer
+from core.views.status import Status
+
+FAKE_DOCKER = '''#!/bin/sh
+# Fake docker command that lists the Ether miner container
+case "$1" in
+    ps) echo barrenero-miner-ether ;;
+esac
+'''
+
+
+class FakeDockerDaemon:
+    """
+    Docker Engine API serving a fixed list of containers and an events stream fed by tests.
+    """
+    def __init__(self, socket_path: str, running):
+        self.running = set(running)
+        self.requests = []
+        self._streams = []
+        app = web.Application()
+        app.router.add_get('/containers/json', self._containers)
+        app.router.add_get('/events', self._events)
+        self.server = BackgroundServer(app, socket_path=socket_path)
+
+    async def _containers(self, request):
+        self.requests.append('containers')
+        return web.json_response([{'Names': [f'/{name}']} for name in sorted(self.running)])
+
+    async def _events(self, request):
+        self.requests.append('events')
+        response = web.StreamResponse()
+        await response.prepare(request)
+        closed = asyncio.Event()
+        self._streams.append((response, closed))
+        await closed.wait()
+        return response
+
+    async def _send(self, event):
+        for response, _ in self._streams:
+            await response.write(json.dumps(event).encode() + b'\n')
+
+    async def _disconnect(self):
+        streams, self._streams = self._streams, []
+        for _, closed in streams:
+            closed.set()
+
+    def send(self, action: str, name: str):
+        self.server.call(self._send({'Type': 'container', 'Action': action, 'Actor': {'Attributes': {'name': name}}}))
+
+    def disconnect(self):
+        self.server.call(self._disconnect())
+
+    def start(self):
+        self.server.start()
+
+    def stop(self):
+        if not self.server.loop.is_closed():
+            self.disconnect()
+        self.server.stop()
+
+
+@override_settings(DOCKER={'socket': '/nonexistent/docker.sock', 'wait': 2, 'reconnect_delay': 0.1})
+class ServiceMonitorTestCase(SimpleTestCase):
+    names = ['barrenero-miner-ether', 'barrenero-miner-storj']
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.daemon = FakeDockerDaemon(os.path.join(self.path, 'docker.sock'), running=['barrenero-miner-ether'])
+        self.daemon.start()
+        self.monitor = docker.ServiceMonitor(socket_path=os.path.join(self.path, 'docker.sock'), names=self.names)
+
+    def tearDown(self):
+        self.monitor.stop()
+        self.daemon.stop()
+        shutil.rmtree(self.path)
+
+    def wait_running(self, expected, timeout: float = 5):
+        start = time.monotonic()
+        running = self.monitor.running()
+        while running != expected and time.monotonic() - start < timeout:
+            time.sleep(0.02)
+            running = self.monitor.running()
+        return running
+
+    def test_subscribe_before_listing(self):
+        running = self.monitor.running(wait=5)
+
+        self.assertEqual(running, {'barrenero-miner-ether'})
+        self.assertEqual(self.daemon.requests[:2], ['events', 'containers'])
+
+    def test_apply_events(self):
+        self.monitor.running(wait=5)
+
+        self.daemon.send('start', 'barrenero-miner-storj')
+        self.assertEqual(self.wait_running({'barrenero-miner-ether', 'barrenero-miner-storj'}),
+                         {'barrenero-miner-ether', 'barrenero-miner-storj'})
+
+        self.daemon.send('die', 'barrenero-miner-ether')
+        self.assertEqual(self.wait_running({'barrenero-miner-storj'}), {'barrenero-miner-storj'})
+
+    def test_ignore_unknown_events(self):
+        self.monitor.running(wait=5)
+
+        self.daemon.send('exec_start', 'barrenero-miner-storj')
+        self.daemon.send('start', 'other-container')
+        self.daemon.send('stop', 'barrenero-miner-ether')
+
+        self.assertEqual(self.wait_running(set()), set())
+
+    def test_reset_on_disconnect(self):
+        self.monitor.running(wait=5)
+        # Daemon goes away, so the monitor cannot reconnect
+        self.daemon.stop()
+        os.remove(self.daemon.server.socket_path)
+
+        self.assertIsNone(self.wait_running(None))
+
+    def test_list_again_on_reconnect(self):
+        self.monitor.running(wait=5)
+
+        self.daemon.running.add('barrenero-miner-storj')
+        self.daemon.disconnect()
+
+        self.assertEqual(self.wait_running({'barrenero-miner-ether', 'barrenero-miner-storj'}),
+                         {'barrenero-miner-ether', 'barrenero-miner-storj'})
+        self.assertEqual(self.daemon.requests.count('containers'), 2)
+
+
+@override_settings(DOCKER={'socket': '/nonexistent/docker.sock', 'wait': 0, 'reconnect_delay': 60},
+                   SUBPROCESS={'timeout': 5, 'ttl': 0})
+class DockerFallbackTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        command = os.path.join(self.path, 'docker')
+        with open(command, 'w') as f:
+            f.write(FAKE_DOCKER)
+        os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def services_status(self):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(Status()._services_status())
+        finally:
+            loop.close()
+
+    def test_docker_ps_when_state_unknown(self):
+        with mock.patch.object(docker.monitor, 'running', return_value=None), \
+                mock.patch.dict(os.environ, {'PATH': f'{self.path}:{os.environ["PATH"]}'}), \
+                mock.patch.object(commands.runner, '_cache', {}):
+            services = self.services_status()
+
+        self.assertEqual(services, [{'name': 'Ether', 'status': 'active'}, {'name': 'Storj', 'status': 'inactive'}])
+
+    def test_monitor_state(self):
+        with mock.patch.object(docker.monitor, 'running', return_value={'barrenero-miner-storj'}), \
+                mock.patch.dict(os.environ, {'PATH': self.path}):
+            services = self.services_status()
+
+        self.assertEqual(services, [{'name': 'Ether', 'status': 'inactive'}, {'name': 'Storj', 'status': 'active'}])
@@ -0,0 +1,70 @@
+import datetime
+import unittest
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+from core.renderers import FastJSONRenderer
+from core.serializers.compiled import output_serializer
+from core.serializers.wallet import Wallet
+from core.tests.utils import wallet_data
+
+
+class IsSafeFloatTestCase(SimpleTestCase):
+    def test_safe(self):
+        for value in (0.0, -0.0, 1e-4, 0.1, 1 / 3, 123.456, 2.0 ** 53, 9999999999999998.0, -12345678.9):
+            self.assertTrue(fastjson.is_safe_float(value), value)
+
+    def test_unsafe(self):
+        for value in (1e-5, -1e-7, 1e16, -1.5e16, 1e22, float('inf'), float('-inf'), float('nan')):
+            self.assertFalse(fastjson.is_safe_float(value), value)
+
+
+@unittest.skipIf(fastjson.orjson is None, 'orjson is not installed')
+class FastJSONTestCase(SimpleTestCase):
+    def render(self, data):
+        compiled = output_serializer(Wallet, data).data
+        return compiled.serializer.json_safe, FastJSONRenderer().render(compiled), JSONRenderer().render(
+            Wallet(data).data)
+
+    def test_enabled(self):
+        self.assertTrue(fastjson.enabled())
+
+    def test_disabled_by_setting(self):
+        with override_settings(FAST_JSON=False):
+            self.assertFalse(fastjson.enabled())
+            self.assertIsNone(fastjson.dumps({'a': 1}))
+
+    def test_wallet_same_output(self):
+        for size in (0, 10, 1000):
+            safe, fast, drf = self.render(wallet_data(size))
+
+            self.assertTrue(safe)
+            self.assertEqual(fast, drf)
+
+    def test_wallet_unsafe_values_same_output(self):
+        data = wallet_data(10)
+        data['tokens']['TK0']['balance'] = 1e16
+        data['tokens']['TK1']['balance_usd'] = 1e-5
+        data['tokens']['TK2']['name'] = 'Tokén €😀'
+        data['transactions'][0]['value'] = 2.5e22
+        data['transactions'][1]['timestamp'] = datetime.datetime(2018, 5, 1, 10, 30, 15, 123456)
+
+        safe, fast, drf = self.render(data)
+
+        self.assertFalse(safe)
+        self.assertEqual(fast, drf)
+
+    def test_line_separators_escaped(self):
+        data = wallet_data(1)
+        data['tokens']['TK0']['name'] = 'a\u2028b\u2029c'
+
+        safe, fast, drf = self.render(data)
+
+        self.assertTrue(safe)
+        self.assertEqual(fast, drf)
+        self.assertIn(b'a\\u2028b\\u2029c', fast)
+
+    def test_loads_big_integers(self):
+        self.assertEqual(fastjson.loads('{"value": 12345678901234567890123}'), {'value': 12345678901234567890123})
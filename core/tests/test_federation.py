@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from unittest import mock
+
+from aiohttp import web
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from barrenero_api.settings.base import FederationPeersValue
+from core.authentication import CachedUser
+from core.tests.utils import BackgroundServer
+
+STATUS = {
+    'graphics': [{'id': 0, 'power': 120.5, 'fan': 60, 'gpu_usage': 99, 'mem_usage': 80, 'gpu_clock': 1500,
+                  'mem_clock': 4000}],
+    'services': [{'name': 'Ether', 'status': 'active'}, {'name': 'Storj', 'status': 'inactive'}],
+}
+
+ETHER = {
+    'active': True,
+    'hashrate': [{'graphic_card': 0, 'hashrate': 30.0}, {'graphic_card': 1, 'hashrate': 29.0}],
+}
+
+
+class FakePeer:
+    """
+    Barrenero API instance serving fixed status and Ether data under /api/v1/.
+    """
+    def __init__(self, status: int = 200, delay: float = 0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        app = web.Application()
+        app.router.add_get('/api/v1/status/', self._handler(STATUS))
+        app.router.add_get('/api/v1/ether/', self._handler(ETHER))
+        self.server = BackgroundServer(app)
+
+    def _handler(self, data):
+        async def handler(request):
+            self.requests.append((request.path, request.headers.get('Authorization')))
+            await asyncio.sleep(self.delay)
+            if self.status != 200:
+                return web.json_response({'detail': 'Error'}, status=self.status)
+            return web.json_response(data)
+        return handler
+
+    @property
+    def url(self) -> str:
+        return f'{self.server.url}api/v1/'
+
+
+class FederationPeersValueTestCase(SimpleTestCase):
+    def test_trailing_slash(self):
+        environ = {'DJANGO_FEDERATION_PEERS': 'rig1,http://rig1/api/v1,token1;rig2,http://rig2/api/v1/,token2'}
+        with mock.patch.dict(os.environ, environ):
+            peers = FederationPeersValue((), environ_name='FEDERATION_PEERS')
+
+        self.assertEqual(peers, (('rig1', 'http://rig1/api/v1/', 'token1'), ('rig2', 'http://rig2/api/v1/', 'token2')))
+
+
+class FederationTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.healthy = FakePeer()
+        cls.failing = FakePeer(status=503)
+        cls.slow = FakePeer(delay=2)
+        for peer in (cls.healthy, cls.failing, cls.slow):
+            peer.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for peer in (cls.healthy, cls.failing, cls.slow):
+            peer.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CachedUser(type('User', (), {
+            'pk': 1, 'username': 'admin', 'account': '0x1', 'is_active': True, 'is_admin': True,
+            'is_api_superuser': True,
+        })))
+        peers = (
+            ('rig1', self.healthy.url, 'token1'),
+            ('rig2', self.failing.url, 'token2'),
+            ('rig3', self.slow.url, 'token3'),
+        )
+        self.override = override_settings(FEDERATION={'peers': peers, 'timeout': 0.5})
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+
+    def test_status(self):
+        response = self.client.get(reverse('core:v1:federation:status'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['graphics'], 1)
+        self.assertEqual(data['services'], [{'name': 'Ether', 'active': 1, 'inactive': 0},
+                                            {'name': 'Storj', 'active': 0, 'inactive': 1}])
+        self.assertEqual([(r['name'], r['available'], r['error']) for r in data['rigs']],
+                         [('rig1', True, None), ('rig2', False, 'HTTP 503'), ('rig3', False, 'Timeout')])
+        self.assertIn(('/api/v1/status/', 'Token token1'), self.healthy.requests)
+
+    def test_ether(self):
+        response = self.client.get(reverse('core:v1:federation:ether'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['active'], 1)
+        self.assertEqual(data['hashrate'], 59.0)
+        self.assertEqual([r['hashrate'] for r in data['rigs']], [59.0, None, None])
+
+    def test_peers_queried_concurrently(self):
+        with override_settings(FEDERATION={'peers': (('rig3', self.slow.url, 't'), ('rig4', self.slow.url, 't')),
+                                           'timeout': 0.5}):
+            start = time.monotonic()
+            self.client.get(reverse('core:v1:federation:status'))
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1)
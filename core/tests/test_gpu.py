@@ -0,0 +1,109 @@
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from core.gpu import NvidiaSmiSampler
+
+FAKE_NVIDIA_SMI = '''#!/bin/sh
+# Prints two samples of {cards} graphic cards and exits, counting its runs
+echo run >> "{runs}"
+for sample in 1 2; do
+    echo "0, 120.50 W, 60 %, 99 %, 80 %, 1500 MHz, 4000 MHz"
+    if [ {cards} -gt 1 ]; then
+        echo "1, 110.00 W, 55 %, 98 %, 79 %, 1490 MHz, 4000 MHz"
+    fi
+done
+'''
+
+
+class NvidiaSmiSamplerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.runs = os.path.join(self.path, 'runs')
+        self.sampler = None
+
+    def tearDown(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+        shutil.rmtree(self.path)
+
+    def fake_command(self, cards: int = 2) -> str:
+        command = os.path.join(self.path, 'nvidia-smi')
+        with open(command, 'w') as f:
+            f.write(FAKE_NVIDIA_SMI.format(cards=cards, runs=self.runs))
+        os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+        return command
+
+    def wait_runs(self, runs: int, timeout: float = 5) -> int:
+        start = time.monotonic()
+        count = 0
+        while time.monotonic() - start < timeout:
+            if os.path.exists(self.runs):
+                with open(self.runs) as f:
+                    count = len(f.readlines())
+                if count >= runs:
+                    break
+            time.sleep(0.05)
+        return count
+
+    def test_parse_line(self):
+        expected = {
+            'id': '0',
+            'power': '120.50',
+            'fan': '60',
+            'gpu_usage': '99',
+            'mem_usage': '80',
+            'gpu_clock': '1500',
+            'mem_clock': '4000',
+        }
+
+        self.assertEqual(NvidiaSmiSampler.parse_line('0, 120.50 W, 60 %, 99 %, 80 %, 1500 MHz, 4000 MHz\n'), expected)
+
+    def test_command(self):
+        sampler = NvidiaSmiSampler(command='/usr/bin/nvidia-smi -i 0', loop_ms=500)
+
+        self.assertEqual(sampler.command[:3], ['/usr/bin/nvidia-smi', '-i', '0'])
+        self.assertIn('--loop-ms=500', sampler.command)
+        self.assertIn('--format=csv,noheader', sampler.command)
+
+    def test_sample_published_on_repeated_id(self):
+        with override_settings(NVIDIA_SMI={'command': self.fake_command(cards=2), 'loop_ms': 10, 'history': 10,
+                                           'wait': 2, 'max_age': 10, 'restart_delay': 60}):
+            self.sampler = NvidiaSmiSampler()
+            latest = self.sampler.latest(wait=5)
+            self.wait_runs(1)
+            time.sleep(0.2)
+
+            self.assertEqual([c['id'] for c in latest], ['0', '1'])
+            self.assertEqual(latest[1]['power'], '110.00')
+            # First sample is published when id 0 is repeated and the second one when its expected size is reached
+            self.assertEqual([[c['id'] for c in s] for _, s in self.sampler.history()], [['0', '1'], ['0', '1']])
+
+    def test_single_card_samples(self):
+        with override_settings(NVIDIA_SMI={'command': self.fake_command(cards=1), 'loop_ms': 10, 'history': 10,
+                                           'wait': 2, 'max_age': 10, 'restart_delay': 60}):
+            self.sampler = NvidiaSmiSampler()
+            latest = self.sampler.latest(wait=5)
+
+            self.assertEqual([c['id'] for c in latest], ['0'])
+
+    def test_restart_when_process_exits(self):
+        with override_settings(NVIDIA_SMI={'command': self.fake_command(), 'loop_ms': 10, 'history': 10,
+                                           'wait': 2, 'max_age': 10, 'restart_delay': 0.1}):
+            self.sampler = NvidiaSmiSampler()
+            self.sampler.start()
+
+            self.assertGreaterEqual(self.wait_runs(3), 3)
+            self.assertGreaterEqual(self.sampler.restarts, 2)
+            self.assertIsNotNone(self.sampler.latest())
+
+    def test_command_not_found(self):
+        with override_settings(NVIDIA_SMI={'command': os.path.join(self.path, 'missing'), 'loop_ms': 10,
+                                           'history': 10, 'wait': 2, 'max_age': 10, 'restart_delay': 60}):
+            self.sampler = NvidiaSmiSampler()
+
+            self.assertIsNone(self.sampler.latest(wait=0.2))
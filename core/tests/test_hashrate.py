@@ -0,0 +1,245 @@
+import datetime
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.archive import HashrateArchive
+from core.hashrate import HashrateEngine, HashrateSeries, to_timestamp
+from core.management.commands.barrenero_collector import compact_hashrate_archive
+from core.serializers.ether.hashrate import HashrateQuery
+from core.views.ether.hashrate import Hashrate
+
+NOW = datetime.datetime(2018, 6, 3, 12, 0)
+
+
+def write_log(path: str, entries):
+    with open(path, 'a') as f:
+        for timestamp, value in entries:
+            f.write(json.dumps({'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'), 'value': value}) + '\n')
+
+
+class BruteForceSeries:
+    """
+    Reference implementation of HashrateSeries statistics, computed from all samples on every query.
+    """
+    def __init__(self, window: float, halflife: float, resolution: float):
+        self.window = window
+        self.halflife = halflife
+        self.resolution = resolution
+        self.samples = []
+        self.ewma = None
+
+    def append(self, timestamp: float, value: float):
+        if self.samples and timestamp <= self.samples[-1][0]:
+            return
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            alpha = 1 - 2 ** (-(timestamp - self.samples[-1][0]) / self.halflife)
+            self.ewma += alpha * (value - self.ewma)
+        self.samples.append((timestamp, value))
+
+    def stats(self):
+        last = self.samples[-1][0]
+        values = [v for t, v in self.samples if t >= last - self.window]
+        binned = sorted(round(v / self.resolution) * self.resolution for v in values)
+
+        def percentile(percent):
+            return binned[max(1, math.ceil(percent / 100 * len(binned))) - 1]
+
+        return {
+            'samples': len(values),
+            'mean': sum(values) / len(values),
+            'ewma': self.ewma,
+            'min': min(values),
+            'max': max(values),
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+        }
+
+    def history(self, start: float, end: float, bucket: int):
+        buckets = {}
+        for t, v in self.samples:
+            if start <= t <= end:
+                buckets.setdefault(t - t % bucket, []).append(v)
+
+        return [{'timestamp': datetime.datetime.utcfromtimestamp(b), 'samples': len(values),
+                 'mean': sum(values) / len(values), 'min': min(values), 'max': max(values)}
+                for b, values in sorted(buckets.items())]
+
+
+class HashrateSeriesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+
+    def samples(self, count: int, start: float = 1527811200):
+        timestamp = start
+        for _ in range(count):
+            # Irregular intervals, including gaps longer than the window
+            timestamp += self.random.choice((1, 5, 10, 30, 10, 5, 700))
+            yield timestamp, round(self.random.uniform(20, 35), 3)
+
+    def assertStatsEqual(self, stats, expected):
+        self.assertEqual(stats['samples'], expected['samples'])
+        for key in ('mean', 'ewma', 'min', 'max', 'p50', 'p90', 'p99'):
+            self.assertAlmostEqual(stats[key], expected[key], places=6, msg=key)
+
+    def test_empty(self):
+        series = HashrateSeries(window=600, retention=3600, halflife=60, resolution=0.01)
+
+        self.assertEqual(series.stats(), {'samples': 0, **dict.fromkeys(('mean', 'ewma', 'min', 'max', 'p50', 'p90',
+                                                                          'p99'))})
+        self.assertEqual(series.history(0, 2000000000, 60), [])
+
+    def test_stats(self):
+        series = HashrateSeries(window=600, retention=3600, halflife=60, resolution=0.01)
+        reference = BruteForceSeries(window=600, halflife=60, resolution=0.01)
+
+        for timestamp, value in self.samples(3000):
+            series.append(timestamp, value)
+            reference.append(timestamp, value)
+            self.assertStatsEqual(series.stats(), reference.stats())
+
+    def test_monotonic_values(self):
+        series = HashrateSeries(window=100, retention=100, halflife=60, resolution=1)
+        reference = BruteForceSeries(window=100, halflife=60, resolution=1)
+
+        # Increasing and then decreasing values exercise both ends of min and max queues
+        for i, value in enumerate(list(range(50)) + list(range(50, 0, -1))):
+            series.append(i * 10, value)
+            reference.append(i * 10, value)
+            self.assertStatsEqual(series.stats(), reference.stats())
+
+    def test_older_samples_ignored(self):
+        series = HashrateSeries(window=600, retention=3600, halflife=60, resolution=0.01)
+        series.append(1000, 30)
+        series.append(1000, 10)
+        series.append(900, 10)
+
+        self.assertEqual(series.stats()['samples'], 1)
+        self.assertEqual(series.stats()['min'], 30)
+
+    def test_retention(self):
+        series = HashrateSeries(window=600, retention=3600, halflife=60, resolution=0.01)
+        reference = BruteForceSeries(window=600, halflife=60, resolution=0.01)
+
+        for timestamp, value in self.samples(5000):
+            series.append(timestamp, value)
+            reference.append(timestamp, value)
+
+        last = reference.samples[-1][0]
+        retained = [t for t, _ in reference.samples if t >= last - 3600]
+        # Expired samples are compacted once they are half of the arrays
+        self.assertLessEqual(len(series.timestamps), 2 * len(retained) + 1)
+        self.assertGreaterEqual(series.timestamps[0], reference.samples[0][0])
+        self.assertStatsEqual(series.stats(), reference.stats())
+
+        for bucket in (60, 300, 3600):
+            self.assertEqual(series.history(last - 3600, last, bucket), reference.history(last - 3600, last, bucket))
+
+
+class HashrateEngineTestCase(SimpleTestCase):
+    def test_query(self):
+        engine = HashrateEngine(window=600, retention=3600, halflife=60, resolution=0.01)
+        engine.feed([
+            {'timestamp': NOW, 'value': {'gpu0': 30, 'gpu1': 20}},
+            {'timestamp': NOW + datetime.timedelta(seconds=60), 'value': {'gpu0': 32, 'gpu1': 22, 'gpu2': 10}},
+        ])
+
+        graphic_cards = engine.query(600, 60, to_timestamp(NOW) + 60)
+
+        self.assertEqual(engine.names(), ['gpu0', 'gpu1', 'gpu2'])
+        self.assertEqual([gc['graphic_card'] for gc in graphic_cards], [0, 1, 2])
+        self.assertEqual([(gc['stats']['samples'], gc['stats']['mean']) for gc in graphic_cards],
+                         [(2, 31), (2, 21), (1, 10)])
+        self.assertEqual([len(gc['history']) for gc in graphic_cards], [2, 2, 1])
+
+
+class ArchivedQueryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.log = os.path.join(self.path, 'values.log')
+        self.archive = HashrateArchive(os.path.join(self.path, 'hashrate.archive'))
+        self.engine = HashrateEngine(window=3600, retention=86400, halflife=300, resolution=0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def query(self, window: int, bucket: int):
+        with mock.patch('core.views.ether.hashrate.hashrate_archive', self.archive), \
+                mock.patch('core.views.ether.hashrate.hashrate_engine', self.engine):
+            return Hashrate()._archived_query(window, bucket, to_timestamp(NOW))
+
+    def test_merge_by_name(self):
+        # Archive columns and engine series are in a different order, and a graphic card is only archived
+        old = NOW - datetime.timedelta(days=2)
+        write_log(self.log, [(old, {'gpu1': 10, 'gpu0': 20}), (old + datetime.timedelta(seconds=10), {'gpu2': 5})])
+        self.archive.compact(self.log)
+        self.engine.feed([{'timestamp': NOW - datetime.timedelta(minutes=30), 'value': {'gpu0': 21, 'gpu1': 11}}])
+
+        graphic_cards = self.query(3 * 86400, 3600)
+
+        self.assertEqual([gc['graphic_card'] for gc in graphic_cards], [0, 1, 2])
+        self.assertEqual([[b['mean'] for b in gc['history']] for gc in graphic_cards], [[20, 21], [10, 11], [5]])
+        self.assertEqual([gc['stats']['samples'] for gc in graphic_cards], [1, 1, 0])
+
+    def test_no_archive(self):
+        self.engine.feed([{'timestamp': NOW - datetime.timedelta(minutes=30), 'value': {'gpu0': 21}}])
+
+        graphic_cards = self.query(3 * 86400, 3600)
+
+        self.assertEqual([[b['mean'] for b in gc['history']] for gc in graphic_cards], [[21]])
+
+
+class HashrateQueryTestCase(SimpleTestCase):
+    def test_max_window(self):
+        query = HashrateQuery(data={'window': 60 * 60 * 24 * 400, 'bucket': '1d'})
+
+        self.assertFalse(query.is_valid())
+        self.assertIn('window', query.errors)
+
+    @override_settings(ETHER_HASHRATE={'window': 3600, 'retention': 86400, 'halflife': 300, 'resolution': 0.01,
+                                       'backfill': 10000, 'max_buckets': 24})
+    def test_max_buckets(self):
+        self.assertTrue(HashrateQuery(data={'window': 86400, 'bucket': '1h'}).is_valid())
+
+        query = HashrateQuery(data={'window': 86400, 'bucket': '1m'})
+        self.assertFalse(query.is_valid())
+        self.assertIn('window', query.errors)
+
+
+class CollectorCompactionTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.log = os.path.join(self.path, 'values.log')
+        self.archive = HashrateArchive(os.path.join(self.path, 'hashrate.archive'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def compact(self):
+        with override_settings(ETHER_VALUES_LOG={'path': self.log, 'entries': 30}), \
+                mock.patch('core.management.commands.barrenero_collector.hashrate_archive', self.archive):
+            compact_hashrate_archive()
+
+    def test_compact(self):
+        write_log(self.log, [(NOW, {'gpu0': 20})])
+        self.compact()
+        write_log(self.log, [(NOW + datetime.timedelta(seconds=10), {'gpu0': 21})])
+        self.compact()
+
+        _, columns = self.archive.range(0, to_timestamp(NOW) + 60)
+        self.assertEqual(columns, {'gpu0': [20, 21]})
+
+    def test_no_values_log(self):
+        self.compact()
+
+        self.assertFalse(os.path.exists(self.archive.path))
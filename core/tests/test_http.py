@@ -0,0 +1,69 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from django.test import SimpleTestCase
+
+from core.http import ClientPool, _connections
+from core.tests.utils import BackgroundServer
+
+
+class ClientPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        app = web.Application()
+        app.router.add_get('/', self._handler)
+        self.server = BackgroundServer(app).start()
+        self.addCleanup(self.server.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.pool = ClientPool()
+        self.addCleanup(self.pool.close)
+
+    async def _handler(self, request):
+        return web.json_response({'ok': True})
+
+    async def _get(self):
+        async with self.pool.session().get(self.server.url) as response:
+            return await response.json()
+
+    def test_connector_internals(self):
+        # Pool inspects aiohttp private attributes, this fails if an upgrade removes them
+        async def inspect():
+            async with aiohttp.ClientSession() as session:
+                connector = session.connector
+                conns, acquired = getattr(connector, '_conns', None), getattr(connector, '_acquired', None)
+                return conns, acquired, _connections(connector)
+
+        conns, acquired, connections = self.loop.run_until_complete(inspect())
+
+        self.assertIsInstance(conns, dict)
+        self.assertIsNotNone(acquired)
+        self.assertEqual(connections, ([], []))
+
+    def test_stats(self):
+        self.assertEqual(self.loop.run_until_complete(self._get()), {'ok': True})
+        self.loop.run_until_complete(self._get())
+
+        stats = self.pool.stats()
+
+        self.assertEqual(stats['sessions'], 1)
+        self.assertEqual(stats['idle_connections'], 1)
+        self.assertEqual(stats['acquired_connections'], 0)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['connections_reused'], 1)
+        self.assertEqual(stats['reuse_ratio'], 0.5)
+        self.assertGreater(stats['limit'], 0)
+        self.assertGreater(stats['limit_per_host'], 0)
+
+    def test_discard_closed_loop(self):
+        self.loop.run_until_complete(self._get())
+        session = next(iter(self.pool._sessions.values()))
+        (protocol,), _ = _connections(session.connector)
+        sock = protocol.transport.get_extra_info('socket')
+
+        self.loop.close()
+        self.pool.close()
+
+        self.assertEqual(sock.fileno(), -1)
+        self.assertTrue(session.closed)
+        self.assertEqual(self.pool.stats()['sessions'], 0)
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.authentication import CachedUser
+from core.jobs import JobQueue
+from core.snapshots import SnapshotStore
+
+
+@override_settings(JOBS={'workers': 2, 'timeout': 5, 'ttl': 60})
+class JobQueueTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = SnapshotStore(path=self.path)
+        # A single worker, so jobs run in submission order
+        self.jobs = JobQueue(store=self.store, workers=1)
+
+    def tearDown(self):
+        self.jobs.executor.shutdown()
+        shutil.rmtree(self.path)
+
+    def run_job(self, key: str = 'service', result: dict = None):
+        job = self.jobs.submit(key, lambda: result or {'error': None})
+        self.jobs.executor.submit(lambda: None).result(timeout=5)
+        return self.jobs.get(job['id'])
+
+    def test_run(self):
+        job = self.run_job()
+
+        self.assertEqual(job['status'], JobQueue.SUCCEEDED)
+        self.assertEqual(job['pid_start'], self.jobs._process_start(os.getpid()))
+
+    def test_active_job_returned(self):
+        release = threading.Event()
+        job = self.jobs.submit('service', lambda: release.wait(5) and {})
+
+        self.assertEqual(self.jobs.submit('service', lambda: {})['id'], job['id'])
+        release.set()
+
+    def test_pid_reused(self):
+        job = self.jobs._update({'id': 'lost', 'key': 'service', 'status': JobQueue.RUNNING, 'pid': os.getpid(),
+                                 'pid_start': self.jobs._process_start(os.getpid()) + 1, 'submitted': None,
+                                 'started': None, 'finished': None, 'error': None})
+
+        job = self.jobs.get(job['id'])
+
+        self.assertEqual(job['status'], JobQueue.FAILED)
+        self.assertEqual(job['error'], 'Worker process died')
+
+    def test_finished_jobs_pruned(self):
+        job = self.run_job()
+
+        with override_settings(JOBS={'workers': 2, 'timeout': 5, 'ttl': 0}):
+            self.assertIsNone(self.jobs.get(job['id']))
+            self.assertEqual(self.jobs.prune(), 1)
+
+        self.assertEqual(self.store.keys(), [])
+
+    def test_recent_jobs_kept(self):
+        job = self.run_job()
+
+        self.assertEqual(self.jobs.prune(), 0)
+        self.assertEqual(self.jobs.get(job['id'])['status'], JobQueue.SUCCEEDED)
+
+
+class RestartServiceTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.client = APIClient()
+        self.client.force_authenticate(CachedUser(type('User', (), {
+            'pk': 1, 'username': 'admin', 'account': '0x1', 'is_active': True, 'is_admin': True,
+            'is_api_superuser': True,
+        })))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_absolute_location(self):
+        jobs = JobQueue(store=SnapshotStore(path=self.path), workers=1)
+        with mock.patch('core.views.restart.jobs', jobs), \
+                mock.patch('core.views.restart.restart_service', return_value={'error': None}):
+            response = self.client.post(reverse('core:v1:restart'), {'name': 'Ether'})
+            jobs.executor.shutdown()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], f'http://testserver/api/v1/restart/{response.json()["id"]}/')
@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.metrics import ARCHIVE, Registry
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+class RegistryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.registry = Registry(path=self.path)
+        # Metrics are flushed by tests instead of a background thread
+        patcher = mock.patch('core.metrics.threading.Thread')
+        self.thread = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requests = self.registry.counter('test_requests_total', 'Requests.', ('view',))
+        self.queued = self.registry.gauge('test_queued', 'Queued calls.')
+        self.duration = self.registry.histogram('test_duration_seconds', 'Duration.', buckets=(0.1, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, pid: int, samples):
+        with open(os.path.join(self.path, f'{pid}.json'), 'w') as f:
+            json.dump(samples, f)
+
+    def read(self, name: str):
+        with open(os.path.join(self.path, name)) as f:
+            return sorted(map(tuple, json.load(f)), key=repr)
+
+    def test_flush(self):
+        self.requests.inc(view='status')
+        self.requests.inc(2, view='status')
+        self.queued.inc()
+
+        self.registry.flush()
+
+        self.assertEqual(self.read(f'{os.getpid()}.json'), sorted([
+            ('test_requests_total', '', [['view', 'status']], 3),
+            ('test_queued', '', [], 1),
+        ], key=repr))
+
+    def test_render(self):
+        self.requests.inc(view='status')
+        self.duration.observe(0.5)
+
+        self.assertEqual(self.registry.render(), '\n'.join([
+            '# HELP test_requests_total Requests.',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{view="status"} 1',
+            '# HELP test_queued Queued calls.',
+            '# TYPE test_queued gauge',
+            '# HELP test_duration_seconds Duration.',
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{le="1"} 1',
+            'test_duration_seconds_bucket{le="+Inf"} 1',
+            'test_duration_seconds_count 1',
+            'test_duration_seconds_sum 0.5',
+        ]) + '\n')
+
+    def test_aggregate_processes(self):
+        self.requests.inc(view='status')
+        # Parent process is running, so its metrics are aggregated
+        self.write(os.getppid(), [['test_requests_total', '', [['view', 'status']], 2],
+                                  ['test_requests_total', '', [['view', 'ether']], 1]])
+
+        samples = self.registry.collect()
+
+        self.assertEqual(samples[('test_requests_total', '', (('view', 'status'),))], 3)
+        self.assertEqual(samples[('test_requests_total', '', (('view', 'ether'),))], 1)
+        self.assertTrue(os.path.exists(os.path.join(self.path, f'{os.getppid()}.json')))
+
+    def test_archive_dead_processes(self):
+        pid = dead_pid()
+        self.write(pid, [['test_requests_total', '', [['view', 'status']], 2], ['test_queued', '', [], 5]])
+
+        self.assertEqual(self.registry._dead_files(), [os.path.join(self.path, f'{pid}.json')])
+        self.registry.collect()
+
+        # Counters are kept in the archive, and gauges of dead processes are dropped
+        self.assertFalse(os.path.exists(os.path.join(self.path, f'{pid}.json')))
+        self.assertEqual(self.read(ARCHIVE), [('test_requests_total', '', [['view', 'status']], 2)])
+
+        self.write(dead_pid(), [['test_requests_total', '', [['view', 'status']], 3]])
+        self.requests.inc(view='status')
+        samples = self.registry.collect()
+
+        self.assertEqual(self.read(ARCHIVE), [('test_requests_total', '', [['view', 'status']], 5)])
+        self.assertEqual(samples[('test_requests_total', '', (('view', 'status'),))], 6)
+
+    def test_previous_process_with_same_pid(self):
+        self.write(os.getpid(), [['test_requests_total', '', [['view', 'status']], 4]])
+        self.requests.inc(view='status')
+
+        self.registry.flush()
+
+        self.assertEqual(self.read(ARCHIVE), [('test_requests_total', '', [['view', 'status']], 4)])
+        self.assertEqual(self.read(f'{os.getpid()}.json'), [('test_requests_total', '', [['view', 'status']], 1)])
+
+    def test_reset_in_child_process(self):
+        self.requests.inc(view='status')
+        # Samples belong to another process, as if they were inherited through fork
+        self.registry._pid = dead_pid()
+
+        self.requests.inc(view='ether')
+
+        self.assertEqual(self.thread.return_value.start.call_count, 2)
+        self.assertEqual(self.registry._samples, {('test_requests_total', '', (('view', 'ether'),)): 1})
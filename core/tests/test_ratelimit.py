@@ -0,0 +1,139 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core import ratelimit
+from core.ratelimit import BACKGROUND, INTERACTIVE, RateLimitExceeded, RateLimiter, get_limiter
+
+
+class RateLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.limiter = RateLimiter('test', rate=10, burst=3, reserve=1, path=self.path)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.path)
+
+    def acquire(self, call_priority: str, budget: float = 0):
+        self.loop.run_until_complete(self.limiter.acquire(call_priority, budget=budget))
+
+    def test_burst(self):
+        for _ in range(3):
+            self.acquire(INTERACTIVE)
+
+        with self.assertRaises(RateLimitExceeded):
+            self.acquire(INTERACTIVE)
+
+    def test_reserve(self):
+        for _ in range(2):
+            self.acquire(BACKGROUND)
+
+        with self.assertRaises(RateLimitExceeded):
+            self.acquire(BACKGROUND)
+        self.acquire(INTERACTIVE)
+
+    def test_wait(self):
+        for _ in range(3):
+            self.acquire(INTERACTIVE)
+
+        self.acquire(INTERACTIVE, budget=1)
+
+        self.assertEqual(self.limiter.stats()['waited'], 1)
+
+    def test_state_file_out_of_event_loop(self):
+        threads = []
+        take = self.limiter._take
+
+        def record(call_priority):
+            threads.append(threading.current_thread())
+            return take(call_priority)
+
+        with mock.patch.object(self.limiter, '_take', record):
+            self.acquire(INTERACTIVE)
+
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_refill(self):
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            for _ in range(3):
+                self.assertEqual(self.limiter._take(INTERACTIVE), 0)
+            self.assertAlmostEqual(self.limiter._take(INTERACTIVE), 0.1)
+
+        # 10 tokens per second, so a token is back after 0.1 seconds, and the bucket is never over its size
+        with mock.patch('core.ratelimit.time.time', return_value=1000.1):
+            self.assertEqual(self.limiter._take(INTERACTIVE), 0)
+            self.assertAlmostEqual(self.limiter._take(INTERACTIVE), 0.1)
+        with mock.patch('core.ratelimit.time.time', return_value=2000.0):
+            for _ in range(3):
+                self.assertEqual(self.limiter._take(INTERACTIVE), 0)
+            self.assertGreater(self.limiter._take(INTERACTIVE), 0)
+
+    def test_reserve_wait(self):
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.limiter._take(INTERACTIVE)
+            self.limiter._take(INTERACTIVE)
+
+            # A token is left, but it is reserved, so background calls wait until there are two
+            self.assertAlmostEqual(self.limiter._take(BACKGROUND), 0.1)
+            self.assertEqual(self.limiter._take(INTERACTIVE), 0)
+
+    def test_shared_state(self):
+        other = RateLimiter('test', rate=10, burst=3, reserve=1, path=self.path)
+        for _ in range(3):
+            self.acquire(INTERACTIVE)
+
+        with self.assertRaises(RateLimitExceeded):
+            self.loop.run_until_complete(other.acquire(INTERACTIVE, budget=0))
+
+    def test_priority(self):
+        self.assertEqual(ratelimit.current_priority(), INTERACTIVE)
+        with ratelimit.priority(BACKGROUND):
+            self.assertEqual(ratelimit.current_priority(), BACKGROUND)
+        self.assertEqual(ratelimit.current_priority(), INTERACTIVE)
+
+
+class GetLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.override = override_settings(RATE_LIMIT={
+            'path': self.path,
+            'upstreams': {'ETHERSCAN': {'rate': 10, 'burst': 1}},
+            'wait': {INTERACTIVE: 0, BACKGROUND: 0},
+        })
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.path)
+
+    def acquire(self, limiter: RateLimiter):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(limiter.acquire(INTERACTIVE))
+        finally:
+            loop.close()
+
+    def test_not_limited(self):
+        self.assertIsNone(get_limiter('ETHPLORER'))
+
+    def test_per_key(self):
+        with override_settings(ETHERSCAN={'url': 'http://etherscan', 'token': 'key1'}):
+            first = get_limiter('ETHERSCAN')
+        with override_settings(ETHERSCAN={'url': 'http://etherscan', 'token': 'key2'}):
+            second = get_limiter('ETHERSCAN')
+            self.assertIs(get_limiter('ETHERSCAN'), second)
+
+        self.assertNotEqual(first.name, second.name)
+        self.assertNotIn('key1', first.name)
+
+        # Each key has its own bucket
+        self.acquire(first)
+        self.acquire(second)
+        with self.assertRaises(RateLimitExceeded):
+            self.acquire(first)
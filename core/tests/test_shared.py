@@ -0,0 +1,97 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase, override_settings
+
+from core.shared import SharedCache
+from core.snapshots import SnapshotStore
+
+
+class SharedCacheUpdateTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = SharedCache(store=SnapshotStore(path=self.path))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_update(self):
+        self.assertEqual(self.cache.update('tokens', lambda current: {**(current or {}), 'a': 1}), {'a': 1})
+        self.assertEqual(self.cache.update('tokens', lambda current: {**(current or {}), 'b': 2}), {'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get('tokens').data, {'a': 1, 'b': 2})
+
+    def test_unchanged_value_not_written(self):
+        self.cache.update('tokens', lambda current: {'a': 1})
+        version = self.cache.get('tokens').version
+
+        self.cache.update('tokens', lambda current: current)
+
+        self.assertEqual(self.cache.get('tokens').version, version)
+
+    def test_concurrent_updates_not_lost(self):
+        barrier = threading.Barrier(10)
+
+        def add(key):
+            barrier.wait()
+            for i in range(5):
+                self.cache.update('tokens', lambda current: {**(current or {}), f'{key}-{i}': i})
+
+        threads = [threading.Thread(target=add, args=(n,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.cache.get('tokens').data), 50)
+
+
+@override_settings(SHARED_CACHE={'price_ttl': 60, 'tokens_ttl': 300, 'wait': 2})
+class SharedCacheRefreshTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = SharedCache(store=SnapshotStore(path=self.path))
+        self.loop = asyncio.new_event_loop()
+        # Fewer executor threads than callers, as the refresh needs the executor too
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.loop.set_default_executor(self.executor)
+        self.calls = 0
+
+    def tearDown(self):
+        self.loop.close()
+        self.executor.shutdown()
+        shutil.rmtree(self.path)
+
+    async def refresh(self):
+        self.calls += 1
+        await asyncio.get_event_loop().run_in_executor(None, threading.Event().wait, 0.2)
+        return {'ethusd': '500.0'}
+
+    def get_or_refresh(self, callers: int):
+        async def get_all():
+            calls = [self.cache.get_or_refresh('price', 60, self.refresh) for _ in range(callers)]
+            return await asyncio.wait_for(asyncio.gather(*calls), timeout=5)
+        return self.loop.run_until_complete(get_all())
+
+    def test_concurrent_cold_callers(self):
+        self.assertEqual(self.get_or_refresh(6), [{'ethusd': '500.0'}] * 6)
+        self.assertEqual(self.calls, 1)
+
+    def test_fresh_value(self):
+        self.get_or_refresh(1)
+
+        self.assertEqual(self.get_or_refresh(3), [{'ethusd': '500.0'}] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_refresh(self):
+        async def refresh():
+            await asyncio.sleep(0.1)
+
+        async def get_all():
+            return await asyncio.gather(*(self.cache.get_or_refresh('price', 60, refresh) for _ in range(3)))
+
+        self.assertEqual(self.loop.run_until_complete(get_all()), [None] * 3)
+        # Lock is released, so the next call refreshes the value
+        self.assertEqual(self.get_or_refresh(1), [{'ethusd': '500.0'}])
@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.authentication import CachedUser
+from core.responses import rendered_cache
+from core.snapshots import store
+from core.tests.utils import ACCOUNT, wallet_data
+
+
+# Browsable API pages link static files that are not collected for tests
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SnapshotResponseTestCase(SimpleTestCase):
+    def setUp(self):
+        store.set(f'wallet:{ACCOUNT}', wallet_data(2))
+        self.addCleanup(store.delete, f'wallet:{ACCOUNT}')
+        self.client = APIClient()
+        self.client.force_authenticate(CachedUser(type('User', (), {
+            'pk': 1, 'username': 'admin', 'account': ACCOUNT, 'is_active': True, 'is_admin': True,
+            'is_api_superuser': True})))
+        self.url = reverse('core:v1:wallet')
+
+    def test_json_etag(self):
+        response = self.client.get(self.url, {'format': 'json'})
+
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        response = self.client.get(self.url, {'format': 'json'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_browsable_api_not_tagged(self):
+        etag = self.client.get(self.url, {'format': 'json'})['ETag']
+
+        response = self.client.get(self.url, {'format': 'api'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+        response = self.client.get(self.url, {'format': 'api'}, HTTP_IF_NONE_MATCH=etag.replace('-json', '-api'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_browsable_api_not_cached(self):
+        entries = rendered_cache.stats()['entries']
+
+        self.client.get(self.url, {'format': 'api'})
+        self.client.get(self.url, {'format': 'api'})
+
+        self.assertEqual(rendered_cache.stats()['entries'], entries)
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.tail import TailReader
+
+
+class TailReaderTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.log = os.path.join(self.path, 'values.log')
+        self.write(range(100))
+        self.reader = TailReader(self.log, maxlen=5, parse=int, backfill=20)
+        # Small blocks, so the file is read backwards in several of them
+        self.reader.block_size = 16
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, values, mode: str = 'a', end: str = '\n'):
+        with open(self.log, mode) as f:
+            f.write('\n'.join(map(str, values)) + end)
+
+    def test_backfill(self):
+        self.assertEqual(self.reader.update(), list(range(80, 100)))
+        self.assertEqual(self.reader.entries(), list(range(95, 100)))
+
+    def test_short_file(self):
+        self.write(range(3), mode='w')
+
+        self.assertEqual(self.reader.update(), [0, 1, 2])
+
+    def test_append(self):
+        self.reader.update()
+        self.write([100, 101])
+
+        self.assertEqual(self.reader.update(), [100, 101])
+        self.assertEqual(self.reader.update(), [])
+        self.assertEqual(self.reader.entries(), [97, 98, 99, 100, 101])
+
+    def test_partial_line(self):
+        self.reader.update()
+        self.write([100, 10], end='')
+
+        self.assertEqual(self.reader.update(), [100])
+
+        self.write([1])
+        self.assertEqual(self.reader.update(), [101])
+
+    def test_rotation(self):
+        self.reader.update()
+        os.rename(self.log, f'{self.log}.1')
+        self.write(range(200, 230))
+
+        self.assertEqual(self.reader.update(), list(range(210, 230)))
+        self.assertEqual(self.reader.entries(), list(range(225, 230)))
+
+    def test_truncation(self):
+        self.reader.update()
+        self.write([300, 301], mode='w')
+
+        self.assertEqual(self.reader.update(), [300, 301])
+        self.assertEqual(self.reader.entries(), [300, 301])
+
+    def test_rewritten_beyond_offset(self):
+        self.reader.update()
+        inode = os.stat(self.log).st_ino
+        # Rewritten in place past the previous offset, so only the signature tells it apart
+        self.write(range(1000, 1100), mode='r+')
+
+        self.assertEqual(os.stat(self.log).st_ino, inode)
+        self.assertEqual(self.reader.update(), list(range(1080, 1100)))
+
+    def test_invalid_lines_skipped(self):
+        self.reader.update()
+        self.write(['100', 'invalid', '', '101'])
+
+        self.assertEqual(self.reader.update(), [100, 101])
+
+    def test_listeners(self):
+        received = []
+
+        def failing(entries):
+            raise ValueError()
+
+        self.reader.subscribe(failing)
+        self.reader.subscribe(received.append)
+        self.reader.update()
+        self.write([100])
+        self.reader.update()
+
+        self.assertEqual(received, [list(range(80, 100)), [100]])
@@ -0,0 +1,232 @@
+import asyncio
+from unittest import mock
+
+import aiohttp
+from django.test import SimpleTestCase, override_settings
+
+from core import utils
+from core.utils import CircuitBreaker, SingleFlight, get_breaker, retry
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        self.group = SingleFlight()
+        self.calls = 0
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    async def fetch(self, delay: float = 0.05):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return {'values': [self.calls]}
+
+    def gather(self, *aws):
+        async def gather():
+            return await asyncio.gather(*aws, return_exceptions=True)
+        return self.loop.run_until_complete(gather())
+
+    def test_coalesce(self):
+        results = self.gather(*(self.group.do('key', self.fetch) for _ in range(5)))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'values': [1]}] * 5)
+        self.assertEqual(self.group.stats(), {'in_flight': 0, 'calls': 1, 'coalesced': 4})
+
+    def test_every_caller_gets_a_copy(self):
+        returned = {'values': [1]}
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return returned
+
+        results = self.gather(*(self.group.do('key', fetch) for _ in range(3)))
+        results[0]['values'].append(2)
+
+        self.assertEqual(results[1:], [{'values': [1]}] * 2)
+        self.assertEqual(returned, {'values': [1]})
+        self.assertEqual(len({id(r) for r in results + [returned]}), 4)
+
+    def test_error_shared(self):
+        async def fetch():
+            await asyncio.sleep(0.05)
+            raise ValueError('Failed')
+
+        results = self.gather(*(self.group.do('key', fetch) for _ in range(3)))
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_leader_cancelled(self):
+        async def scenario():
+            leader = asyncio.ensure_future(self.group.do('key', self.fetch))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(self.group.do('key', self.fetch)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+        leader, *followers = self.loop.run_until_complete(scenario())
+
+        self.assertIsInstance(leader, asyncio.CancelledError)
+        # A follower calls again and the others await it
+        self.assertEqual(followers, [{'values': [2]}] * 3)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.group.stats()['in_flight'], 0)
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('upstream', failures=2, reset_timeout=30)
+        patcher = mock.patch('core.utils.time.monotonic', return_value=1000.0)
+        self.monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transitions(self):
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        # A single call is let through once reset timeout expires
+        self.monotonic.return_value = 1030.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.stats(), {'state': 'closed', 'failures': 0, 'rejected': 2, 'open_for': None})
+
+    def test_half_open_failure(self):
+        self.breaker.failure()
+        self.breaker.failure()
+        self.monotonic.return_value = 1030.0
+        self.breaker.allow()
+
+        self.breaker.failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.monotonic.return_value = 1059.0
+        self.assertFalse(self.breaker.allow())
+        self.monotonic.return_value = 1060.0
+        self.assertTrue(self.breaker.allow())
+
+    def test_success_resets_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class Fetcher:
+    """
+    Upstream fetcher whose calls return or raise the given outcomes in order, repeating the last one.
+    """
+    def __init__(self, *outcomes, delay: float = 0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self, account):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+@override_settings(TEST_UPSTREAM={'url': 'http://upstream.test/api'},
+                   RETRY={'timeout': 5, 'backoff': 0, 'max_backoff': 0},
+                   CIRCUIT_BREAKER={'failures': 3, 'reset_timeout': 30})
+class RetryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        patcher = mock.patch.dict(utils._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def call(self, fetcher: Fetcher, max_retries: int = 3, **kwargs):
+        # Decorated once per fetcher, as last known values are kept by the decorated function
+        if not hasattr(fetcher, 'retried'):
+            fetcher.retried = retry(max_retries, default='default', upstream='TEST_UPSTREAM', **kwargs)(fetcher.fetch)
+        return self.loop.run_until_complete(fetcher.retried('0x1'))
+
+    def error(self, status: int) -> aiohttp.ClientResponseError:
+        return aiohttp.ClientResponseError(mock.Mock(), (), status=status)
+
+    def test_retry_transient_errors(self):
+        fetcher = Fetcher(aiohttp.ClientConnectionError(), self.error(503), None, 'value')
+
+        self.assertEqual(self.call(fetcher, max_retries=4), 'value')
+        self.assertEqual(fetcher.calls, 4)
+
+    def test_default(self):
+        fetcher = Fetcher(None)
+
+        self.assertEqual(self.call(fetcher), 'default')
+        self.assertEqual(fetcher.calls, 3)
+
+    def test_non_transient_error(self):
+        fetcher = Fetcher(self.error(404), ValueError())
+
+        self.assertEqual(self.call(fetcher), 'default')
+        self.assertEqual(self.call(fetcher), 'default')
+
+        # Not retried nor counted as upstream failures
+        self.assertEqual(fetcher.calls, 2)
+        self.assertEqual(get_breaker('TEST_UPSTREAM').stats()['failures'], 0)
+
+    def test_open_breaker_serves_last_value(self):
+        fetcher = Fetcher('value', aiohttp.ClientConnectionError())
+        self.assertEqual(self.call(fetcher), 'value')
+
+        self.assertEqual(self.call(fetcher), 'value')
+        self.assertEqual(get_breaker('TEST_UPSTREAM').state, CircuitBreaker.OPEN)
+        self.assertEqual(fetcher.calls, 4)
+
+        # Fails fast while open
+        self.assertEqual(self.call(fetcher), 'value')
+        self.assertEqual(fetcher.calls, 4)
+
+    def test_open_breaker_serves_default(self):
+        fetcher = Fetcher(aiohttp.ClientConnectionError())
+
+        self.assertEqual(self.call(fetcher), 'default')
+        self.assertEqual(self.call(fetcher), 'default')
+        self.assertEqual(fetcher.calls, 3)
+
+    def test_breaker_closes_after_reset_timeout(self):
+        fetcher = Fetcher(aiohttp.ClientConnectionError(), aiohttp.ClientConnectionError(),
+                          aiohttp.ClientConnectionError(), 'value')
+        self.call(fetcher)
+        breaker = get_breaker('TEST_UPSTREAM')
+
+        with mock.patch('core.utils.time.monotonic', return_value=breaker._opened_at + 30):
+            self.assertEqual(self.call(fetcher), 'value')
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled(self):
+        fetcher = Fetcher(asyncio.CancelledError(), 'value')
+
+        with self.assertRaises(asyncio.CancelledError):
+            self.call(fetcher)
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(get_breaker('TEST_UPSTREAM').stats()['failures'], 0)
+
+    def test_timeout(self):
+        fetcher = Fetcher('value', delay=0.5)
+
+        self.assertEqual(self.call(fetcher, max_retries=2, timeout=0.05), 'default')
+        self.assertEqual(fetcher.calls, 2)
+        self.assertEqual(get_breaker('TEST_UPSTREAM').stats()['failures'], 2)
@@ -0,0 +1,192 @@
+import asyncio
+import datetime
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from core.models import Transaction, User
+from core.shared import shared_cache
+from core.snapshots import store
+from core.views.wallet import Wallet, WalletBatch
+
+ACCOUNT = '0x566d41b925ed1d9f643748d652f4e66593cba9c9'
+
+
+def operation(timestamp: int):
+    return {
+        'token': {'name': 'Token', 'symbol': 'TK'},
+        'hash': f'0x{timestamp:064x}',
+        'source': ACCOUNT,
+        'destination': '0x0000000000000000000000000000000000000001',
+        'value': 1.0,
+        'timestamp': datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc),
+    }
+
+
+class FakeEthplorer:
+    """
+    Token operations history served newest first, in pages older than a timestamp, as Ethplorer does.
+    """
+    def __init__(self, timestamps):
+        self.timestamps = list(timestamps)
+        self.queries = []
+        self.failing = False
+
+    async def __call__(self, session, account, before=None):
+        self.queries.append(before)
+        if self.failing:
+            return None
+
+        older = sorted((t for t in self.timestamps if before is None or t < before), reverse=True)
+        return [operation(t) for t in older[:3]]
+
+
+@override_settings(WALLET_HISTORY={'page_size': 3, 'max_pages': 2, 'latest': 10})
+class SyncTokenOperationsTestCase(TransactionTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.override = override_settings(SNAPSHOTS={'path': self.path, 'max_age': 300})
+        self.override.enable()
+        self.ethplorer = FakeEthplorer(range(1000, 1007))
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.path)
+
+    def sync(self) -> int:
+        loop = asyncio.new_event_loop()
+        try:
+            with mock.patch.object(Wallet, '_token_operations', self.ethplorer):
+                return loop.run_until_complete(Wallet()._sync_token_operations(None, ACCOUNT))
+        finally:
+            loop.close()
+
+    def stored(self):
+        return sorted(int(t.timestamp()) for t in Transaction.objects.for_account(ACCOUNT).values_list(
+            'timestamp', flat=True))
+
+    def cursor(self):
+        return store.get(f'wallet-backfill:{ACCOUNT}').data
+
+    def test_backfill_over_several_syncs(self):
+        self.assertEqual(self.sync(), 6)
+        self.assertEqual(self.stored(), list(range(1001, 1007)))
+        self.assertEqual(self.cursor(), {'before': 1001, 'complete': False})
+
+        self.assertEqual(self.sync(), 1)
+        self.assertEqual(self.stored(), list(range(1000, 1007)))
+        self.assertEqual(self.cursor(), {'before': None, 'complete': True})
+
+    def test_new_operations_after_complete(self):
+        self.sync()
+        self.sync()
+        self.ethplorer.timestamps += [1007, 1008, 1009, 1010]
+        self.ethplorer.queries = []
+
+        self.assertEqual(self.sync(), 4)
+        self.assertEqual(self.stored(), list(range(1000, 1011)))
+        # Only newer operations are queried, until reaching stored ones
+        self.assertEqual(self.ethplorer.queries, [None, 1008])
+
+    def test_gap_is_backfilled(self):
+        self.sync()
+        self.sync()
+        self.ethplorer.timestamps += list(range(1007, 1017))
+
+        self.sync()
+        self.assertEqual(self.cursor(), {'before': 1011, 'complete': False})
+
+        # Backfill goes on from the gap through operations already stored
+        for _ in range(4):
+            self.sync()
+        self.assertEqual(self.stored(), list(range(1000, 1017)))
+        self.assertEqual(self.cursor(), {'before': None, 'complete': True})
+
+    def test_failure_keeps_cursor(self):
+        self.sync()
+        self.ethplorer.failing = True
+
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.cursor(), {'before': 1001, 'complete': False})
+
+    def test_first_sync_failure_is_not_complete(self):
+        self.ethplorer.failing = True
+
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.cursor(), {'before': None, 'complete': False})
+
+    def test_history_stored_before_cursors(self):
+        Transaction.objects.store(ACCOUNT, [operation(t) for t in range(1004, 1007)])
+
+        self.sync()
+
+        # Backfill starts from the oldest stored operation
+        self.assertEqual(self.ethplorer.queries, [None, 1004])
+        self.assertEqual(self.stored(), list(range(1001, 1007)))
+        self.assertEqual(self.cursor(), {'before': 1001, 'complete': False})
+
+
+def token(address: str, symbol: str, rate=None):
+    return {'tokenInfo': {'address': address, 'name': f'Token {symbol}', 'symbol': symbol, 'decimals': '2',
+                          'price': {'rate': rate} if rate else False}}
+
+
+class TokenMetadataTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.override = override_settings(SNAPSHOTS={'path': self.path, 'max_age': 300},
+                                          SHARED_CACHE={'price_ttl': 60, 'tokens_ttl': 300, 'wait': 10})
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.path)
+
+    def metadata(self, tokens):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(Wallet()._token_metadata(tokens))
+        finally:
+            loop.close()
+
+    def test_metadata(self):
+        metadata = self.metadata([token('0x1', 'TK1', rate='1.5'), token('0x2', 'TK2')])
+
+        self.assertEqual({k: (v['symbol'], v['decimals'], v['price_usd']) for k, v in metadata.items()},
+                         {'0x1': ('TK1', 0.01, '1.5'), '0x2': ('TK2', 0.01, None)})
+
+    def test_tokens_of_several_accounts_merged(self):
+        self.metadata([token('0x1', 'TK1')])
+        self.metadata([token('0x2', 'TK2')])
+
+        self.assertEqual(set(shared_cache.get('tokens').data), {'0x1', '0x2'})
+
+    def test_known_tokens_not_written(self):
+        self.metadata([token('0x1', 'TK1')])
+        version = shared_cache.get('tokens').version
+
+        metadata = self.metadata([token('0x1', 'Renamed')])
+
+        self.assertEqual(metadata['0x1']['symbol'], 'TK1')
+        self.assertEqual(shared_cache.get('tokens').version, version)
+
+
+class WalletBatchAccountsTestCase(TransactionTestCase):
+    def setUp(self):
+        accounts = [ACCOUNT, ACCOUNT.upper().replace('0X', '0x'), '0x1234', 'not an account',
+                    '0x0000000000000000000000000000000000000001']
+        for i, account in enumerate(accounts):
+            User.objects.create(username=f'user{i}', account=account)
+        User.objects.create(username='inactive', account='0x0000000000000000000000000000000000000002',
+                            is_active=False)
+
+    def test_invalid_accounts_skipped(self):
+        self.assertEqual(sorted(WalletBatch()._accounts()), ['0x0000000000000000000000000000000000000001', ACCOUNT])
+
+    @override_settings(WALLET_BATCH={'max_accounts': 1, 'chunk_size': 20, 'concurrency': 10, 'workers': 4})
+    def test_max_accounts(self):
+        with self.assertRaises(ValidationError):
+            WalletBatch()._accounts()
@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import threading
+from typing import Dict
+
+from aiohttp import web
+
+# Wallet account used by fixtures
+ACCOUNT = '0x566d41b925ed1d9f643748d652f4e66593cba9c9'
+
+
+class BackgroundServer:
+    """
+    aiohttp application served from a background thread event loop, listening on a local TCP port or a unix socket.
+    """
+    def __init__(self, app: web.Application, socket_path: str = None):
+        """
+        :param app: aiohttp application.
+        :param socket_path: Unix socket, a random local TCP port is used if not given.
+        """
+        self.app = app
+        self.socket_path = socket_path
+        self.port = None
+        self.loop = asyncio.new_event_loop()
+        self._runner = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/'
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        self._started.set()
+        self.loop.run_forever()
+
+        # Handlers still running, such as those of slow responses, are cancelled before closing the loop
+        all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+        tasks = all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        if self.socket_path:
+            site = web.UnixSite(self._runner, self.socket_path)
+        else:
+            site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+
+        if not self.socket_path:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    def call(self, coro, timeout: float = 5):
+        """
+        Run a coroutine in server loop and wait for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout=timeout)
+
+    def start(self) -> 'BackgroundServer':
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def stop(self):
+        if not self._thread.is_alive():
+            return
+
+        self.call(self._runner.cleanup())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+def wallet_data(transactions: int, account: str = ACCOUNT) -> Dict:
+    """
+    Wallet data as collected by Wallet view.
+
+    :param transactions: Number of transactions.
+    :param account: Wallet account, source of every transaction.
+    :return: Wallet data.
+    """
+    now = datetime.datetime(2018, 5, 1)
+    return {
+        'tokens': {f'TK{i}': {'name': f'Token {i}', 'symbol': f'TK{i}', 'balance': 1.5 * (i + 1),
+                              'price_usd': '1.25', 'balance_usd': 1.875 * (i + 1)} for i in range(10)},
+        'transactions': [{
+            'token': {'name': 'Ether', 'symbol': 'ETH'},
+            'hash': f'0x{i:064x}',
+            'source': account,
+            'destination': '0x0000000000000000000000000000000000000001',
+            'value': 0.1 * (i + 1),
+            'timestamp': now - datetime.timedelta(minutes=i),
+        } for i in range(transactions)],
+    }
@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from core.views import ether, restart, status, storj, wallet
+from core.views import ether, federation, internals, restart, status, storj, stream, wallet
 from core.views.auth import ObtainUser, UserRegister
 
 auth_patterns = (
@@ -12,14 +12,31 @@ auth_patterns = (
 
 ether_patterns = (
     [
+        path('hashrate/', ether.Hashrate.as_view(), name='hashrate'),
+        path('uptime/', ether.Uptime.as_view(), name='uptime'),
     ],
     'ether')
 
+federation_patterns = (
+    [
+        path('status/', federation.FederationStatus.as_view(), name='status'),
+        path('ether/', federation.FederationEther.as_view(), name='ether'),
+        path('storj/', federation.FederationStorj.as_view(), name='storj'),
+    ],
+    'federation')
+
 urlpatterns = [
     path('auth/', include(auth_patterns)),
     path('ether/', ether.Ether.as_view(), name='ether'),
+    path('ether/', include(ether_patterns)),
     path('status/', status.Status.as_view(), name='status'),
     path('storj/', storj.Storj.as_view(), name='storj'),
+    path('stream/', stream.Stream.as_view(), name='stream'),
     path('restart/', restart.RestartService.as_view(), name='restart'),
+    path('restart/<uuid:job_id>/', restart.RestartJob.as_view(), name='restart-job'),
     path('wallet/', wallet.Wallet.as_view(), name='wallet'),
+    path('wallet/batch/', wallet.WalletBatch.as_view(), name='wallet-batch'),
+    path('wallet/transactions/', wallet.WalletTransactions.as_view(), name='wallet-transactions'),
+    path('federation/', include(federation_patterns)),
+    path('internals/', internals.Internals.as_view(), name='internals'),
 ]
@@ -1,8 +1,24 @@
 import asyncio
+import concurrent.futures
+import copy
 import datetime
+import logging
+import random
+import threading
+import time
 from functools import wraps
+from urllib.parse import urlparse
 
-from typing import List, Dict
+from typing import Any, Awaitable, Callable, Hashable, List, Dict, Tuple
+
+import aiohttp
+from django.conf import settings
+from django.db import close_old_connections
+
+from core import metrics
+from core.ratelimit import RateLimitExceeded, get_limiter
+
+logger = logging.getLogger(__name__)
 
 
 def get_event_loop():
@@ -14,6 +30,41 @@ def get_event_loop():
     return loop
 
 
+async def gather(*aws: Awaitable, default: Any = None) -> List[Any]:
+    """
+    Run awaitables concurrently, replacing the result of those that fail with a default value.
+
+    :param aws: Coroutines or futures.
+    :param default: Value returned for failed awaitables.
+    :return: Results in the same order as given awaitables.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logger.error('Concurrent task failed: %s', result, exc_info=result)
+            results[i] = default
+
+    return results
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a function that queries the database in the default executor, so it does not block the event loop.
+
+    :param func: Function.
+    :return: Function result.
+    """
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, call)
+
+
 def json_date_hook(obj: Dict, keys: List[str], date_format: str='%Y-%m-%d %H:%M:%S'):
     for k in (k for k in keys if k in obj):
         obj[k] = datetime.datetime.strptime(obj[k], date_format)
@@ -21,19 +72,289 @@ def json_date_hook(obj: Dict, keys: List[str], date_format: str='%Y-%m-%d %H:%M:
     return obj
 
 
-def retry(max_retries, default=None):
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream host. It opens after a number of consecutive failures and fails fast until reset
+    timeout expires, then it is half-open and lets a single call through to decide whether to close again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failures: int, reset_timeout: float):
+        """
+        :param name: Upstream host.
+        :param failures: Consecutive failures that open the breaker.
+        :param reset_timeout: Seconds before trying again an open breaker.
+        """
+        self.name = name
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Check if a call can be done, moving from open to half-open once reset timeout is expired.
+
+        :return: True if the call is allowed.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Only one call is let through each reset timeout while half-open
+                self._state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+
+            self._rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info('Circuit breaker for "%s" closed', self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.max_failures):
+                logger.warning('Circuit breaker for "%s" opened after %d failures', self.name, self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self._state,
+                'failures': self._failures,
+                'rejected': self._rejected,
+                'open_for': time.monotonic() - self._opened_at if self._opened_at is not None else None,
+            }
+
+
+_breakers_lock = threading.Lock()
+_breakers = {}  # type: Dict[str, CircuitBreaker]
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    """
+    Circuit breaker for an upstream defined in settings, shared by all calls to the same host.
+
+    :param upstream: Upstream settings name, such as ETHERSCAN.
+    :return: Circuit breaker.
+    """
+    host = urlparse(getattr(settings, upstream)['url']).netloc
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host, **settings.CIRCUIT_BREAKER)
+        return _breakers[host]
+
+
+def breakers_stats() -> Dict[str, Dict]:
+    """
+    State of all circuit breakers.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+
+    return {b.name: b.stats() for b in breakers}
+
+
+def call_key(f, args: Tuple, kwargs: Dict) -> Tuple:
+    """
+    Key that identifies a fetcher call, ignoring the instance and aiohttp session arguments.
+    """
+    args = tuple(a for a in args[1:] if not isinstance(a, aiohttp.ClientSession))
+    kwargs = tuple(sorted((k, v) for k, v in kwargs.items() if not isinstance(v, aiohttp.ClientSession)))
+    return (f.__qualname__,) + args + kwargs
+
+
+def _is_transient(exc: Exception) -> bool:
+    """
+    Check if an error may succeed when retried: connection errors, timeouts, server errors and throttling.
+    """
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def retry(max_retries, default=None, upstream: str = None, timeout: float = None):
+    """
+    Retry policy for upstream fetchers. A call is retried when it returns None or raises a transient error, waiting
+    an exponential backoff with jitter between attempts, and each attempt is limited by a timeout. If an upstream is
+    given, calls go through its circuit breaker, that fails fast serving the last known value while it is open, and
+    through its rate limiter, serving the last known value too if no call is allowed within the wait budget.
+
+    :param max_retries: Max number of attempts.
+    :param default: Value returned if all attempts fail.
+    :param upstream: Upstream settings name, such as ETHERSCAN.
+    :param timeout: Timeout in seconds for each attempt.
+    """
     def outer(f):
+        last_values = {}
+        fetcher = f.__name__.lstrip('_')
+
         @wraps(f)
         async def inner(*args, **kwargs):
-            retries = max_retries
+            key = call_key(f, args, kwargs)
+            breaker = get_breaker(upstream) if upstream else None
+            limiter = get_limiter(upstream) if upstream else None
+            attempt_timeout = timeout or settings.RETRY['timeout']
+
             result = None
-            while result is None and retries > 0:
-                result = await f(*args, **kwargs)
-                retries -= 1
+            for attempt in range(max_retries):
+                if attempt:
+                    metrics.upstream_retries.inc(fetcher=fetcher)
+                    delay = min(settings.RETRY['max_backoff'], settings.RETRY['backoff'] * 2 ** (attempt - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+                if breaker and not breaker.allow():
+                    logger.debug('Circuit breaker for "%s" is open, serving last known value', breaker.name)
+                    metrics.upstream_fallbacks.inc(fetcher=fetcher)
+                    return last_values.get(key, default)
 
-            if result is None:
-                result = default
+                if limiter:
+                    try:
+                        await limiter.acquire()
+                    except RateLimitExceeded:
+                        # Throttled locally, so upstream health is unknown and the breaker is left untouched
+                        metrics.upstream_fallbacks.inc(fetcher=fetcher)
+                        return last_values.get(key, default)
 
-            return result
+                try:
+                    with metrics.upstream_duration.time(fetcher=fetcher):
+                        result = await asyncio.wait_for(f(*args, **kwargs), timeout=attempt_timeout)
+                except asyncio.CancelledError:
+                    # Caller is gone, so it is neither an upstream failure nor worth retrying
+                    raise
+                except Exception as e:
+                    metrics.upstream_errors.inc(fetcher=fetcher, error=e.__class__.__name__)
+                    if not _is_transient(e):
+                        # Upstream answered but the call is wrong, so its health is unknown and the breaker is left
+                        # untouched
+                        logger.error('Call to %s failed: %s', f.__qualname__, e)
+                        break
+
+                    if breaker:
+                        breaker.failure()
+                    logger.warning('Call to %s failed (attempt %d/%d): %r', f.__qualname__, attempt + 1, max_retries, e)
+                    continue
+
+                if breaker:
+                    breaker.success()
+
+                if result is not None:
+                    last_values[key] = result
+                    return result
+
+                metrics.upstream_errors.inc(fetcher=fetcher, error='Empty')
+
+            if breaker and breaker.state != breaker.CLOSED:
+                return last_values.get(key, default)
+
+            return default
         return inner
     return outer
+
+
+class LeaderCancelled(Exception):
+    """
+    The in-flight call awaited by coalesced callers was cancelled, so one of them has to call again.
+    """
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls: while a call is in flight, callers with the same key await its result
+    instead of calling again. In-flight calls are shared by all threads of the process, whatever their event loop.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # type: Dict[Hashable, concurrent.futures.Future]
+        self._counters = {
+            'calls': 0,
+            'coalesced': 0,
+        }
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], name: str = None) -> Any:
+        """
+        Call a coroutine function, or await the result of the in-flight call with the same key. If the in-flight call
+        is cancelled, one of the callers awaiting it calls again instead of being cancelled too.
+
+        :param key: Call key.
+        :param func: Coroutine function.
+        :param name: Name used in metrics.
+        :return: Result, copied for every caller, so callers can modify it.
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = concurrent.futures.Future()
+                    self._counters['calls'] += 1
+                else:
+                    self._counters['coalesced'] += 1
+
+            if leader:
+                break
+
+            metrics.upstream_coalesced.inc(fetcher=name or str(key[0]))
+            try:
+                # Shielded so a cancelled caller does not cancel the shared call
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except LeaderCancelled:
+                continue
+
+            return copy.deepcopy(result)
+
+        try:
+            result = await func()
+        except BaseException as e:
+            # Removed before waking up coalesced callers, so those calling again do not find the finished call
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            raise
+
+        # Copied once for coalesced callers and once for this caller, so no one gets the object kept by the function,
+        # such as the last value served by retry
+        shared = copy.deepcopy(result)
+        with self._lock:
+            del self._calls[key]
+        future.set_result(shared)
+        return copy.deepcopy(shared)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'in_flight': len(self._calls), **self._counters}
+
+
+single_flight_group = SingleFlight()
+
+
+def single_flight(f):
+    """
+    Coalesce concurrent calls to an upstream fetcher with the same arguments, ignoring the instance and aiohttp
+    session.
+    """
+    name = f.__name__.lstrip('_')
+
+    @wraps(f)
+    async def inner(*args, **kwargs):
+        return await single_flight_group.do(call_key(f, args, kwargs), lambda: f(*args, **kwargs), name)
+    return inner
@@ -0,0 +1,46 @@
+import asyncio
+
+from django.db import close_old_connections
+from rest_framework.response import Response
+
+__all__ = ['AsyncMixin']
+
+
+class AsyncMixin:
+    """
+    API view whose handlers are coroutines named after HTTP methods with an 'async_' prefix, such as async_get.
+
+    Under ASGI they are awaited natively through async_dispatch, that mimics APIView.dispatch but runs authentication,
+    permissions and throttling checks in an executor, so database queries do not block the event loop. Under WSGI,
+    regular handlers just run the coroutine in the thread event loop.
+    """
+    def _initial(self, request, *args, **kwargs):
+        try:
+            self.initial(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def async_dispatch(self, request, *args, **kwargs) -> Response:
+        """
+        Async version of APIView.dispatch.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, lambda: self._initial(request, *args, **kwargs))
+
+            handler = getattr(self, f'async_{request.method.lower()}', None)
+            if handler is None:
+                response = self.http_method_not_allowed(request, *args, **kwargs)
+            else:
+                response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -1 +1,2 @@
 from core.views.ether.ether import *  # noqa
+from core.views.ether.hashrate import *  # noqa
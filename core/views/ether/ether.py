@@ -1,47 +1,69 @@
+import asyncio
 import datetime
 import json
 import logging
-from collections import deque
 from functools import partial
 from typing import Dict, List
 
-import aiohttp
 from django.conf import settings
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.archive import HashrateArchive
+from core.hashrate import HashrateEngine
+from core.http import get_session
 from core.serializers.ether import ether
-from core.utils import get_event_loop, json_date_hook
+from core.tail import TailReader
+from core.utils import json_date_hook
+from core.views.asynchronous import AsyncMixin
 from core.views.ether.nanopool import NanopoolMixin
+from core.views.snapshot import SnapshotMixin
 
 logger = logging.getLogger(__name__)
 
 
 json_datetime_format = partial(json_date_hook, keys=['timestamp'], date_format='%Y-%m-%d %H:%M:%S')
 
+# Last entries of Ether miner values log, shared by all requests
+values_log = TailReader(
+    path=settings.ETHER_VALUES_LOG['path'],
+    maxlen=settings.ETHER_VALUES_LOG['entries'],
+    parse=partial(json.loads, object_hook=json_datetime_format),
+    backfill=settings.ETHER_HASHRATE['backfill'],
+)
 
-class Ether(APIView, NanopoolMixin):
+# Hashrate statistics per graphic card, fed by values log
+hashrate_engine = HashrateEngine(
+    window=settings.ETHER_HASHRATE['window'],
+    retention=settings.ETHER_HASHRATE['retention'],
+    halflife=settings.ETHER_HASHRATE['halflife'],
+    resolution=settings.ETHER_HASHRATE['resolution'],
+)
+values_log.subscribe(hashrate_engine.feed)
+
+# Hashrate history older than engine retention, compacted from values log
+hashrate_archive = HashrateArchive(path=settings.ETHER_HASHRATE_ARCHIVE['path'])
+
+
+class Ether(AsyncMixin, SnapshotMixin, APIView, NanopoolMixin):
     """
     Check Ether miner status info.
     """
     serializer_class = ether.Ether
+    snapshot_name = 'ether'
 
     def _is_miner_active(self) -> str:
         """
         Check Ether miner current status.
         """
         try:
-            with open('logs/miner/ether/values.log') as f:
-                logs = deque(f, maxlen=30)
-                raw_values = [json.loads(e, object_hook=json_datetime_format) for e in logs]
-                values = [(v['timestamp'], v['value']) for v in raw_values if any(v['value'].values())]
+            values = [(v['timestamp'], v['value']) for v in values_log.entries() if any(v['value'].values())]
 
-                if not values:
-                    raise ValueError('No value entries found')
+            if not values:
+                raise ValueError('No value entries found')
 
-                values.append((datetime.datetime.utcnow(), None))
-                deltas = [(x2[0] - x1[0]).seconds < settings.ETHER_MAX_IDLE for x1, x2 in zip(values[:-1], values[1:])]
-                current_status = all(deltas)
+            values.append((datetime.datetime.utcnow(), None))
+            deltas = [(x2[0] - x1[0]).seconds < settings.ETHER_MAX_IDLE for x1, x2 in zip(values[:-1], values[1:])]
+            current_status = all(deltas)
         except ValueError:
             current_status = False
         except Exception:
@@ -56,11 +78,9 @@ class Ether(APIView, NanopoolMixin):
         :return:
         """
         try:
-            with open('logs/miner/ether/values.log') as f:
-                log_entries = deque(f, maxlen=30)
-                values = [tuple(json.loads(e)['value'].values()) for e in log_entries]
-                values_per_gpu = list(zip(*values))
-                hashrate = [{'hashrate': sum(v) / len(v), 'graphic_card': i} for i, v in enumerate(values_per_gpu)]
+            values = [tuple(v['value'].values()) for v in values_log.entries()]
+            values_per_gpu = list(zip(*values))
+            hashrate = [{'hashrate': sum(v) / len(v), 'graphic_card': i} for i, v in enumerate(values_per_gpu)]
         except:
             hashrate = None
 
@@ -87,24 +107,32 @@ class Ether(APIView, NanopoolMixin):
         :param account: Account address.
         :return: Nanopool info including balance, hashrate, workers and last payment.
         """
-        data = {'hashrate': self._hashrate()}
+        # Values log is read from disk, so it is read out of the event loop while Nanopool is queried
+        loop = asyncio.get_event_loop()
+        hashrate = loop.run_in_executor(None, self._hashrate)
 
-        async with aiohttp.ClientSession() as session:
-            nanopool = await self._nanopool(session, account)
+        session = get_session()
+        nanopool = await self._nanopool(session, account)
 
+        data = {'hashrate': await hashrate}
         if nanopool:
             data['nanopool'] = nanopool
 
-        data['active'] = self._is_active(nanopool)
+        data['active'] = await loop.run_in_executor(None, self._is_active, nanopool)
 
         return data
 
+    async def async_collect(self, account: str = None) -> Dict:
+        return await self._get(account)
+
     def get(self, request, format=None):
         """
         Check Ether miner status info.
         """
-        loop = get_event_loop()
-        data = loop.run_until_complete(self._get(request.user.account))
+        return self.snapshot_response(self.get_snapshot(request.user.account))
 
-        serializer = self.serializer_class(data)
-        return Response(serializer.data)
+    async def async_get(self, request, format=None):
+        """
+        Check Ether miner status info.
+        """
+        return self.snapshot_response(await self.async_get_snapshot(request.user.account))
@@ -0,0 +1,112 @@
+import logging
+import time
+from typing import Dict, List
+
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.serializers.compiled import output_serializer
+from core.serializers.ether import hashrate
+from core.views.ether.ether import hashrate_archive, hashrate_engine, values_log
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Hashrate', 'Uptime']
+
+
+class Hashrate(APIView):
+    """
+    Ether miner hashrate statistics and history per graphic card.
+    """
+    serializer_class = hashrate.HashrateHistory
+    query_serializer_class = hashrate.HashrateQuery
+
+    def _archived_query(self, window: int, bucket: int, end: float) -> List[Dict]:
+        """
+        Rolling statistics and history per graphic card, taking buckets older than engine retention from the archive.
+
+        :param window: Seconds of history.
+        :param bucket: Bucket size in seconds.
+        :param end: End POSIX timestamp.
+        :return: Statistics and history per graphic card.
+        """
+        # Split at a bucket boundary, so no bucket is taken from both sources
+        split = end - settings.ETHER_HASHRATE['retention']
+        split += -split % bucket
+
+        recent = hashrate_engine.query(end - split, bucket, end)
+        names = hashrate_engine.names()
+        archived = hashrate_archive.downsample(end - window, split, bucket)
+
+        # Merged by graphic card name, as archive columns and engine series may not be in the same order. Graphic
+        # cards only found in the archive come after the others
+        graphic_cards = []
+        for name in names + [n for n in archived if n not in names]:
+            i = len(graphic_cards)
+            if i < len(recent):
+                graphic_card = recent[i]
+            else:
+                # Graphic card without recent samples
+                stats = {'samples': 0, **dict.fromkeys(('mean', 'ewma', 'min', 'max', 'p50', 'p90', 'p99'))}
+                graphic_card = {'graphic_card': i, 'stats': stats, 'history': []}
+            graphic_card['history'] = archived.get(name, []) + graphic_card['history']
+            graphic_cards.append(graphic_card)
+
+        return graphic_cards
+
+    def get(self, request, format=None):
+        """
+        Retrieve rolling hashrate statistics and hashrate history downsampled into buckets of 1m, 5m, 1h or 1d for
+        the given window in seconds. History older than ETHER_HASHRATE['retention'] comes from the hashrate archive.
+        """
+        query = self.query_serializer_class(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        window = query.validated_data['window']
+        bucket = query.validated_data['bucket']
+
+        try:
+            values_log.update()
+        except Exception:
+            logger.exception('Cannot read Ether miner values log')
+
+        end = time.time()
+        if window <= settings.ETHER_HASHRATE['retention']:
+            graphic_cards = hashrate_engine.query(window, bucket, end)
+        else:
+            graphic_cards = self._archived_query(window, bucket, end)
+
+        data = {
+            'window': window,
+            'bucket': bucket,
+            'graphic_cards': graphic_cards,
+        }
+
+        serializer = output_serializer(self.serializer_class, data)
+        return Response(serializer.data)
+
+
+class Uptime(APIView):
+    """
+    Ether miner uptime per graphic card, from the hashrate archive.
+    """
+    serializer_class = hashrate.Uptime
+    query_serializer_class = hashrate.UptimeQuery
+
+    def get(self, request, format=None):
+        """
+        Retrieve time the miner and each graphic card were mining during the given window in seconds. Values log
+        entries are only taken into account once they are compacted into the hashrate archive.
+        """
+        query = self.query_serializer_class(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        window = query.validated_data['window']
+
+        end = time.time()
+        data = {
+            'window': window,
+            **hashrate_archive.uptime(end - window, end, settings.ETHER_MAX_IDLE),
+        }
+
+        serializer = output_serializer(self.serializer_class, data)
+        return Response(serializer.data)
@@ -5,7 +5,8 @@ from typing import Dict, Union
 import aiohttp
 from django.conf import settings
 
-from core.utils import retry
+from core import fastjson
+from core.utils import gather, retry, single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,8 @@ class NanopoolMixin:
     """
     Query Nanopool account and payments info.
     """
-    @retry(3)
+    @single_flight
+    @retry(3, upstream='NANOPOOL')
     async def _nanopool_account(self, session: 'aiohttp.ClientSession', account: str) -> Dict:
         """
         Query Nanopool account info, such as balance, hashrate and workers, and return it properly formatted.
@@ -27,35 +29,33 @@ class NanopoolMixin:
         """
         url = f'{settings.NANOPOOL["url"]}user/{account}'
         async with session.get(url) as response:
-            try:
-                response.raise_for_status()
-                data = await response.json()
-
-                account_info = {
-                    'balance': {
-                        'confirmed': data['data']['balance'],
-                        'unconfirmed': data['data']['unconfirmed_balance']
-                    },
-                    'hashrate': {
-                        'current': data['data']['hashrate'],
-                        'one_hour': data['data']['avgHashrate']['h1'],
-                        'three_hours': data['data']['avgHashrate']['h3'],
-                        'six_hours': data['data']['avgHashrate']['h6'],
-                        'twelve_hours': data['data']['avgHashrate']['h12'],
-                        'twenty_four_hours': data['data']['avgHashrate']['h24'],
-                    },
-                    'workers': {w['id']: w['hashrate'] for w in data['data']['workers']}
-                }
-            except aiohttp.ClientResponseError:
-                logger.exception('Cannot retrieve Nanopool account info')
-                account_info = None
-            except Exception as e:
-                logger.exception('Wrong response: %s', e)
-                account_info = None
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            account_info = {
+                'balance': {
+                    'confirmed': data['data']['balance'],
+                    'unconfirmed': data['data']['unconfirmed_balance']
+                },
+                'hashrate': {
+                    'current': data['data']['hashrate'],
+                    'one_hour': data['data']['avgHashrate']['h1'],
+                    'three_hours': data['data']['avgHashrate']['h3'],
+                    'six_hours': data['data']['avgHashrate']['h6'],
+                    'twelve_hours': data['data']['avgHashrate']['h12'],
+                    'twenty_four_hours': data['data']['avgHashrate']['h24'],
+                },
+                'workers': {w['id']: w['hashrate'] for w in data['data']['workers']}
+            }
+        except Exception as e:
+            logger.exception('Wrong response: %s', e)
+            account_info = None
 
         return account_info
 
-    @retry(3)
+    @single_flight
+    @retry(3, upstream='NANOPOOL')
     async def _nanopool_payment(self, session: 'aiohttp.ClientSession', account: str) -> Union[Dict, None]:
         """
         Query Nanopool payments info.
@@ -66,19 +66,17 @@ class NanopoolMixin:
         """
         url = f'{settings.NANOPOOL["url"]}payments/{account}'
         async with session.get(url) as response:
-            try:
-                response.raise_for_status()
-
-                payment = (await response.json())['data'][0]
-                payment['date'] = datetime.datetime.fromtimestamp(payment['date'])
-            except (IndexError, KeyError):
-                payment = None
-            except aiohttp.ClientResponseError:
-                payment = None
-                logger.exception('Cannot retrieve Nanopool account info')
-            except Exception as e:
-                payment = None
-                logger.exception('Wrong response: %s', e)
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            payment = data['data'][0]
+            payment['date'] = datetime.datetime.fromtimestamp(payment['date'])
+        except (IndexError, KeyError):
+            payment = None
+        except Exception as e:
+            payment = None
+            logger.exception('Wrong response: %s', e)
 
         return payment
 
@@ -89,7 +87,12 @@ class NanopoolMixin:
         :param account: Account address.
         :return: Nanopool info including balance, hashrate, workers and last payment.
         """
-        data = await self._nanopool_account(session, account) or {}
-        data['last_payment'] = await self._nanopool_payment(session, account)
+        account_info, payment = await gather(
+            self._nanopool_account(session, account),
+            self._nanopool_payment(session, account)
+        )
+
+        data = account_info or {}
+        data['last_payment'] = payment
 
         return data
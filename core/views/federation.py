@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List
+from urllib.parse import urljoin
+
+import aiohttp
+from django.conf import settings
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import fastjson
+from core.http import get_session
+from core.permissions import IsAPISuperuser
+from core.serializers import federation
+from core.serializers.compiled import output_serializer
+from core.utils import get_event_loop
+from core.views.asynchronous import AsyncMixin
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['FederationStatus', 'FederationEther', 'FederationStorj']
+
+
+class FederationMixin(AsyncMixin):
+    """
+    Aggregate an endpoint of all peer Barrenero API instances defined in FEDERATION setting. Peers are queried
+    concurrently and those that do not answer in time are marked as unavailable.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+    peer_path = None
+
+    async def _peer(self, session: 'aiohttp.ClientSession', name: str, url: str, token: str) -> Dict:
+        """
+        Query a peer.
+
+        :param session: aiohttp Session.
+        :param name: Peer name.
+        :param url: Peer API base url.
+        :param token: Peer API token.
+        :return: Peer name, availability, error and response data.
+        """
+        async def query():
+            headers = {'Authorization': f'Token {token}'}
+            async with session.get(urljoin(url, self.peer_path), headers=headers) as response:
+                response.raise_for_status()
+                return await response.json(loads=fastjson.loads)
+
+        peer = {'name': name, 'available': False, 'error': None, 'data': None}
+        try:
+            peer['data'] = await asyncio.wait_for(query(), timeout=settings.FEDERATION['timeout'])
+            peer['available'] = True
+        except asyncio.TimeoutError:
+            peer['error'] = 'Timeout'
+        except aiohttp.ClientResponseError as e:
+            peer['error'] = f'HTTP {e.status}'
+        except Exception as e:
+            peer['error'] = str(e) or e.__class__.__name__
+
+        if peer['error']:
+            logger.warning('Peer "%s" unavailable: %s', name, peer['error'])
+
+        return peer
+
+    async def _peers(self) -> List[Dict]:
+        """
+        Query all peers concurrently.
+        """
+        session = get_session()
+        return await asyncio.gather(*[self._peer(session, *peer) for peer in settings.FEDERATION['peers']])
+
+    def merge(self, peers: List[Dict]) -> Dict:
+        """
+        Merge peers results.
+
+        :param peers: Peers results.
+        :return: Aggregated data.
+        """
+        raise NotImplementedError
+
+    async def async_get(self, request, format=None):
+        serializer = output_serializer(self.serializer_class, self.merge(await self._peers()))
+        return Response(serializer.data)
+
+    def get(self, request, format=None):
+        loop = get_event_loop()
+        return loop.run_until_complete(self.async_get(request, format))
+
+
+class FederationStatus(FederationMixin, APIView):
+    """
+    Graphic cards and services status of all rigs.
+    """
+    serializer_class = federation.Status
+    peer_path = 'status/'
+
+    def merge(self, peers: List[Dict]) -> Dict:
+        services = OrderedDict()
+        rigs = []
+        for peer in peers:
+            data = peer.pop('data') or {}
+            peer['graphics'] = data.get('graphics')
+            peer['services'] = data.get('services')
+            rigs.append(peer)
+
+            for service in peer['services'] or []:
+                summary = services.setdefault(service['name'], {'name': service['name'], 'active': 0, 'inactive': 0})
+                summary['active' if service['status'] == 'active' else 'inactive'] += 1
+
+        return {
+            'graphics': sum(len(rig['graphics'] or []) for rig in rigs),
+            'services': list(services.values()),
+            'rigs': rigs,
+        }
+
+
+class FederationEther(FederationMixin, APIView):
+    """
+    Ether miner status and hashrate of all rigs.
+    """
+    serializer_class = federation.Ether
+    peer_path = 'ether/'
+
+    def merge(self, peers: List[Dict]) -> Dict:
+        rigs = []
+        for peer in peers:
+            data = peer.pop('data') or {}
+            graphics = data.get('hashrate')
+            peer['active'] = data.get('active')
+            peer['graphics'] = graphics
+            peer['hashrate'] = sum(g['hashrate'] for g in graphics) if graphics is not None else None
+            rigs.append(peer)
+
+        return {
+            'active': sum(1 for rig in rigs if rig['active']),
+            'hashrate': sum(rig['hashrate'] or 0 for rig in rigs),
+            'rigs': rigs,
+        }
+
+
+class FederationStorj(FederationMixin, APIView):
+    """
+    Storj nodes status of all rigs.
+    """
+    serializer_class = federation.Storj
+    peer_path = 'storj/'
+
+    def merge(self, peers: List[Dict]) -> Dict:
+        rigs = []
+        for peer in peers:
+            peer['nodes'] = peer.pop('data')
+            rigs.append(peer)
+
+        return {
+            'nodes': sum(len(rig['nodes'] or []) for rig in rigs),
+            'rigs': rigs,
+        }
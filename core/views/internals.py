@@ -0,0 +1,37 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import commands, http
+from core.authentication import token_cache
+from core.permissions import IsAPISuperuser
+from core.ratelimit import limiters_stats
+from core.responses import rendered_cache
+from core.utils import breakers_stats, single_flight_group
+from core.views import stream
+
+__all__ = ['Internals']
+
+
+class Internals(APIView):
+    """
+    Inspect internal state of current worker process.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+
+    def get(self, request, format=None):
+        """
+        Retrieve statistics of current worker process.
+        """
+        data = {
+            'http': http.pool.stats(),
+            'circuit_breakers': breakers_stats(),
+            'rate_limits': limiters_stats(),
+            'single_flight': single_flight_group.stats(),
+            'subprocess': commands.runner.stats(),
+            'token_cache': token_cache.stats(),
+            'rendered_cache': rendered_cache.stats(),
+            'stream': stream.broadcaster.stats(),
+        }
+
+        return Response(data)
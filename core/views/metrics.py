@@ -0,0 +1,29 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.permissions import IsAPISuperuser
+from core.renderers import PrometheusRenderer
+
+__all__ = ['Metrics']
+
+
+class Metrics(APIView):
+    """
+    Prometheus metrics of all worker processes.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request, format=None):
+        """
+        Retrieve metrics in Prometheus text format.
+        """
+        return Response(metrics.registry.render())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(getattr(response, 'accepted_renderer', None), PrometheusRenderer):
+            response.content_type = response.accepted_renderer.content_type
+        return response
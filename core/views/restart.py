@@ -1,16 +1,43 @@
+import logging
 import shlex
 import subprocess
+from typing import Dict
 
-from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.http import Http404
+from django.urls import reverse
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.status import HTTP_202_ACCEPTED
 from rest_framework.views import APIView
 
+from core.jobs import jobs
 from core.permissions import IsAPISuperuser
-from core.serializers import restart, status
+from core.serializers import restart
 
-__all__ = ['RestartService']
+logger = logging.getLogger(__name__)
+
+__all__ = ['RestartService', 'RestartJob']
+
+
+def restart_service(name: str) -> Dict:
+    """
+    Restart a Systemd service.
+
+    :param name: Service name.
+    :return: Exit code and output of restart command, and an error if it failed.
+    """
+    try:
+        result = subprocess.run(shlex.split(f'service {name} restart'), stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, universal_newlines=True, timeout=settings.JOBS['timeout'])
+    except subprocess.TimeoutExpired:
+        return {'error': f'Restart timed out after {settings.JOBS["timeout"]}s'}
+
+    return {
+        'return_code': result.returncode,
+        'output': result.stdout,
+        'error': f'Restart failed with exit code {result.returncode}' if result.returncode else None,
+    }
 
 
 class RestartService(APIView):
@@ -22,10 +49,32 @@ class RestartService(APIView):
 
     def post(self, request, format=None):
         """
-        Restart a Barrenero's Systemd service giving the name.
+        Restart a Barrenero's Systemd service giving the name. Restart runs in background and the restart job is
+        returned, or the job already restarting the service if there is one.
         """
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        subprocess.run(shlex.split(f'service {serializer.data["name"]} restart'))
+        name = serializer.validated_data['name']
+
+        job = jobs.submit(name, lambda: restart_service(name))
+        location = request.build_absolute_uri(reverse('core:v1:restart-job', kwargs={'job_id': job['id']}))
+
+        return Response(restart.Job(job).data, status=HTTP_202_ACCEPTED, headers={'Location': location})
+
+
+class RestartJob(APIView):
+    """
+    Check a service restart job.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+    serializer_class = restart.Job
+
+    def get(self, request, job_id, format=None):
+        """
+        Retrieve status and outcome of a service restart job.
+        """
+        job = jobs.get(str(job_id))
+        if job is None:
+            raise Http404
 
-        return Response(status.Service({'name': serializer.data['name'], 'status': 'restarted'}).data)
+        return Response(self.serializer_class(job).data)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from core import metrics
+from core.responses import rendered_cache
+from core.serializers.compiled import output_serializer
+from core.snapshots import Snapshot, store
+from core.utils import get_event_loop
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SnapshotMixin']
+
+
+class SnapshotMixin:
+    """
+    Serve view data from snapshots stored by barrenero_collector daemon, collecting it inline only when the snapshot
+    is missing or older than allowed.
+    """
+    snapshot_name = None
+
+    def snapshot_key(self, account: str = None) -> str:
+        """
+        Snapshot key for this view.
+
+        :param account: Account address, if data depends on it.
+        :return: Key.
+        """
+        return f'{self.snapshot_name}:{account}' if account else self.snapshot_name
+
+    async def async_collect(self, account: str = None) -> Any:
+        """
+        Collect fresh data for this view.
+
+        :param account: Account address, if data depends on it.
+        :return: Data.
+        """
+        raise NotImplementedError
+
+    def collect(self, account: str = None) -> Any:
+        """
+        Collect fresh data for this view, running async_collect in the thread event loop.
+
+        :param account: Account address, if data depends on it.
+        :return: Data.
+        """
+        loop = get_event_loop()
+        return loop.run_until_complete(self.async_collect(account))
+
+    async def async_get_snapshot(self, account: str = None) -> Snapshot:
+        """
+        Retrieve current snapshot, collecting it if it is missing or outdated.
+
+        :param account: Account address, if data depends on it.
+        :return: Snapshot.
+        """
+        key = self.snapshot_key(account)
+        # Snapshots are files, so they are read and written out of the event loop
+        loop = asyncio.get_event_loop()
+        snapshot = await loop.run_in_executor(None, store.get, key)
+
+        if snapshot is None or snapshot.age > settings.SNAPSHOTS['max_age']:
+            logger.debug('Snapshot "%s" not available, collecting it', key)
+            metrics.cache_requests.inc(cache='snapshot', result='miss')
+            data = await self.async_collect(account)
+            snapshot = await loop.run_in_executor(None, store.set, key, data)
+        else:
+            metrics.cache_requests.inc(cache='snapshot', result='hit')
+
+        return snapshot
+
+    def get_snapshot(self, account: str = None) -> Snapshot:
+        """
+        Synchronous version of async_get_snapshot.
+
+        :param account: Account address, if data depends on it.
+        :return: Snapshot.
+        """
+        loop = get_event_loop()
+        return loop.run_until_complete(self.async_get_snapshot(account))
+
+    def snapshot_response(self, snapshot: Snapshot, **kwargs) -> Response:
+        """
+        Serialize snapshot data into a response including snapshot age and ETag. Rendered responses are cached per
+        token until snapshot data changes, and requests whose If-None-Match matches current ETag get a Not Modified
+        response without serializing data. Browsable API pages include request specific data such as CSRF tokens, so
+        they are neither cached nor tagged.
+
+        :param snapshot: Snapshot.
+        :return: Response.
+        """
+        etag = self.snapshot_etag(snapshot)
+        if etag is not None and etag in parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', '')):
+            rendered_cache.not_modified()
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = (getattr(self.request.auth, 'key', self.request.auth), snapshot.key,
+                         self.request.accepted_renderer.format)
+            cached = rendered_cache.get(cache_key, etag) if etag is not None else None
+            if etag is not None:
+                metrics.cache_requests.inc(cache='rendered', result='miss' if cached is None else 'hit')
+
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                with metrics.serialization_duration.time(view=self.snapshot_name):
+                    serializer = output_serializer(self.serializer_class, snapshot.data, **kwargs)
+                    response = Response(serializer.data)
+                if etag is not None:
+                    response.add_post_render_callback(
+                        lambda r: rendered_cache.set(cache_key, etag, r.content, r['Content-Type']))
+
+        if etag is not None:
+            response['ETag'] = etag
+        response['Age'] = str(int(snapshot.age))
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def snapshot_etag(self, snapshot: Snapshot) -> Optional[str]:
+        """
+        Strong ETag of a snapshot rendered in the format accepted by current request. Browsable API pages do not
+        depend only on snapshot data, so they have no ETag.
+
+        :param snapshot: Snapshot.
+        :return: Quoted ETag, None for browsable API pages.
+        """
+        if isinstance(self.request.accepted_renderer, BrowsableAPIRenderer):
+            return None
+
+        return quote_etag(f'{snapshot.digest[:16]}-{self.request.accepted_renderer.format}')
@@ -1,66 +1,81 @@
-import json
+import asyncio
 import logging
-import shlex
-import subprocess
+from functools import partial
+from typing import Dict, List, Optional
 
 from django.conf import settings
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core import commands, docker, gpu
 from core.permissions import IsAPISuperuser
 from core.serializers import status
+from core.utils import gather
+from core.views.asynchronous import AsyncMixin
+from core.views.snapshot import SnapshotMixin
 
 logger = logging.getLogger(__name__)
 
 __all__ = ['Status']
 
 
-class Status(APIView):
+class Status(AsyncMixin, SnapshotMixin, APIView):
     """
     Retrieve graphic cards and systemd services status.
     """
     permission_classes = (IsAuthenticated, IsAPISuperuser)
     serializer_class = status.Status
+    snapshot_name = 'status'
 
-    def _graphics_status(self):
+    async def _graphics_status(self) -> Optional[List[Dict]]:
         """
-        Gathers graphic cards status.
+        Gathers graphic cards status from nvidia-smi sampler, falling back to a single nvidia-smi query if there is
+        no recent sample.
         """
-        try:
-            cmd = 'nvidia-smi ' \
-                  '--query-gpu=index,power.draw,fan.speed,utilization.gpu,utilization.memory,clocks.gr,clocks.mem ' \
-                  '--format=csv'
-            process = subprocess.run(shlex.split(cmd), stdout=subprocess.PIPE, universal_newlines=True)
-            graphics_keys = ('id', 'power', 'fan', 'gpu_usage', 'mem_usage', 'gpu_clock', 'mem_clock')
-            graphics_stats = [[j.split()[0] for j in i.split(', ')] for i in process.stdout.strip().split('\n')[1:]]
-            result = [{k: v for k, v in zip(graphics_keys, values)} for values in graphics_stats]
-        except FileNotFoundError:
-            result = None
-        except Exception:
-            logger.exception('Cannot get graphics status')
-            result = None
+        loop = asyncio.get_event_loop()
+        # Sampler may wait for its first sample, so it is read out of the event loop
+        graphics = await loop.run_in_executor(None, partial(gpu.sampler.latest, wait=settings.NVIDIA_SMI['wait']))
 
-        return result
+        if graphics is None:
+            output = await commands.runner.run(gpu.sampler.snapshot_command, name='nvidia-smi')
+            if output is not None:
+                graphics = [gpu.sampler.parse_line(line) for line in output.splitlines() if line.strip()]
 
-    def _services_status(self):
+        return graphics
+
+    async def _services_status(self) -> Optional[List[Dict]]:
         """
-        Gathers docker status.
+        Gathers docker status from Docker events monitor, falling back to docker command if Docker state is unknown.
         """
-        str_format = '{{.Names}}'
-        active = subprocess.run(shlex.split(f"docker ps --filter='name=barrenero-miner' --format='{str_format}'"),
-                                stdout=subprocess.PIPE, universal_newlines=True).stdout.strip().split('\n')
+        loop = asyncio.get_event_loop()
+        active = await loop.run_in_executor(None, partial(docker.monitor.running, wait=settings.DOCKER['wait']))
+
+        if active is None:
+            str_format = '{{.Names}}'
+            output = await commands.runner.run(
+                f"docker ps --filter='name=barrenero-miner' --format='{str_format}'", name='docker ps')
+            if output is None:
+                return None
+            active = output.strip().split('\n')
 
         return [{'name': v, 'status': 'active' if k in active else 'inactive'} for k, v in settings.MINERS.items()]
 
+    async def async_collect(self, account: str = None):
+        # A failed or hung source is left empty instead of failing the whole status
+        graphics, services = await gather(self._graphics_status(), self._services_status())
+        return {
+            'graphics': graphics,
+            'services': services,
+        }
+
     def get(self, request, format=None):
         """
         Retrieve graphic cards and services status.
         """
-        data = {
-            'graphics': self._graphics_status(),
-            'services': self._services_status(),
-        }
+        return self.snapshot_response(self.get_snapshot())
 
-        serializer = self.serializer_class(data)
-        return Response(serializer.data)
+    async def async_get(self, request, format=None):
+        """
+        Retrieve graphic cards and services status.
+        """
+        return self.snapshot_response(await self.async_get_snapshot())
@@ -1,85 +1,115 @@
+import asyncio
 import json
 import logging
-import shlex
-import subprocess
 from json import JSONDecodeError
+from typing import Dict, List
 
 import aiohttp
 from django.conf import settings
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core import commands, fastjson
+from core.http import get_session
 from core.serializers.storj import Node
-from core.utils import retry, get_event_loop
+from core.utils import retry
+from core.views.asynchronous import AsyncMixin
+from core.views.snapshot import SnapshotMixin
 
 __all__ = ['Storj']
 
 logger = logging.getLogger(__name__)
 
 
-class Storj(APIView):
+class Storj(AsyncMixin, SnapshotMixin, APIView):
     """
     Retrieve Storj nodes status.
     """
     serializer_class = Node
+    snapshot_name = 'storj'
 
-    @retry(3, {})
+    @retry(3, {}, upstream='STORJ_API')
     async def _storj_api_status(self, session: 'aiohttp.ClientSession', node_id: str):
         url = f'{settings.STORJ_API["url"]}contacts/{node_id}/'
         async with session.get(url) as response:
-            try:
-                response.raise_for_status()
-
-                storj_api_response = await response.json()
-            except aiohttp.ClientResponseError:
-                storj_api_response = None
+            response.raise_for_status()
+            storj_api_response = await response.json(loads=fastjson.loads)
 
         return storj_api_response
 
-    async def _storj_status(self, session: 'aiohttp.ClientSession'):
+    async def _storj_node_status(self, session: 'aiohttp.ClientSession', semaphore: 'asyncio.Semaphore',
+                                 node: Dict) -> Dict:
+        """
+        Build a node status, enriched with its contact info from Storj API.
+
+        :param session: aiohttp Session.
+        :param semaphore: Semaphore that limits concurrent Storj API queries.
+        :param node: Node status from storjshare.
+        :return: Node status.
+        """
+        try:
+            async with semaphore:
+                storj_api = await asyncio.wait_for(self._storj_api_status(session, node['id']),
+                                                   timeout=settings.STORJ_API['timeout'])
+        except asyncio.TimeoutError:
+            logger.warning('Timeout retrieving Storj API status for node %s', node['id'])
+            storj_api = {}
+
+        return {
+            'id': node['id'],
+            'status': node['status'],
+            'config_path': node['configPath'],
+            'uptime': node['uptime'],
+            'restarts': node['restarts'],
+            'peers': node['peers'],
+            'allocs': node['allocs'],
+            'data_received': node['dataReceivedCount'] if node['dataReceivedCount'] != '...' else None,
+            'delta': node['delta'][:-2] if node['delta'] != '...' else None,
+            'port': node['port'],
+            'shared': node['shared'] if node['shared'] != '...' else None,
+            'shared_percent': node['sharedPercent'] if node['sharedPercent'] != '...' else None,
+            'response_time': storj_api.get('responseTime', None),
+            'reputation': storj_api.get('reputation', None),
+            'version': storj_api.get('userAgent', None)
+        }
+
+    async def _storj_status(self, session: 'aiohttp.ClientSession') -> List[Dict]:
         """
-        Gathers Storj nodes status.
+        Gathers Storj nodes status, querying Storj API for all nodes concurrently.
         """
         command = f'docker exec {settings.STORJ_CONTAINER_NAME} storjshare status -j'
-        result = subprocess.run(shlex.split(command), stdout=subprocess.PIPE, universal_newlines=True)
+        output = await commands.runner.run(command, name='storjshare status')
+        if output is None:
+            return []
+
         try:
-            for node in json.loads(result.stdout):
-                storj_api = await self._storj_api_status(session, node['id'])
-                yield {
-                    'id': node['id'],
-                    'status': node['status'],
-                    'config_path': node['configPath'],
-                    'uptime': node['uptime'],
-                    'restarts': node['restarts'],
-                    'peers': node['peers'],
-                    'allocs': node['allocs'],
-                    'data_received': node['dataReceivedCount'] if node['dataReceivedCount'] != '...' else None,
-                    'delta': node['delta'][:-2] if node['delta'] != '...' else None,
-                    'port': node['port'],
-                    'shared': node['shared'] if node['shared'] != '...' else None,
-                    'shared_percent': node['sharedPercent'] if node['sharedPercent'] != '...' else None,
-                    'response_time': storj_api.get('responseTime', None),
-                    'reputation': storj_api.get('reputation', None),
-                    'version': storj_api.get('userAgent', None)
-                }
+            nodes = json.loads(output)
         except JSONDecodeError:
             logger.exception("Error retrieving storj status")
+            return []
+
+        semaphore = asyncio.Semaphore(settings.STORJ_API['concurrency'])
+        return await asyncio.gather(*[self._storj_node_status(session, semaphore, node) for node in nodes])
 
     async def _get(self):
         """
         Retrieve Storj nodes status.
         """
-        async with aiohttp.ClientSession() as session:
-            status = [i async for i in self._storj_status(session)]
+        session = get_session()
+        status = await self._storj_status(session)
 
         return status
 
+    async def async_collect(self, account: str = None):
+        return await self._get()
+
     def get(self, request, format=None):
         """
         Check Ether miner status info.
         """
-        loop = get_event_loop()
-        data = loop.run_until_complete(self._get())
+        return self.snapshot_response(self.get_snapshot(), many=True)
 
-        serializer = self.serializer_class(data, many=True)
-        return Response(serializer.data)
+    async def async_get(self, request, format=None):
+        """
+        Check Ether miner status info.
+        """
+        return self.snapshot_response(await self.async_get_snapshot(), many=True)
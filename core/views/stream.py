@@ -0,0 +1,74 @@
+from django.http import StreamingHttpResponse
+from rest_framework import status as http_status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.permissions import IsAPISuperuser
+from core.renderers import EventStreamRenderer
+from core.serializers import status
+from core.serializers.ether import ether
+from core.stream import Broadcaster, Subscriber
+from core.views.asynchronous import AsyncMixin
+from core.views.ether.ether import Ether
+from core.views.status import Status
+
+__all__ = ['Stream']
+
+
+def _ether_event() -> bytes:
+    view = Ether()
+    data = {'active': view._is_miner_active(), 'hashrate': view._hashrate()}
+    return JSONRenderer().render(ether.Ether(data).data)
+
+
+def _status_event() -> bytes:
+    return JSONRenderer().render(status.Status(Status().collect()).data)
+
+
+# Single producer of live events shared by all stream clients
+broadcaster = Broadcaster(sources={'ether': _ether_event, 'status': _status_event}, name='stream-broadcaster')
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """
+    Stream of events of a subscriber. ASGI server iterates async_streaming_content instead of streaming_content, so
+    waiting for events does not block a thread.
+    """
+    def __init__(self, subscriber: Subscriber, *args, **kwargs):
+        super().__init__(subscriber.events(), *args, content_type='text/event-stream', **kwargs)
+        self.subscriber = subscriber
+        self['Cache-Control'] = 'no-cache'
+        self['X-Accel-Buffering'] = 'no'
+
+    @property
+    def async_streaming_content(self):
+        return self.subscriber.async_events()
+
+    def close(self):
+        super().close()
+        self.subscriber.close()
+
+
+class Stream(AsyncMixin, APIView):
+    """
+    Live Ether miner and graphic cards status.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+    renderer_classes = (EventStreamRenderer, JSONRenderer)
+
+    def get(self, request, format=None):
+        """
+        Stream is only served by ASGI server: under WSGI each client would hold a worker for as long as it is
+        connected, and uWSGI harakiri would kill it after a few seconds.
+        """
+        return Response({'detail': 'Live stream is only available when served by ASGI server (run asgi)'},
+                        status=http_status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    async def async_get(self, request, format=None):
+        """
+        Stream Ether miner status ('ether' events) and graphics and services status ('status' events) as server-sent
+        events, sent whenever they change.
+        """
+        return EventStreamResponse(broadcaster.subscribe())
@@ -1,30 +1,49 @@
 import asyncio
 import datetime
 import logging
-from itertools import chain
-from typing import Dict, List
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import aiohttp
 from django.conf import settings
-from rest_framework.response import Response
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
+from core import fastjson, ratelimit
+from core.http import get_session
+from core.models import Transaction, User
+from core.permissions import IsAPISuperuser
+from core.renderers import FastJSONRenderer
 from core.serializers import wallet
-from core.utils import retry, get_event_loop
+from core.serializers.compiled import output_serializer
+from core.shared import shared_cache
+from core.snapshots import store
+from core.utils import gather, get_event_loop, retry, run_db, single_flight
+from core.views.asynchronous import AsyncMixin
+from core.views.snapshot import SnapshotMixin
 
 logger = logging.getLogger(__name__)
 
-__all__ = ['Wallet']
+__all__ = ['Wallet', 'WalletBatch', 'WalletTransactions']
 
 
-class Wallet(APIView):
+class Wallet(AsyncMixin, SnapshotMixin, APIView):
     """
     Wallet status provided by Etherscan and Ethplorer.
     """
     serializer_class = wallet.Wallet
+    snapshot_name = 'wallet'
 
-    @retry(3)
+    @single_flight
+    @retry(3, upstream='ETHERSCAN')
     async def _price(self, session: 'aiohttp.ClientSession') -> Dict:
         """
         Query Etherscan to retrieve currency Ether price.
@@ -38,19 +57,101 @@ class Wallet(APIView):
             'apikey': settings.ETHERSCAN['token'],
         }
         async with session.get(settings.ETHERSCAN['url'], params=params) as response:
-            try:
-                response.raise_for_status()
-                price = (await response.json())['result']
-            except aiohttp.ClientResponseError:
-                logger.exception('Cannot retrieve Etherscan price')
-                price = None
-            except Exception as e:
-                logger.exception('Wrong response: %s', str(e))
-                price = None
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            price = data['result']
+        except Exception as e:
+            logger.exception('Wrong response: %s', str(e))
+            price = None
 
         return price
 
-    @retry(3)
+    async def _shared_price(self, session: 'aiohttp.ClientSession') -> Dict:
+        """
+        Currency Ether price shared by all accounts, queried again once it is older than SHARED_CACHE['price_ttl'].
+
+        :param session: aiohttp Session.
+        :return: Currency price.
+        """
+        return await shared_cache.get_or_refresh('price', settings.SHARED_CACHE['price_ttl'],
+                                                 lambda: self._price(session))
+
+    @single_flight
+    @retry(3, upstream='ETHERSCAN')
+    async def _balances(self, session: 'aiohttp.ClientSession', accounts: Tuple[str, ...]) -> Dict[str, float]:
+        """
+        Query Etherscan to retrieve Ether balance of up to 20 accounts at once.
+
+        :param session: aiohttp Session.
+        :param accounts: Accounts addresses.
+        :return: Ether balance per account.
+        """
+        params = {
+            'module': 'account',
+            'action': 'balancemulti',
+            'apikey': settings.ETHERSCAN['token'],
+            'address': ','.join(accounts),
+            'tag': 'latest',
+        }
+        async with session.get(settings.ETHERSCAN['url'], params=params) as response:
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            balances = {b['account'].lower(): float(b['balance']) * 10e-19 for b in data['result']}
+        except Exception as e:
+            logger.exception('Wrong response: %s', str(e))
+            balances = None
+
+        return balances
+
+    async def _token_metadata(self, tokens: List[Dict]) -> Dict[str, Dict]:
+        """
+        Name, symbol, decimals factor and price of tokens, shared by all accounts. Token info returned by Ethplorer is
+        only parsed for tokens that are unknown or older than SHARED_CACHE['tokens_ttl'], that are merged into the
+        shared tokens value under its lock, so concurrent updates of other workers are not lost.
+
+        :param tokens: Tokens returned by Ethplorer.
+        :return: Metadata per token address.
+        """
+        now = time.time()
+        ttl = settings.SHARED_CACHE['tokens_ttl']
+        infos = {info.get('address') or info['symbol']: info for info in (t['tokenInfo'] for t in tokens)}
+
+        def outdated(known: Dict[str, Dict]) -> List[str]:
+            return [k for k in infos if k not in known or now - known[k]['timestamp'] > ttl]
+
+        def merge(known: Optional[Dict[str, Dict]]) -> Dict[str, Dict]:
+            known = known or {}
+            keys = outdated(known)
+            if not keys:
+                return known
+
+            known = dict(known)
+            for key in keys:
+                info = infos[key]
+                known[key] = {
+                    'timestamp': now,
+                    'name': info['name'],
+                    'symbol': info['symbol'],
+                    'decimals': 10 ** (-int(info['decimals'])),
+                    'price_usd': info['price']['rate'] if info['price'] else None,
+                }
+            return known
+
+        # Shared values are files, so they are read and written out of the event loop
+        loop = asyncio.get_event_loop()
+        snapshot = await loop.run_in_executor(None, shared_cache.get, 'tokens')
+        known = snapshot.data if snapshot is not None else {}
+        if outdated(known):
+            known = await loop.run_in_executor(None, shared_cache.update, 'tokens', merge)
+
+        return {k: known[k] for k in infos}
+
+    @single_flight
+    @retry(3, upstream='ETHPLORER')
     async def _tokens(self, session: 'aiohttp.ClientSession', account: str) -> Dict:
         """
         Query Ethplorer to retrieve current wallet tokens.
@@ -61,57 +162,64 @@ class Wallet(APIView):
         """
         url = urljoin(settings.ETHPLORER["url"], f'/getAddressInfo/{account}')
         params = {'apiKey': settings.ETHPLORER['token']}
-        async with session.get(url=url, params=params) as response:
-            try:
+
+        # Gets ETH/USD price while querying Ethplorer
+        price_request = asyncio.ensure_future(self._shared_price(session))
+        try:
+            async with session.get(url=url, params=params) as response:
                 response.raise_for_status()
-                result = await response.json()
-
-                # Gets ETH/USD price
-                price = await self._price(session)
-                price_usd = float(price['ethusd']) if price else None
-                balance_usd = price_usd * result['ETH']['balance'] if price else None
-
-                # Add Ether token
-                tokens = {
-                    'ETH': {
-                        'name': 'Ether',
-                        'symbol': 'ETH',
-                        'balance': result['ETH']['balance'],
-                        'price_usd': price_usd,
-                        'balance_usd': balance_usd
-                    }
+                result = await response.json(loads=fastjson.loads)
+        except Exception:
+            price_request.cancel()
+            raise
+
+        try:
+            price, = await gather(price_request)
+            price_usd = float(price['ethusd']) if price else None
+            balance_usd = price_usd * result['ETH']['balance'] if price else None
+
+            # Add Ether token
+            tokens = {
+                'ETH': {
+                    'name': 'Ether',
+                    'symbol': 'ETH',
+                    'balance': result['ETH']['balance'],
+                    'price_usd': price_usd,
+                    'balance_usd': balance_usd
                 }
+            }
 
-                # All tokens
-                for t in result.get('tokens', []):
-                    decimals = 10 ** (-int(t['tokenInfo']['decimals']))
-                    token = {
-                        'name': t['tokenInfo']['name'],
-                        'symbol': t['tokenInfo']['symbol'],
-                        'balance': t['balance'] * decimals,
-                    }
-
-                    if t['tokenInfo']['price']:
-                        token['price_usd'] = t['tokenInfo']['price']['rate']
-                        token['balance_usd'] = t['balance'] * decimals * float(t['tokenInfo']['price']['rate'])
-
-                    tokens[t['tokenInfo']['symbol']] = token
-            except aiohttp.ClientResponseError:
-                logger.exception('Cannot retrieve Ethplorer account info')
-                tokens = None
-            except Exception as e:
-                logger.exception('Wrong response: %s', str(e))
-                tokens = None
+            # All tokens
+            metadata = await self._token_metadata(result.get('tokens', []))
+            for t in result.get('tokens', []):
+                info = metadata[t['tokenInfo'].get('address') or t['tokenInfo']['symbol']]
+                token = {
+                    'name': info['name'],
+                    'symbol': info['symbol'],
+                    'balance': t['balance'] * info['decimals'],
+                }
+
+                if info['price_usd']:
+                    token['price_usd'] = info['price_usd']
+                    token['balance_usd'] = t['balance'] * info['decimals'] * float(info['price_usd'])
+
+                tokens[info['symbol']] = token
+        except Exception as e:
+            logger.exception('Wrong response: %s', str(e))
+            tokens = None
 
         return tokens
 
-    @retry(3)
-    async def _eth_transactions(self, session: 'aiohttp.ClientSession', account: str) -> List[Dict]:
+    @single_flight
+    @retry(3, upstream='ETHERSCAN')
+    async def _eth_transactions(self, session: 'aiohttp.ClientSession', account: str,
+                                start_block: int = 0) -> List[Dict]:
         """
-        Query Etherscan to retrieve last transactions.
+        Query Etherscan to retrieve transactions from a block, oldest first.
 
         :param session: aiohttp Session.
         :param account: Account address.
+        :param start_block: First block.
         :return: Wallet transactions.
         """
         params = {
@@ -119,87 +227,202 @@ class Wallet(APIView):
             'action': 'txlist',
             'apikey': settings.ETHERSCAN['token'],
             'address': account,
-            'startblock': '0',
+            'startblock': str(start_block),
             'endblock': '99999999',
-            'sort': 'desc',
+            'sort': 'asc',
             'page': '1',
-            'offset': '10',
+            'offset': str(settings.WALLET_HISTORY['page_size']),
         }
         async with session.get(settings.ETHERSCAN['url'], params=params) as response:
-            try:
-                response.raise_for_status()
-                transactions = [{
-                    'token': {
-                        'name': 'Ether',
-                        'symbol': 'ETH',
-                    },
-                    'hash': t['hash'],
-                    'source': t['from'],
-                    'destination': t['to'],
-                    'value': float(t['value']) * 10e-19,
-                    'timestamp': datetime.datetime.fromtimestamp(int(t['timeStamp'])),
-                } for t in (await response.json())['result']]
-            except aiohttp.ClientResponseError:
-                logger.exception('Cannot retrieve Etherscan transactions')
-                transactions = None
-            except asyncio.TimeoutError:
-                logger.exception('Timeout')
-                transactions = None
-            except Exception as e:
-                logger.exception('Wrong response: %s', str(e))
-                transactions = None
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            transactions = [{
+                'token': {
+                    'name': 'Ether',
+                    'symbol': 'ETH',
+                },
+                'hash': t['hash'],
+                'source': t['from'],
+                'destination': t['to'],
+                'value': float(t['value']) * 10e-19,
+                'timestamp': datetime.datetime.fromtimestamp(int(t['timeStamp']), tz=datetime.timezone.utc),
+                'block': int(t['blockNumber']),
+            } for t in data['result']]
+        except Exception as e:
+            logger.exception('Wrong response: %s', str(e))
+            transactions = None
 
         return transactions
 
-    @retry(3)
-    async def _token_operations(self, session: 'aiohttp.ClientSession', account: str) -> List[Dict]:
+    @single_flight
+    @retry(3, upstream='ETHPLORER')
+    async def _token_operations(self, session: 'aiohttp.ClientSession', account: str,
+                                before: int = None) -> List[Dict]:
         """
-        Query Ethplorer to retrieve last token operations.
+        Query Ethplorer to retrieve last token operations, newest first.
 
         :param session: aiohttp Session.
         :param account: Account address.
+        :param before: Only operations older than this timestamp.
         :return: Wallet transactions.
         """
         url = urljoin(settings.ETHPLORER["url"], f'/getAddressHistory/{account}')
-        params = {'apiKey': settings.ETHPLORER['token']}
+        params = {'apiKey': settings.ETHPLORER['token'], 'limit': settings.WALLET_HISTORY['page_size']}
+        if before is not None:
+            params['timestamp'] = before
         async with session.get(url, params=params) as response:
-            try:
-                response.raise_for_status()
-                transactions = [{
-                    'token': {
-                        'name': t['tokenInfo']['name'],
-                        'symbol': t['tokenInfo']['symbol'],
-                    },
-                    'hash': t['transactionHash'],
-                    'source': t['from'],
-                    'destination': t['to'],
-                    'value': float(t['value']) * 10 ** (-int(t['tokenInfo']['decimals'])),
-                    'timestamp': datetime.datetime.fromtimestamp(int(t['timestamp'])),
-                } for t in (await response.json())['operations']]
-            except aiohttp.ClientResponseError:
-                logger.exception('Cannot retrieve Ethplorer token operations')
-                transactions = None
-            except asyncio.TimeoutError:
-                logger.exception('Timeout')
-                transactions = None
-            except Exception as e:
-                logger.exception('Wrong response: %s', str(e))
-                transactions = None
+            response.raise_for_status()
+            data = await response.json(loads=fastjson.loads)
+
+        try:
+            transactions = [{
+                'token': {
+                    'name': t['tokenInfo']['name'],
+                    'symbol': t['tokenInfo']['symbol'],
+                },
+                'hash': t['transactionHash'],
+                'source': t['from'],
+                'destination': t['to'],
+                'value': float(t['value']) * 10 ** (-int(t['tokenInfo']['decimals'])),
+                'timestamp': datetime.datetime.fromtimestamp(int(t['timestamp']), tz=datetime.timezone.utc),
+            } for t in data['operations']]
+        except Exception as e:
+            logger.exception('Wrong response: %s', str(e))
+            transactions = None
 
         return transactions
 
+    @single_flight
+    async def _sync_eth_transactions(self, session: 'aiohttp.ClientSession', account: str) -> int:
+        """
+        Store Ether transactions newer than the last stored block, querying Etherscan page by page.
+
+        :param session: aiohttp Session.
+        :param account: Account address.
+        :return: Number of new transactions.
+        """
+        page_size = settings.WALLET_HISTORY['page_size']
+        start_block = await run_db(Transaction.objects.last_block, account) or 0
+
+        stored = 0
+        for _ in range(settings.WALLET_HISTORY['max_pages']):
+            transactions = await self._eth_transactions(session, account, start_block)
+            if not transactions:
+                break
+
+            stored += await run_db(Transaction.objects.store, account, transactions)
+
+            # Last block is queried again, as it may have more transactions than those in this page
+            last_block = max(t['block'] for t in transactions)
+            if len(transactions) < page_size or last_block == start_block:
+                break
+            start_block = last_block
+
+        return stored
+
+    async def _page_token_operations(self, session: 'aiohttp.ClientSession', account: str, before: Optional[int],
+                                     until: Optional[datetime.datetime],
+                                     pages: int) -> Tuple[int, int, bool, Optional[int]]:
+        """
+        Store token operations querying Ethplorer backwards page by page, until reaching the oldest operation or a
+        given timestamp.
+
+        :param session: aiohttp Session.
+        :param account: Account address.
+        :param before: Start from operations older than this timestamp, from the newest one if None.
+        :param until: Stop when reaching operations as old as this timestamp.
+        :param pages: Max number of queries.
+        :return: Number of new operations, number of queries, whether the end was reached and timestamp to continue
+        from otherwise.
+        """
+        page_size = settings.WALLET_HISTORY['page_size']
+
+        stored = 0
+        queries = 0
+        while queries < pages:
+            queries += 1
+            operations = await self._token_operations(session, account, before)
+            if operations is None:
+                # Failed, so this page is queried again on next sync
+                break
+
+            if not operations:
+                return stored, queries, True, None
+
+            stored += await run_db(Transaction.objects.store, account, operations)
+
+            oldest = min(t['timestamp'] for t in operations)
+            if len(operations) < page_size or (until is not None and oldest <= until):
+                return stored, queries, True, None
+            before = int(oldest.timestamp())
+
+        return stored, queries, False, before
+
+    @single_flight
+    async def _sync_token_operations(self, session: 'aiohttp.ClientSession', account: str) -> int:
+        """
+        Store token operations newer than the last stored one, and then keep backfilling older ones from the
+        backfill cursor of the account, so histories longer than WALLET_HISTORY['max_pages'] queries are completed
+        over several syncs. The cursor is stored in a snapshot, and it is marked as complete once the oldest operation
+        is reached.
+
+        :param session: aiohttp Session.
+        :param account: Account address.
+        :return: Number of new operations.
+        """
+        loop = asyncio.get_event_loop()
+        pages = settings.WALLET_HISTORY['max_pages']
+        cursor_key = f'wallet-backfill:{account.lower()}'
+        last_timestamp = await run_db(Transaction.objects.last_timestamp, account, exclude_symbol='ETH')
+        cursor = await loop.run_in_executor(None, store.get, cursor_key)
+
+        if last_timestamp is None:
+            # Nothing stored yet, so the whole history is queried from the newest operation
+            backfill = {'before': None, 'complete': False}
+        elif cursor is None:
+            # Stored before backfill cursors existed, so it continues from the oldest stored operation
+            first_timestamp = await run_db(Transaction.objects.first_timestamp, account, exclude_symbol='ETH')
+            backfill = {'before': int(first_timestamp.timestamp()), 'complete': False}
+        else:
+            backfill = cursor.data
+
+        stored = 0
+        if last_timestamp is not None:
+            new, queries, done, before = await self._page_token_operations(session, account, None, last_timestamp,
+                                                                           pages)
+            stored += new
+            pages -= queries
+            if not done and before is not None:
+                # Stored operations not reached, so backfill goes on from here to cover the gap
+                backfill = {'before': before, 'complete': False}
+
+        if not backfill['complete'] and pages > 0:
+            new, _, done, before = await self._page_token_operations(session, account, backfill['before'], None,
+                                                                     pages)
+            stored += new
+            backfill = {'before': None, 'complete': True} if done else {'before': before, 'complete': False}
+
+        if cursor is None or cursor.data != backfill:
+            await loop.run_in_executor(None, store.set, cursor_key, backfill)
+
+        return stored
+
     async def _transactions(self, session: 'aiohttp.ClientSession', account: str) -> List[Dict]:
         """
-        Query Etherscan and Ethplorer to retrieve last operations.
+        Sync transactions from Etherscan and Ethplorer into the local store, and retrieve last ones.
 
         :param session: aiohttp Session.
         :param account: Account address.
         :return: Wallet transactions.
         """
-        eth_tx = await self._eth_transactions(session, account) or []
-        token_ops = await self._token_operations(session, account) or []
+        await gather(
+            self._sync_eth_transactions(session, account),
+            self._sync_token_operations(session, account)
+        )
 
-        return sorted(chain(eth_tx, token_ops), key=lambda x: x['timestamp'], reverse=True)
+        return await run_db(Transaction.objects.latest, account, settings.WALLET_HISTORY['latest'])
 
     async def _get(self, account):
         """
@@ -208,23 +431,181 @@ class Wallet(APIView):
         :param account: Account address.
         :return: Wallet info including balance and transactions.
         """
-        async with aiohttp.ClientSession() as session:
-            transactions = await self._transactions(session, account)
-            tokens = await self._tokens(session, account)
-
-            data = {
-                'tokens': tokens,
-                'transactions': transactions,
-            }
+        session = get_session()
+        transactions, tokens = await gather(
+            self._transactions(session, account),
+            self._tokens(session, account)
+        )
+
+        data = {
+            'tokens': tokens,
+            'transactions': transactions,
+        }
 
         return data
 
+    async def async_collect(self, account: str = None) -> Dict:
+        return await self._get(account)
+
     def get(self, request, format=None):
         """
         Query Etherscan and Ethplorer to retrieve current wallet info.
         """
+        return self.snapshot_response(self.get_snapshot(request.user.account))
+
+    async def async_get(self, request, format=None):
+        """
+        Query Etherscan and Ethplorer to retrieve current wallet info.
+        """
+        return self.snapshot_response(await self.async_get_snapshot(request.user.account))
+
+
+class TransactionsPagination(CursorPagination):
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class WalletTransactions(ListAPIView):
+    """
+    Wallet transactions history, newest first, from transactions stored while collecting wallet status.
+    """
+    serializer_class = wallet.Transaction
+    pagination_class = TransactionsPagination
+
+    def get_queryset(self):
+        return Transaction.objects.for_account(self.request.user.account)
+
+
+# Threads that run wallet batches, each one with its own event loop
+batch_executor = ThreadPoolExecutor(max_workers=settings.WALLET_BATCH['workers'], thread_name_prefix='wallet-batch')
+
+
+class WalletBatch(APIView):
+    """
+    Wallet balances of many accounts, streamed as newline delimited JSON. A batch may take longer than uWSGI harakiri,
+    so it must be served by the ASGI server, that streams it from a thread pool.
+    """
+    permission_classes = (IsAuthenticated, IsAPISuperuser)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wallet = Wallet()
+
+    async def _batch(self, accounts: List[str], emit: Callable[[Dict], None], cancelled: threading.Event):
+        """
+        Query Ether balances in chunks of WALLET_BATCH['chunk_size'] accounts and tokens of each account, up to
+        WALLET_BATCH['concurrency'] queries at the same time, emitting each account as soon as it is ready.
+
+        :param accounts: Accounts addresses.
+        :param emit: Function called with each account wallet.
+        :param cancelled: Event set when the client is gone.
+        """
+        session = get_session()
+        semaphore = asyncio.Semaphore(settings.WALLET_BATCH['concurrency'])
+
+        async def limited(fetcher, *args):
+            async with semaphore:
+                return await fetcher(session, *args)
+
+        # Price is looked up once, and then token queries find it in the shared cache
+        price = await self.wallet._shared_price(session)
+        price_usd = float(price['ethusd']) if price else None
+
+        chunk_size = settings.WALLET_BATCH['chunk_size']
+        balances = {}
+        for i in range(0, len(accounts), chunk_size):
+            chunk = tuple(accounts[i:i + chunk_size])
+            request = asyncio.ensure_future(limited(self.wallet._balances, chunk))
+            balances.update({account: request for account in chunk})
+
+        async def account_wallet(account: str) -> Dict:
+            tokens, chunk_balances = await gather(limited(self.wallet._tokens, account), balances[account])
+            balance = chunk_balances.get(account) if chunk_balances else None
+
+            errors = []
+            if tokens is None:
+                errors.append('Tokens not available')
+            tokens = dict(tokens or {})
+
+            if balance is not None:
+                tokens['ETH'] = {'name': 'Ether', 'symbol': 'ETH', 'balance': balance}
+                if price_usd is not None:
+                    tokens['ETH'].update({'price_usd': price_usd, 'balance_usd': price_usd * balance})
+            elif 'ETH' not in tokens:
+                errors.append('Ether balance not available')
+
+            return {'account': account, 'tokens': tokens, 'error': '. '.join(errors) or None}
+
+        tasks = [asyncio.ensure_future(account_wallet(account)) for account in accounts]
+        try:
+            for task in asyncio.as_completed(tasks):
+                emit(await task)
+                if cancelled.is_set():
+                    logger.info('Wallet batch cancelled')
+                    break
+        finally:
+            for task in tasks + list(set(balances.values())):
+                task.cancel()
+
+    def _produce(self, accounts: List[str], emit: Callable[[Dict], None], cancelled: threading.Event):
+        """
+        Run a batch in current thread event loop. Its upstream queries have background priority, so they do not
+        exhaust rate limits of regular requests.
+        """
         loop = get_event_loop()
-        data = loop.run_until_complete(self._get(request.user.account))
+        with ratelimit.priority(ratelimit.BACKGROUND):
+            loop.run_until_complete(self._batch(accounts, emit, cancelled))
+
+    def _stream(self, accounts: List[str]) -> Iterator[bytes]:
+        """
+        Rendered account wallets, one per line, in the order they are ready.
+
+        :param accounts: Accounts addresses.
+        """
+        entries = queue.Queue()
+        cancelled = threading.Event()
+        producer = batch_executor.submit(self._produce, accounts, entries.put, cancelled)
+        producer.add_done_callback(lambda f: entries.put(None))
+
+        renderer = FastJSONRenderer()
+        try:
+            for entry in iter(entries.get, None):
+                yield renderer.render(output_serializer(wallet.BatchWallet, entry).data) + b'\n'
+        finally:
+            cancelled.set()
+
+        if producer.exception() is not None:
+            logger.error('Wallet batch failed: %s', producer.exception(), exc_info=producer.exception())
+
+    def _accounts(self) -> List[str]:
+        """
+        Accounts of all active users, validated as given ones. Invalid addresses are skipped.
+
+        :raise ValidationError: If there are more than WALLET_BATCH['max_accounts'] accounts.
+        """
+        try:
+            accounts = list(User.objects.filter(is_active=True).values_list('account', flat=True))
+        finally:
+            close_old_connections()
+
+        valid = [a for a in accounts if a and wallet.ACCOUNT_REGEX.match(a)]
+        if len(valid) < len(accounts):
+            logger.warning('Wallet batch skips %d active users with invalid accounts', len(accounts) - len(valid))
+
+        serializer = wallet.BatchQuery(data={'accounts': valid})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['accounts']
+
+    def post(self, request, format=None):
+        """
+        Query Etherscan and Ethplorer to retrieve balances and tokens of given accounts, or all active users accounts
+        if none is given. Each account is sent as a JSON line as soon as it is ready, including an error message if
+        it could not be completely retrieved.
+        """
+        serializer = wallet.BatchQuery(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        accounts = serializer.validated_data.get('accounts') or self._accounts()
 
-        serializer = self.serializer_class(data)
-        return Response(serializer.data)
+        return StreamingHttpResponse(self._stream(accounts), content_type='application/x-ndjson')